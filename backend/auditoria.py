@@ -0,0 +1,150 @@
+# backend/auditoria.py - Gravação de auditoria em lote, fora do caminho da requisição
+import os
+import asyncio
+import ipaddress
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import insert
+
+from database import SessionLocal
+from models import LogAuditoria
+from metrics import (monitorar_fila_auditoria, registrar_lote_auditoria,
+                     registrar_auditoria_descartada, registrar_fila_auditoria_cheia)
+
+logger = logging.getLogger(__name__)
+
+AUDITORIA_FILA_MAX = int(os.getenv("AUDITORIA_FILA_MAX", 10000))
+AUDITORIA_LOTE = int(os.getenv("AUDITORIA_LOTE", 500))
+AUDITORIA_ESPERA_MAX = float(os.getenv("AUDITORIA_ESPERA_MAX", 1.0))
+
+# Proxies reversos (IPs ou redes CIDR, separados por vírgula) cujo X-Real-IP é aceito
+PROXIES_CONFIAVEIS = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("PROXIES_CONFIAVEIS", "127.0.0.1,::1").split(",") if proxy.strip()
+]
+
+
+def _proxy_confiavel(host: str) -> bool:
+    try:
+        endereco = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(endereco in rede for rede in PROXIES_CONFIAVEIS)
+
+
+def ip_cliente(request: Request) -> Optional[str]:
+    """IP de origem da requisição
+
+    O X-Real-IP (definido pelo nginx) só vale quando a conexão vem de um proxy
+    em PROXIES_CONFIAVEIS; enviado por qualquer outro cliente, seria forjado.
+    """
+    ip = request.client.host if request.client else None
+    if ip and _proxy_confiavel(ip):
+        ip = request.headers.get("x-real-ip") or ip
+    return ip[:45] if ip else None
+
+
+class GravadorAuditoria:
+    """Fila limitada de registros de auditoria, gravados em lote por um worker"""
+
+    def __init__(self, tamanho_maximo: int, lote: int):
+        self.tamanho_maximo = tamanho_maximo
+        self.lote = lote
+        # Criada em iniciar(), dentro do event loop do servidor
+        self.fila: Optional[asyncio.Queue] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        monitorar_fila_auditoria(lambda: self.fila.qsize() if self.fila else 0)
+
+    async def registrar(
+        self,
+        usuario: str,
+        acao: str,
+        recurso_tipo: str,
+        recurso_id: int,
+        detalhes: str = None,
+        ip_origem: str = None
+    ):
+        """Enfileira uma ação de auditoria
+
+        Com a fila cheia, a requisição espera até AUDITORIA_ESPERA_MAX
+        segundos (backpressure) antes de descartar o registro.
+        """
+        registro = {
+            "usuario": usuario,
+            "acao": acao,
+            "recurso_tipo": recurso_tipo,
+            "recurso_id": recurso_id,
+            "detalhes": detalhes,
+            "ip_origem": ip_origem,
+            "data_acao": datetime.utcnow()
+        }
+        if self.fila is None:
+            # Worker não iniciado: grava diretamente
+            await self._gravar([registro])
+            return
+
+        try:
+            self.fila.put_nowait(registro)
+            return
+        except asyncio.QueueFull:
+            registrar_fila_auditoria_cheia()
+
+        try:
+            await asyncio.wait_for(self.fila.put(registro), timeout=AUDITORIA_ESPERA_MAX)
+        except asyncio.TimeoutError:
+            registrar_auditoria_descartada()
+            logger.error(
+                "Fila de auditoria cheia, registro descartado: %s %s %s por %s",
+                acao, recurso_tipo, recurso_id, usuario)
+
+    async def _gravar(self, lote: List[dict]):
+        try:
+            async with SessionLocal() as db:
+                # INSERT com múltiplas linhas em uma única transação
+                await db.execute(insert(LogAuditoria), lote)
+                await db.commit()
+            registrar_lote_auditoria(len(lote))
+        except Exception as e:
+            registrar_auditoria_descartada(len(lote))
+            logger.error("Erro ao gravar %d registros de auditoria: %s", len(lote), e)
+
+    async def _executar(self):
+        while True:
+            lote = [await self.fila.get()]
+            while len(lote) < self.lote and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+
+            try:
+                await self._gravar(lote)
+            finally:
+                for _ in lote:
+                    self.fila.task_done()
+
+    def iniciar(self):
+        """Inicia o worker de gravação"""
+        self.fila = asyncio.Queue(maxsize=self.tamanho_maximo)
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self, timeout: float = 10.0):
+        """Grava os registros pendentes e encerra o worker"""
+        if not self._tarefa:
+            return
+
+        try:
+            await asyncio.wait_for(self.fila.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Encerrando com %d registros de auditoria pendentes", self.fila.qsize())
+
+        self._tarefa.cancel()
+        await asyncio.gather(self._tarefa, return_exceptions=True)
+        self._tarefa = None
+
+
+gravador_auditoria = GravadorAuditoria(
+    tamanho_maximo=AUDITORIA_FILA_MAX,
+    lote=AUDITORIA_LOTE
+)
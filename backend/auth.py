@@ -1,98 +1,319 @@
 # auth.py - CORRIGIDO para usar a biblioteca ldap3
-from ldap3 import Server, Connection, ALL, Tls
+from ldap3 import Server, Connection, ALL, Tls, REUSABLE, SYNC
 from ldap3.core.exceptions import LDAPInvalidCredentialsResult, LDAPSocketOpenError, LDAPBindError
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from ldap3.utils.conv import escape_filter_chars
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPBasic, HTTPBasicCredentials, HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+from datetime import datetime, timedelta
+from typing import Optional
+import hashlib
+import hmac
 import logging
+import os
+import secrets
 import ssl
+import threading
+import time
+import uuid
+
+from cache import CacheLRU, ler_cache, gravar_cache
+from metrics import registrar_cache_autenticacao
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+router = APIRouter(prefix="/auth")
+
 security = HTTPBasic()
+bearer = HTTPBearer(auto_error=False)
 
+# Configurar para o AD do IFSP
+LDAP_SERVER = os.getenv("LDAP_SERVER", "ad.ifsp.edu.br")
+LDAP_BASE_DN = os.getenv("LDAP_BASE_DN", "DC=ifsp,DC=edu,DC=br")
+LDAP_USER_FORMAT = os.getenv("LDAP_USER_FORMAT", "{username}@ifsp.edu.br")
+LDAP_BIND_USER = os.getenv("LDAP_BIND_USER", "")
+LDAP_BIND_PASSWORD = os.getenv("LDAP_BIND_PASSWORD", "")
+LDAP_POOL_SIZE = int(os.getenv("LDAP_POOL_SIZE", 5))
+LDAP_POOL_LIFETIME = int(os.getenv("LDAP_POOL_LIFETIME", 3600))
+LDAP_CACHE_TTL = float(os.getenv("LDAP_CACHE_TTL", 300))
+LDAP_CACHE_MAX = int(os.getenv("LDAP_CACHE_MAX", 1000))
 
-def authenticate_ad(credentials: HTTPBasicCredentials = Depends(security)):
-    try:
-        # Configurar para o AD do IFSP
-        ldap_server_url = "ad.ifsp.edu.br"
-        ldap_base_dn = "DC=ifsp,DC=edu,DC=br"
+# Tokens de sessão (JWT assinado com HMAC)
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+TOKEN_REVOGACAO = os.getenv("TOKEN_REVOGACAO", "true").lower() == "true"
+
+if not SECRET_KEY:
+    # Uma chave aleatória por processo: o token emitido por um worker seria
+    # recusado (401) pelos demais
+    if int(os.getenv("WEB_CONCURRENCY", 1)) > 1:
+        raise RuntimeError("SECRET_KEY não configurada: obrigatória com mais de um worker")
+    logger.warning("SECRET_KEY não configurada - usando chave aleatória (tokens inválidos após reinícios)")
+    SECRET_KEY = secrets.token_urlsafe(32)
+
+ATRIBUTOS_USUARIO = ['displayName', 'mail', 'department', 'cn', 'givenName', 'sn']
+
+
+def _primeiro_valor(atributos: dict, nome: str) -> Optional[str]:
+    valor = atributos.get(nome)
+    if isinstance(valor, list):
+        valor = valor[0] if valor else None
+    return str(valor) if valor else None
+
+
+class DiretorioLDAP:
+    """Acesso ao Active Directory com pool de conexões e cache de autenticação
+
+    O bind com a senha do usuário só acontece em falhas de cache. A busca dos
+    dados do usuário usa uma conexão de serviço compartilhada (estratégia
+    REUSABLE do ldap3) quando LDAP_BIND_USER está configurado.
+    """
+
+    def __init__(
+        self,
+        servidor: Server,
+        base_dn: str,
+        formato_usuario: str = LDAP_USER_FORMAT,
+        bind_usuario: str = LDAP_BIND_USER,
+        bind_senha: str = LDAP_BIND_PASSWORD,
+        estrategia_usuario=SYNC,
+        estrategia_servico=REUSABLE,
+        cache_ttl: float = LDAP_CACHE_TTL,
+        cache_max: int = LDAP_CACHE_MAX
+    ):
+        self.servidor = servidor
+        self.base_dn = base_dn
+        self.formato_usuario = formato_usuario
+        self.bind_usuario = bind_usuario
+        self.bind_senha = bind_senha
+        self.estrategia_usuario = estrategia_usuario
+        self.estrategia_servico = estrategia_servico
+        self.cache = CacheLRU(tamanho_maximo=cache_max, ttl=cache_ttl)
+        # Sal aleatório por processo: as senhas nunca ficam em memória em claro
+        self._sal = os.urandom(32)
+        self._conexao_servico: Optional[Connection] = None
+        self._lock = threading.Lock()
+
+    def _chave_cache(self, username: str, password: str) -> str:
+        digest = hmac.new(self._sal, password.encode(), hashlib.sha256).hexdigest()
+        return f"{username.lower()}:{digest}"
 
-        # Tenta conectar com start_tls
-        tls_config = Tls(validate=ssl.CERT_NONE, version=ssl.PROTOCOL_TLSv1_2)
-        server = Server(ldap_server_url, get_info=ALL,
-                        use_ssl=True, tls=tls_config)
+    def _obter_conexao_servico(self) -> Optional[Connection]:
+        """Conexão de serviço compartilhada, criada na primeira utilização"""
+        if not self.bind_usuario:
+            return None
 
-        # Formato do usuário para bind
-        user_dn = f"{credentials.username}@ifsp.edu.br"
+        with self._lock:
+            if self._conexao_servico is None:
+                opcoes = {}
+                if self.estrategia_servico == REUSABLE:
+                    opcoes = {"pool_size": LDAP_POOL_SIZE,
+                              "pool_lifetime": LDAP_POOL_LIFETIME}
+                conexao = Connection(
+                    self.servidor,
+                    user=self.bind_usuario,
+                    password=self.bind_senha,
+                    client_strategy=self.estrategia_servico,
+                    raise_exceptions=True,
+                    **opcoes
+                )
+                conexao.bind()
+                self._conexao_servico = conexao
+            return self._conexao_servico
+
+    @staticmethod
+    def _pesquisar(conn: Connection, **kwargs) -> list:
+        resultado = conn.search(**kwargs)
+        if conn.strategy.sync:
+            return list(conn.response or [])
+        # Estratégias assíncronas (REUSABLE) retornam o id da mensagem
+        response, _ = conn.get_response(resultado)
+        return list(response or [])
+
+    def autenticar(self, username: str, password: str) -> Optional[dict]:
+        """Autentica o usuário e retorna seus dados (None se não encontrado)
+
+        Lança as exceções de bind do ldap3 quando as credenciais são inválidas.
+        """
+        chave = self._chave_cache(username, password)
+        user_info = self.cache.obter(chave)
+        registrar_cache_autenticacao(user_info is not None)
+        if user_info is not None:
+            return user_info
 
         # Inicializar conexão LDAP
-        # auto_bind=True tenta fazer o bind (autenticação) imediatamente
         conn = Connection(
-            server,
-            user=user_dn,
-            password=credentials.password,
-            auto_bind=True,
+            self.servidor,
+            user=self.formato_usuario.format(username=username),
+            password=password,
+            client_strategy=self.estrategia_usuario,
             raise_exceptions=True  # Importante para capturar erros
         )
 
-        logger.info(
-            f"Autenticação bem-sucedida para o usuário: {credentials.username}")
+        try:
+            # Bind explícito (autenticação) em vez de auto_bind, que as
+            # estratégias MOCK do ldap3 usadas nos testes ignoram
+            conn.bind()
+            logger.info("Autenticação bem-sucedida para o usuário: %s", username)
 
-        # Buscar informações adicionais do usuário
-        search_filter = f"(sAMAccountName={credentials.username})"
-        attributes = ['displayName', 'mail',
-                      'department', 'cn', 'givenName', 'sn']
+            # Buscar informações adicionais do usuário
+            conn_busca = self._obter_conexao_servico() or conn
+            entradas = [
+                r for r in self._pesquisar(
+                    conn_busca,
+                    search_base=self.base_dn,
+                    search_filter=f"(sAMAccountName={escape_filter_chars(username)})",
+                    attributes=ATRIBUTOS_USUARIO
+                )
+                if r.get("type") == "searchResEntry"
+            ]
+        finally:
+            # Também fecha o socket de um bind recusado
+            if not conn.closed:
+                conn.unbind()
+
+        if not entradas:
+            return None
+
+        # Extrair dados do usuário do primeiro resultado
+        atributos = entradas[0].get("attributes", {})
+        nome_composto = " ".join(filter(None, [
+            _primeiro_valor(atributos, "givenName"), _primeiro_valor(atributos, "sn")]))
+
+        user_info = {
+            "username": username,
+            "nome": _primeiro_valor(atributos, "displayName") or _primeiro_valor(atributos, "cn") or nome_composto,
+            "email": _primeiro_valor(atributos, "mail") or f"{username}@ifsp.edu.br",
+            "setor": _primeiro_valor(atributos, "department") or "IFSP"
+        }
+
+        self.cache.definir(chave, user_info)
+        return user_info
+
+    def invalidar(self):
+        """Descarta todas as autenticações em cache"""
+        self.cache.limpar()
 
-        conn.search(
-            search_base=ldap_base_dn,
-            search_filter=search_filter,
-            attributes=attributes
-        )
+
+# Tenta conectar com start_tls
+tls_config = Tls(validate=ssl.CERT_NONE, version=ssl.PROTOCOL_TLSv1_2)
+diretorio = DiretorioLDAP(
+    Server(LDAP_SERVER, get_info=ALL, use_ssl=True, tls=tls_config),
+    LDAP_BASE_DN
+)
+
+
+def authenticate_ad(credentials: HTTPBasicCredentials = Depends(security)):
+    try:
+        user_info = diretorio.autenticar(
+            credentials.username, credentials.password)
 
         # Verificar se o usuário foi encontrado
-        if not conn.entries or len(conn.entries) == 0:
+        if user_info is None:
             logger.warning(
-                f"Usuário {credentials.username} autenticado, mas não encontrado no AD para buscar detalhes.")
+                "Usuário %s autenticado, mas não encontrado no AD para buscar detalhes.",
+                credentials.username)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Usuário não encontrado no diretório"
             )
 
-        # Extrair dados do usuário do primeiro resultado
-        user_entry = conn.entries[0]
-
-        user_info = {
-            "username": credentials.username,
-            "nome": str(user_entry.displayName or user_entry.cn or f"{user_entry.givenName} {user_entry.sn}"),
-            "email": str(user_entry.mail or f"{credentials.username}@ifsp.edu.br"),
-            "setor": str(user_entry.department or "IFSP")
-        }
-
         return user_info
 
+    except HTTPException:
+        raise
     except (LDAPInvalidCredentialsResult, LDAPBindError):
         logger.warning(
-            f"Credenciais inválidas para o usuário: {credentials.username}")
+            "Credenciais inválidas para o usuário: %s", credentials.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais inválidas",
             headers={"WWW-Authenticate": "Basic"},
         )
     except LDAPSocketOpenError as e:
-        logger.error(f"Servidor LDAP indisponível: {e}")
+        logger.error("Servidor LDAP indisponível: %s", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Servidor de autenticação indisponível"
         )
     except Exception as e:
-        logger.error(f"Erro inesperado na autenticação: {e}")
+        logger.error("Erro inesperado na autenticação: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro interno do servidor durante a autenticação"
         )
-    finally:
-        # Garante que a conexão seja fechada se foi estabelecida
-        if 'conn' in locals() and conn.bound:
-            conn.unbind()
+
+
+def criar_token(user_info: dict) -> dict:
+    """Emite um token de acesso assinado com os dados do usuário"""
+    agora = datetime.utcnow()
+    expira_em = agora + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = {
+        "sub": user_info["username"],
+        "nome": user_info["nome"],
+        "email": user_info["email"],
+        "setor": user_info["setor"],
+        "iat": agora,
+        "exp": expira_em,
+        "jti": uuid.uuid4().hex
+    }
+    return {
+        "access_token": jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+
+def _credenciais_invalidas(detalhe: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detalhe,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decodificar_token(token: str) -> dict:
+    """Valida assinatura e expiração do token e retorna suas claims"""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _credenciais_invalidas("Token inválido ou expirado")
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)
+) -> dict:
+    """Obtém o usuário do token de sessão, sem consultar o AD"""
+    if credentials is None:
+        raise _credenciais_invalidas("Token de acesso ausente")
+
+    claims = decodificar_token(credentials.credentials)
+
+    if TOKEN_REVOGACAO and await ler_cache(f"token:revogado:{claims['jti']}"):
+        raise _credenciais_invalidas("Token revogado")
+
+    return {
+        "username": claims["sub"],
+        "nome": claims["nome"],
+        "email": claims["email"],
+        "setor": claims["setor"],
+        "jti": claims["jti"],
+        "exp": claims["exp"]
+    }
+
+
+@router.post("/login")
+async def login(user: dict = Depends(authenticate_ad)):
+    """Autentica no AD uma única vez e emite um token de sessão"""
+    logger.info("Token emitido para o usuário: %s", user["username"])
+    return criar_token(user)
+
+
+@router.post("/logout")
+async def logout(user: dict = Depends(get_current_user)):
+    """Revoga o token atual até a sua expiração"""
+    ttl = int(user["exp"] - time.time())
+    if ttl > 0:
+        await gravar_cache(f"token:revogado:{user['jti']}", ttl, "1")
+    return {"message": "Sessão encerrada"}
@@ -0,0 +1,82 @@
+# benchmarks/cache_http.py - Cache HTTP: cabeçalhos, 304 condicional e carga com e sem o nginx
+#   docker-compose up -d
+#   cd backend && python -m benchmarks.cache_http --borda http://localhost --backend http://localhost:8000
+#
+# 1. Confere Cache-Control, ETag e Vary nos GETs públicos e o 304 com If-None-Match.
+# 2. Confere que o nginx (proxy_cache) responde HIT na segunda leitura.
+# 3. Dispara a mesma carga direto no backend e pelo nginx e compara, pela
+#    métrica http_requisicao_duracao_segundos do backend, quantas
+#    requisições por segundo chegaram ao Python em cada caso.
+import sys
+import asyncio
+import argparse
+
+import httpx
+
+from benchmarks.comum import disparar, imprimir
+
+METRICA_REQUISICOES = "http_requisicao_duracao_segundos_count"
+
+
+async def requisicoes_backend(client: httpx.AsyncClient, backend: str) -> float:
+    """Total de requisições atendidas pelo backend (todos os workers)"""
+    texto = (await client.get(f"{backend}/api/v1/metrics")).text
+    return sum(float(linha.rsplit(" ", 1)[1]) for linha in texto.splitlines()
+               if linha.startswith(METRICA_REQUISICOES))
+
+
+async def conferir_cabecalhos(client: httpx.AsyncClient, url: str) -> bool:
+    resposta = await client.get(url)
+    etag = resposta.headers.get("etag")
+    condicional = await client.get(url, headers={"If-None-Match": etag or ""})
+    ok = (resposta.status_code == 200 and etag and condicional.status_code == 304
+          and "cache-control" in resposta.headers and "vary" in resposta.headers)
+    print(f"{'OK ' if ok else 'ERRO'} {url}\n"
+          f"     Cache-Control: {resposta.headers.get('cache-control')} | ETag: {etag} | "
+          f"Vary: {resposta.headers.get('vary')} | If-None-Match -> {condicional.status_code}")
+    return bool(ok)
+
+
+async def conferir_borda(client: httpx.AsyncClient, url: str) -> bool:
+    await client.get(url)
+    segunda = (await client.get(url)).headers.get("x-cache-status")
+    ok = segunda in ("HIT", "STALE", "UPDATING", "REVALIDATED")
+    print(f"{'OK ' if ok else 'ERRO'} {url}\n     X-Cache-Status na segunda leitura: {segunda}")
+    return ok
+
+
+async def main(args):
+    async with httpx.AsyncClient(timeout=30, limits=httpx.Limits(
+            max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)) as client:
+        primeiro = (await client.get(f"{args.backend}/api/v1/conhecimentos?limite=1")).json()
+        caminhos = ["/api/v1/conhecimentos", "/api/v1/estatisticas"]
+        if primeiro:
+            caminhos.append(f"/api/v1/conhecimentos/{primeiro[0]['id']}")
+
+        print("Cabeçalhos e requisições condicionais (backend)")
+        ok = all([await conferir_cabecalhos(client, args.backend + c) for c in caminhos])
+        print("\nCache do nginx")
+        ok = all([await conferir_borda(client, args.borda + c) for c in caminhos[:2]]) and ok
+
+        resultados = {}
+        for nome, base in (("direto no backend", args.backend), ("pelo nginx", args.borda)):
+            antes = await requisicoes_backend(client, args.backend)
+            carga = await disparar(client, [base + c for c in caminhos], args.total,
+                                   args.concorrencia, contar_cabecalho="x-cache-status")
+            no_backend = await requisicoes_backend(client, args.backend) - antes - 1
+            resultados[nome] = carga.latencias
+            print(f"\n{nome}: {carga.por_segundo:.0f} req/s no cliente, "
+                  f"{no_backend / carga.duracao:.0f} req/s chegaram ao backend "
+                  f"({no_backend:.0f} de {len(carga.latencias)}); status {dict(carga.status)}; "
+                  f"X-Cache-Status {dict(carga.cabecalho)}")
+        imprimir("Latência no cliente", resultados)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache HTTP com e sem o nginx")
+    parser.add_argument("--borda", default="http://localhost", help="URL do nginx")
+    parser.add_argument("--backend", default="http://localhost:8000", help="URL do backend")
+    parser.add_argument("--total", type=int, default=5000)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
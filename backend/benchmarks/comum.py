@@ -0,0 +1,86 @@
+# benchmarks/comum.py - Medição e relatório compartilhados pelos benchmarks
+import time
+import asyncio
+import statistics
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+
+def percentil(amostras: List[float], p: float) -> float:
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+def resumo(amostras: List[float]) -> Dict[str, float]:
+    """Mediana, p95, p99 e máximo, em milissegundos"""
+    return {
+        "mediana": statistics.median(amostras) * 1000,
+        "p95": percentil(amostras, 95) * 1000,
+        "p99": percentil(amostras, 99) * 1000,
+        "max": max(amostras) * 1000,
+    }
+
+
+async def cronometrar(funcao: Callable[[], Awaitable], repeticoes: int) -> List[float]:
+    """Executa a corrotina repetidas vezes e devolve as durações (s)"""
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await funcao()
+        amostras.append(time.perf_counter() - inicio)
+    return amostras
+
+
+def imprimir(titulo: str, linhas: Dict[str, List[float]]):
+    """Tabela com uma linha por cenário"""
+    print(f"\n{titulo}")
+    print(f"{'cenário':<36}{'n':>6}{'mediana':>11}{'p95':>11}{'p99':>11}{'max':>11}  (ms)")
+    for nome, amostras in linhas.items():
+        r = resumo(amostras)
+        print(f"{nome:<36}{len(amostras):>6}{r['mediana']:>11.2f}{r['p95']:>11.2f}"
+              f"{r['p99']:>11.2f}{r['max']:>11.2f}")
+
+
+@dataclass
+class Carga:
+    """Resultado de uma rodada de requisições HTTP"""
+    duracao: float = 0.0
+    latencias: List[float] = field(default_factory=list)
+    status: Counter = field(default_factory=Counter)
+    cabecalho: Counter = field(default_factory=Counter)
+
+    @property
+    def por_segundo(self) -> float:
+        return len(self.latencias) / self.duracao if self.duracao else 0.0
+
+
+async def disparar(
+    client,
+    urls: Sequence[str],
+    total: int,
+    concorrencia: int,
+    headers: Optional[Dict[str, str]] = None,
+    contar_cabecalho: Optional[str] = None
+) -> Carga:
+    """Faz total GETs (percorrendo as urls) com concorrencia requisições simultâneas
+
+    client é um httpx.AsyncClient; contar_cabecalho conta os valores de um
+    cabeçalho da resposta (ex.: X-Cache-Status do nginx).
+    """
+    carga = Carga()
+    proxima = iter(range(total))
+
+    async def trabalhar():
+        for i in proxima:
+            inicio = time.perf_counter()
+            resposta = await client.get(urls[i % len(urls)], headers=headers)
+            carga.latencias.append(time.perf_counter() - inicio)
+            carga.status[resposta.status_code] += 1
+            if contar_cabecalho:
+                carga.cabecalho[resposta.headers.get(contar_cabecalho, "-")] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhar() for _ in range(concorrencia)))
+    carga.duracao = time.perf_counter() - inicio
+    return carga
@@ -0,0 +1,137 @@
+# benchmarks/escalonamento.py - Vazão por número de workers do gunicorn e conexões do Postgres
+#   cd backend && python -m benchmarks.escalonamento --workers 1 2 4 8 --total 20000
+#
+# Para cada número de workers: sobe o gunicorn (gunicorn.conf.py) com
+# WEB_CONCURRENCY=W, dispara a carga a partir de vários processos clientes
+# e registra req/s, a eficiência em relação a 1 worker, o pool por worker
+# calculado pelo database.py e o pico de conexões abertas no Postgres.
+# Rode em uma máquina com núcleos livres para os clientes (ou aponte
+# --url para outra máquina) e com o banco migrado em DATABASE_URL.
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks.comum import disparar, resumo
+from database import engine
+
+SCRIPT_POOL = "import database as d; print(d.DB_POOL_SIZE, d.DB_MAX_OVERFLOW, d.DB_MAX_CONEXOES)"
+
+
+def pool_por_worker(workers: int):
+    """(pool_size, max_overflow, DB_MAX_CONEXOES) como cada worker calcularia"""
+    saida = subprocess.run(
+        [sys.executable, "-c", SCRIPT_POOL], capture_output=True, text=True, check=True,
+        env={**os.environ, "WEB_CONCURRENCY": str(workers), "LOG_LEVEL": "ERROR"})
+    return tuple(int(v) for v in saida.stdout.split()[-3:])
+
+
+def _cliente(urls, total, concorrencia):
+    async def rodar():
+        limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+        async with httpx.AsyncClient(timeout=60, limits=limites) as client:
+            carga = await disparar(client, urls, total, concorrencia)
+        return carga.duracao, carga.latencias, dict(carga.status)
+    return asyncio.run(rodar())
+
+
+async def conexoes_abertas() -> int:
+    async with engine.connect() as conn:
+        # Desconta a própria conexão de monitoramento
+        return await conn.scalar(text(
+            "SELECT count(*) - 1 FROM pg_stat_activity WHERE datname = current_database()"))
+
+
+async def medir_pico(parar: asyncio.Event) -> int:
+    pico = 0
+    while not parar.is_set():
+        pico = max(pico, await conexoes_abertas())
+        await asyncio.sleep(0.1)
+    return pico
+
+
+def subir_gunicorn(workers: int, porta: int) -> subprocess.Popen:
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py",
+         "--bind", f"127.0.0.1:{porta}"],
+        env={"SECRET_KEY": "escalonamento", **os.environ,
+             "WEB_CONCURRENCY": str(workers), "LOG_LEVEL": "WARNING"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(120):
+        try:
+            if httpx.get(f"http://127.0.0.1:{porta}/health", timeout=1).status_code < 500:
+                return processo
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    processo.kill()
+    raise RuntimeError(f"gunicorn com {workers} workers não respondeu")
+
+
+async def rodada(args, workers: int, executor: ProcessPoolExecutor):
+    processo = subir_gunicorn(workers, args.porta)
+    try:
+        urls = [f"http://127.0.0.1:{args.porta}{args.caminho}"]
+        loop = asyncio.get_running_loop()
+        # Aquecimento: conexões do pool e caches de cada worker
+        await loop.run_in_executor(executor, _cliente, urls, args.total // 10, args.concorrencia)
+
+        parar = asyncio.Event()
+        monitor = asyncio.create_task(medir_pico(parar))
+        por_cliente = args.total // args.clientes
+        resultados = await asyncio.gather(*(
+            loop.run_in_executor(executor, _cliente, urls, por_cliente, args.concorrencia)
+            for _ in range(args.clientes)))
+        parar.set()
+        pico = await monitor
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        processo.wait(timeout=60)
+
+    duracao = max(r[0] for r in resultados)
+    latencias = [latencia for r in resultados for latencia in r[1]]
+    erros = sum(n for r in resultados for status, n in r[2].items() if status >= 500)
+    return len(latencias) / duracao, resumo(latencias)["p99"], erros, pico
+
+
+async def main(args):
+    async with engine.connect() as conn:
+        max_connections = int(await conn.scalar(text("SHOW max_connections")))
+    await engine.dispose()
+
+    print(f"Postgres max_connections={max_connections}; carga: {args.total} GETs {args.caminho}, "
+          f"{args.clientes} clientes x {args.concorrencia} conexões")
+    print(f"{'workers':>8}{'req/s':>10}{'x 1 worker':>12}{'eficiência':>12}{'p99 ms':>9}"
+          f"{'erros 5xx':>11}{'pool/worker':>13}{'máx. conexões':>15}{'pico':>7}")
+
+    base = None
+    with ProcessPoolExecutor(max_workers=args.clientes) as executor:
+        for workers in args.workers:
+            pool, overflow, orcamento = pool_por_worker(workers)
+            por_segundo, p99, erros, pico = await rodada(args, workers, executor)
+            base = base or por_segundo / workers
+            aceleracao = por_segundo / base
+            print(f"{workers:>8}{por_segundo:>10.0f}{aceleracao:>12.2f}{aceleracao / workers:>12.0%}"
+                  f"{p99:>9.1f}{erros:>11}{f'{pool}+{overflow}':>13}"
+                  f"{f'{(pool + overflow) * workers}/{orcamento}':>15}{pico:>7}")
+            if (pool + overflow) * workers > min(orcamento, max_connections):
+                print("         AVISO: os pools podem exceder DB_MAX_CONEXOES/max_connections")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escalonamento por número de workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    parser.add_argument("--caminho", default="/api/v1/conhecimentos?limite=20")
+    parser.add_argument("--total", type=int, default=20000)
+    parser.add_argument("--clientes", type=int, default=4, help="processos geradores de carga")
+    parser.add_argument("--concorrencia", type=int, default=32, help="conexões por cliente")
+    parser.add_argument("--porta", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+# benchmarks/importacao.py - Importação via COPY x inserção linha a linha, e exportação
+#   cd backend && python -m benchmarks.importacao --registros 100000 --linha-a-linha 2000
+#
+# Gera registros sintéticos em NDJSON e mede transferencia.importar (lotes
+# com COPY), a inserção pelo ORM com um commit por linha (como a API grava
+# um conhecimento) e o stream de exportação da base inteira. Os registros
+# usam o autor AUTOR e são apagados ao final; rode em um banco de teste,
+# pois a carga infla tabelas, índices e estatísticas do banco.
+import io
+import time
+import random
+import asyncio
+import argparse
+
+import orjson
+from sqlalchemy import delete, func, select
+
+from database import SessionLocal, engine
+from models import Conhecimento
+from tags import TagDetector
+from transferencia import COLUNAS, exportar, importar, validar_registro
+
+AUTOR = "benchmark-importacao"
+
+PALAVRAS = ("dispensa", "pregão", "licitação", "contrato", "aditivo", "garantia",
+            "edital", "habilitação", "recurso", "impugnação", "valor", "limite")
+
+
+def gerar_registros(total: int, semente: int = 1):
+    aleatorio = random.Random(semente)
+
+    def frase(n):
+        return " ".join(aleatorio.choice(PALAVRAS) for _ in range(n))
+
+    for i in range(total):
+        yield {
+            "titulo": f"{frase(5)} {i}",
+            "pergunta": frase(30),
+            "resposta": frase(120),
+            "modalidade": "dispensa_eletronica",
+            "fase": "contratacao",
+            "tags": aleatorio.sample(PALAVRAS[:6], 2),
+            "autor": AUTOR,
+            "visualizacoes": aleatorio.randrange(500),
+        }
+
+
+def ndjson(total: int) -> io.StringIO:
+    return io.StringIO("".join(
+        orjson.dumps(registro).decode() + "\n" for registro in gerar_registros(total)))
+
+
+async def inserir_linha_a_linha(total: int, detector: TagDetector):
+    """Caminho anterior: um INSERT e um commit por registro"""
+    async with SessionLocal() as db:
+        for registro in gerar_registros(total, semente=2):
+            valores = validar_registro(registro)
+            valores["tags_automaticas"] = detector.detectar_tags(
+                f"{valores['titulo']} {valores['pergunta']} {valores['resposta']}")
+            db.add(Conhecimento(**valores))
+            await db.commit()
+
+
+async def medir_exportacao():
+    linhas = tamanho = 0
+    async for bloco in exportar("ndjson"):
+        linhas += bloco.count(b"\n")
+        tamanho += len(bloco)
+    return linhas, tamanho
+
+
+async def limpar():
+    async with SessionLocal() as db:
+        await db.execute(delete(Conhecimento).where(Conhecimento.autor == AUTOR))
+        await db.commit()
+
+
+async def main(args):
+    async with SessionLocal() as db:
+        if await db.scalar(select(func.count()).where(Conhecimento.autor == AUTOR)):
+            raise SystemExit(f"Há registros de '{AUTOR}' de uma execução anterior; apague-os antes")
+        detector = TagDetector()
+        await detector.atualizar(db)
+
+    arquivo = ndjson(args.registros)
+    print(f"{args.registros} registros sintéticos ({len(arquivo.getvalue()) / 1e6:.1f} MB de NDJSON), "
+          f"{len(COLUNAS)} colunas")
+    print(f"{'cenário':<32}{'registros':>11}{'segundos':>10}{'registros/s':>13}")
+
+    def linha(nome, registros, segundos):
+        print(f"{nome:<32}{registros:>11}{segundos:>10.2f}{registros / segundos:>13.0f}")
+
+    try:
+        inicio = time.perf_counter()
+        importados, rejeitados = await importar(arquivo, "ndjson", args.lote, detector)
+        linha(f"COPY (lotes de {args.lote})", importados, time.perf_counter() - inicio)
+        if rejeitados:
+            print(f"  {rejeitados} registros rejeitados")
+
+        if args.linha_a_linha:
+            inicio = time.perf_counter()
+            await inserir_linha_a_linha(args.linha_a_linha, detector)
+            linha("ORM, um commit por linha", args.linha_a_linha, time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        linhas, tamanho = await medir_exportacao()
+        linha(f"exportação NDJSON ({tamanho / 1e6:.0f} MB)", linhas, time.perf_counter() - inicio)
+    finally:
+        await limpar()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importação em lote x linha a linha")
+    parser.add_argument("--registros", type=int, default=100000)
+    parser.add_argument("--linha-a-linha", type=int, default=2000,
+                        help="registros inseridos um a um (0 para pular)")
+    parser.add_argument("--lote", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+# benchmarks/inicializacao.py - Tempo de inicialização de um worker
+#   cd backend && python -m benchmarks.inicializacao --repeticoes 20
+#
+# Compara a verificação de versão do schema (inicialização atual) com o
+# create_all que cada worker executava antes, ambos com conexão nova, e mede
+# o import do módulo main e o lifespan completo. Exige o banco migrado
+# (alembic upgrade head) em DATABASE_URL.
+import sys
+import asyncio
+import argparse
+import subprocess
+
+from sqlalchemy import text
+
+from benchmarks.comum import cronometrar, imprimir
+from database import engine, verificar_schema
+from models import Base
+
+SCRIPT_IMPORT = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def medir_import(repeticoes: int):
+    """Import do main em um processo novo (o que cada worker paga ao subir)"""
+    return [float(subprocess.run(
+        [sys.executable, "-c", SCRIPT_IMPORT], capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]) for _ in range(repeticoes)]
+
+
+async def main(repeticoes: int, lifespan: bool):
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1 FROM alembic_version"))
+
+    async def com_conexao_nova(corrotina):
+        await engine.dispose()
+        await corrotina()
+
+    async def create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    resultados = {
+        "verificar_schema (atual)": await cronometrar(
+            lambda: com_conexao_nova(verificar_schema), repeticoes),
+        "create_all (anterior)": await cronometrar(
+            lambda: com_conexao_nova(create_all), repeticoes),
+    }
+
+    if lifespan:
+        from main import app, lifespan as ciclo_de_vida
+
+        async def subir_e_parar():
+            async with ciclo_de_vida(app):
+                pass
+
+        resultados["lifespan completo (subir e parar)"] = await cronometrar(
+            subir_e_parar, max(repeticoes // 4, 1))
+
+    await engine.dispose()
+    resultados["import main (processo novo)"] = medir_import(max(repeticoes // 4, 1))
+    imprimir("Inicialização de um worker", resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--sem-lifespan", action="store_true",
+                        help="não mede o lifespan completo (workers, Redis, índices)")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeticoes, not args.sem_lifespan))
@@ -0,0 +1,105 @@
+# benchmarks/respostas.py - Listagem: response_model do FastAPI x bytes orjson pré-serializados
+#   cd backend && python -m benchmarks.respostas --itens 20 100 --repeticoes 2000
+#
+# Sem banco e sem Redis: o cache é um dicionário e as linhas do banco são
+# objetos com atributos, para medir só o custo de serializar a página.
+# Compara, pela mesma pilha ASGI do FastAPI, o caminho antigo de
+# listar_conhecimentos (hit: json.loads do cache e validação/serialização
+# pelo response_model; miss: from_orm, jsonable_encoder + json.dumps para o
+# cache e de novo o response_model) com o atual (hit: os bytes do cache
+# direto na resposta; miss: uma serialização com orjson).
+import json
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.comum import cronometrar, imprimir
+from respostas import resposta_json, serializar
+from schemas import ConhecimentoResponse
+
+PALAVRAS = ("dispensa", "pregão", "licitação", "contrato", "aditivo", "garantia", "edital",
+            "habilitação", "recurso", "impugnação", "valor", "limite", "prazo", "multa")
+
+
+def linhas(total: int, aleatorio: random.Random) -> List[SimpleNamespace]:
+    """Linhas com as colunas da listagem, como as devolvidas por consultar_conhecimentos"""
+    agora = datetime(2024, 1, 1)
+
+    def texto(n: int) -> str:
+        return " ".join(aleatorio.choice(PALAVRAS) for _ in range(n))
+
+    return [SimpleNamespace(
+        id=i, titulo=texto(8), pergunta=texto(60), resposta=texto(200),
+        modalidade="pregao", fase="planejamento",
+        tags=aleatorio.sample(PALAVRAS, 3), tags_automaticas=aleatorio.sample(PALAVRAS, 2),
+        autor="Servidor", campus="Reitoria", data_criacao=agora - timedelta(hours=i),
+        votos_positivos=aleatorio.randint(0, 50), votos_negativos=aleatorio.randint(0, 5),
+        visualizacoes=aleatorio.randint(0, 1000), pontuacao=aleatorio.randint(0, 45),
+        status="validado", validado_por="Coordenação", data_validacao=agora,
+    ) for i in range(1, total + 1)]
+
+
+def criar_app(pagina: List[SimpleNamespace]) -> FastAPI:
+    app = FastAPI()
+    cache_antigo, cache_atual = {}, {}
+
+    @app.get("/antigo/{modo}", response_model=List[ConhecimentoResponse])
+    async def antigo(modo: str):
+        if modo == "hit" and "pagina" in cache_antigo:
+            return json.loads(cache_antigo["pagina"])["itens"]
+        response = [ConhecimentoResponse.from_orm(c) for c in pagina]
+        cache_antigo["pagina"] = json.dumps(
+            {"itens": jsonable_encoder(response), "next_cursor": None})
+        return response
+
+    @app.get("/atual/{modo}")
+    async def atual(request: Request, modo: str):
+        if modo == "hit" and "pagina" in cache_atual:
+            return resposta_json(request, cache_atual["pagina"])
+        corpo = serializar([
+            ConhecimentoResponse.from_orm(c).model_dump(mode="json") for c in pagina])
+        cache_atual["pagina"] = corpo
+        return resposta_json(request, corpo)
+
+    return app
+
+
+async def medir(itens: int, repeticoes: int):
+    pagina = linhas(itens, random.Random(itens))
+    transporte = httpx.ASGITransport(app=criar_app(pagina))
+    async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as client:
+        # Os dois caminhos devem devolver o mesmo JSON
+        antigo = (await client.get("/antigo/miss")).json()
+        atual = (await client.get("/atual/miss")).json()
+        if antigo != atual:
+            raise SystemExit("ERRO: as respostas dos dois caminhos diferem")
+        tamanho = len((await client.get("/atual/hit")).content)
+
+        resultados = {}
+        for modo in ("hit", "miss"):
+            for caminho in ("antigo", "atual"):
+                url = f"/{caminho}/{modo}"
+                await cronometrar(lambda: client.get(url), repeticoes // 10)
+                nome = f"{modo} {'response_model' if caminho == 'antigo' else 'bytes orjson'}"
+                resultados[nome] = await cronometrar(lambda: client.get(url), repeticoes)
+    imprimir(f"Página com {itens} itens ({tamanho / 1024:.0f} KiB)", resultados)
+
+
+async def main(args):
+    for itens in args.itens:
+        await medir(itens, args.repeticoes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serialização da listagem de conhecimentos")
+    parser.add_argument("--itens", type=int, nargs="+", default=[20, 100],
+                        help="tamanhos de página")
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+# benchmarks/similaridade.py - Latência do índice de similaridade com N conhecimentos
+#   cd backend && python -m benchmarks.similaridade --conhecimentos 100000
+#
+# Mede, sem banco, o tempo que o event loop fica ocupado ao criar um
+# conhecimento (adicionar na matriz auxiliar x o vstack da matriz inteira,
+# como era antes), as consultas com a auxiliar vazia e cheia e a mescla,
+# que roda em uma thread.
+import time
+import random
+import asyncio
+import argparse
+
+from scipy import sparse
+
+from benchmarks.comum import imprimir
+from similaridade import IndiceSimilaridade, SIMILARIDADE_BUFFER_MAX, vetorizar
+
+PALAVRAS = ("dispensa", "pregão", "licitação", "contrato", "aditivo", "garantia", "edital",
+            "habilitação", "recurso", "impugnação", "valor", "limite", "prazo", "multa",
+            "reajuste", "fiscal", "empenho", "estimativa", "cotação", "fornecedor")
+
+
+def textos(total: int, aleatorio: random.Random):
+    return [" ".join(aleatorio.choice(PALAVRAS) for _ in range(60)) + f" item{i}"
+            for i in range(total)]
+
+
+def amostrar(funcao, repeticoes: int):
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        amostras.append(time.perf_counter() - inicio)
+    return amostras
+
+
+async def main(args):
+    aleatorio = random.Random(1)
+    indice = IndiceSimilaridade(arquivo="/dev/null")
+    inicio = time.perf_counter()
+    vetores = vetorizar(textos(args.conhecimentos, aleatorio))
+    print(f"{args.conhecimentos} conhecimentos vetorizados em {time.perf_counter() - inicio:.1f} s")
+    await indice.mesclar(vetores, list(range(1, args.conhecimentos + 1)))
+
+    consultas = textos(args.repeticoes, aleatorio)
+    resultados = {}
+
+    pendentes = iter(consultas)
+    resultados["consulta, auxiliar vazia"] = amostrar(
+        lambda: indice.similares(next(pendentes)), args.repeticoes)
+
+    # Criações: o que o event loop paga por conhecimento novo
+    novos = iter(enumerate(textos(SIMILARIDADE_BUFFER_MAX - 1, aleatorio),
+                           start=args.conhecimentos + 1))
+    vetores_novos = [vetorizar([texto]) for _, texto in novos]
+    proximo = iter(range(len(vetores_novos)))
+
+    def adicionar():
+        i = next(proximo)
+        indice.adicionar([args.conhecimentos + 1 + i], [""], vetores_novos[i])
+    resultados["adicionar (matriz auxiliar)"] = amostrar(adicionar, len(vetores_novos))
+
+    matriz = indice._matriz
+    resultados["vstack da matriz inteira (antes)"] = amostrar(
+        lambda: sparse.vstack([matriz, vetores_novos[0]], format="csr"), min(args.repeticoes, 20))
+
+    pendentes = iter(consultas)
+    resultados["consulta, auxiliar cheia"] = amostrar(
+        lambda: indice.similares(next(pendentes)), args.repeticoes)
+    resultados["relacionados"] = amostrar(
+        lambda: indice.relacionados(aleatorio.randrange(1, args.conhecimentos)), args.repeticoes)
+
+    # Mescla: o vstack roda em uma thread; mede o total e o pior intervalo do loop
+    intervalos = []
+
+    async def batimento():
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.001)
+            intervalos.append(time.perf_counter() - inicio - 0.001)
+
+    monitor = asyncio.create_task(batimento())
+    inicio = time.perf_counter()
+    await indice.mesclar()
+    mescla = time.perf_counter() - inicio
+    monitor.cancel()
+    resultados["mescla (total, em thread)"] = [mescla]
+    resultados["loop bloqueado durante a mescla"] = intervalos or [0.0]
+
+    imprimir(f"Índice de similaridade com {args.conhecimentos} conhecimentos", resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência do índice de similaridade")
+    parser.add_argument("--conhecimentos", type=int, default=100000)
+    parser.add_argument("--repeticoes", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
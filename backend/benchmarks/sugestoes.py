@@ -0,0 +1,99 @@
+# benchmarks/sugestoes.py - Latência das sugestões da caixa de busca com N títulos
+#   cd backend && python -m benchmarks.sugestoes --titulos 200000
+#
+# Sem banco: faz a primeira carga (montada em uma thread), acrescenta um
+# lote e relê pesos como a sincronização, medindo o maior intervalo em que
+# o event loop ficou bloqueado em cada etapa, e mede a criação de um
+# conhecimento e a latência (p99) das sugestões por tamanho do prefixo.
+import time
+import random
+import asyncio
+import argparse
+from collections import namedtuple
+
+from benchmarks.comum import imprimir
+from sugestoes import IndiceSugestoes, LOTE_SINCRONIZACAO, normalizar_texto
+
+Linha = namedtuple("Linha", "id titulo tags_busca pontuacao visualizacoes")
+
+PALAVRAS = ("dispensa", "pregão", "licitação", "contrato", "aditivo", "garantia", "edital",
+            "habilitação", "recurso", "impugnação", "valor", "limite", "prazo", "multa",
+            "reajuste", "fiscal", "empenho", "estimativa", "cotação", "fornecedor")
+TAGS = [normalizar_texto(f"{a} {b}") for a in PALAVRAS for b in PALAVRAS[:5]]
+
+
+def gerar_linhas(inicio: int, total: int, aleatorio: random.Random):
+    return [Linha(id_, " ".join(aleatorio.choice(PALAVRAS) for _ in range(8)) + f" {id_}",
+                  aleatorio.sample(TAGS, 3), aleatorio.randrange(-5, 50), aleatorio.randrange(1000))
+            for id_ in range(inicio, inicio + total)]
+
+
+class Batimento:
+    """Atrasos do event loop (sleeps de 1 ms) enquanto uma etapa roda"""
+
+    def __init__(self):
+        self.intervalos = []
+
+    async def _bater(self):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.001)
+            self.intervalos.append(time.perf_counter() - inicio - 0.001)
+
+    async def medir(self, corrotina):
+        monitor = asyncio.create_task(self._bater())
+        inicio = time.perf_counter()
+        await corrotina
+        duracao = time.perf_counter() - inicio
+        monitor.cancel()
+        return duracao, self.intervalos or [0.0]
+
+
+async def main(args):
+    aleatorio = random.Random(1)
+    indice = IndiceSugestoes()
+    resultados = {}
+
+    duracao, bloqueios = await Batimento().medir(
+        indice._carregar(gerar_linhas(1, args.titulos, aleatorio)))
+    print(f"Primeira carga: {duracao:.1f} s em uma thread")
+    resultados["loop bloqueado: primeira carga"] = bloqueios
+
+    inicio = args.titulos + 1
+    duracao, bloqueios = await Batimento().medir(
+        indice._acrescentar(gerar_linhas(inicio, LOTE_SINCRONIZACAO, aleatorio)))
+    print(f"Lote de {LOTE_SINCRONIZACAO} novos: {duracao:.1f} s")
+    resultados["loop bloqueado: lote novo"] = bloqueios
+
+    alterados = [linha._replace(id=aleatorio.randrange(1, args.titulos))
+                 for linha in gerar_linhas(0, args.alterados, aleatorio)]
+    duracao, bloqueios = await Batimento().medir(indice._atualizar(alterados))
+    print(f"{args.alterados} pesos e tags relidos: {duracao:.2f} s")
+    resultados["loop bloqueado: pesos relidos"] = bloqueios
+
+    criacoes = []
+    for linha in gerar_linhas(inicio + LOTE_SINCRONIZACAO, 200, aleatorio):
+        comeco = time.perf_counter()
+        indice.adicionar(linha.id, linha.titulo, linha.tags_busca)
+        criacoes.append(time.perf_counter() - comeco)
+    resultados["adicionar (insort)"] = criacoes
+
+    for tamanho in (1, 2, 3, 5, 10):
+        amostras = []
+        for _ in range(args.repeticoes):
+            consulta = aleatorio.choice(PALAVRAS)[:tamanho]
+            comeco = time.perf_counter()
+            indice.sugerir(consulta)
+            amostras.append(time.perf_counter() - comeco)
+        resultados[f"sugerir, prefixo de {tamanho} letra(s)"] = amostras
+
+    imprimir(f"Sugestões com {len(indice)} títulos ({len(indice._chaves)} chaves, "
+             f"{len(indice._topo)} prefixos com lista)", resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência das sugestões")
+    parser.add_argument("--titulos", type=int, default=200000)
+    parser.add_argument("--alterados", type=int, default=5000, help="pesos relidos por ciclo")
+    parser.add_argument("--repeticoes", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,154 @@
+# backend/busca.py - Serviço de busca compartilhado (API REST e bot WhatsApp)
+import re
+import json
+import base64
+import unicodedata
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import Row, Select, func, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Conhecimento, CONFIG_BUSCA
+
+_ESPACOS = re.compile(r"\s+")
+
+# Colunas devolvidas pela listagem: tudo menos as colunas que só servem aos
+# filtros (as linhas não são hidratadas como objetos ORM)
+COLUNAS_LISTAGEM = tuple(
+    coluna for coluna in Conhecimento.__table__.columns
+    if coluna.name not in ("busca_vetor", "tags_busca"))
+
+# Combinação de várias tags: "todas" (AND, @>) ou "qualquer" (OR, &&)
+MODOS_TAGS = ("todas", "qualquer")
+
+
+def normalizar_consulta(texto: str) -> str:
+    """Normaliza a consulta: remove acentos, casefold e colapsa espaços"""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(" ", sem_acentos.casefold()).strip()
+
+
+def normalizar_tags(tags: Sequence[str]) -> List[str]:
+    """Normaliza as tags como a coluna tags_busca (sem acentos, minúsculas)"""
+    return sorted({t for t in map(normalizar_consulta, tags) if t})
+
+
+def _consulta_textual(busca: str):
+    return func.websearch_to_tsquery(literal_column(f"'{CONFIG_BUSCA}'::regconfig"), busca)
+
+
+def _aplicar_filtros(
+    query: Select,
+    busca: Optional[str],
+    modalidade: Optional[str],
+    fase: Optional[str],
+    status: Optional[str],
+    tags: Optional[Sequence[str]],
+    modo_tags: str
+) -> Select:
+    if modalidade:
+        query = query.where(Conhecimento.modalidade == modalidade)
+    if fase:
+        query = query.where(Conhecimento.fase == fase)
+    if status:
+        query = query.where(Conhecimento.status == status)
+
+    tags = normalizar_tags(tags or [])
+    if tags:
+        # Operadores de array atendidos pelo índice GIN em tags_busca
+        operador = "&&" if modo_tags == "qualquer" else "@>"
+        query = query.where(Conhecimento.tags_busca.op(operador)(tags))
+
+    if busca:
+        # Busca textual via índice GIN em busca_vetor
+        query = query.where(Conhecimento.busca_vetor.op("@@")(_consulta_textual(busca)))
+    return query
+
+
+def codificar_cursor(conhecimento: Row) -> str:
+    """Gera o cursor opaco da próxima página a partir do último item"""
+    dados = [conhecimento.pontuacao,
+             conhecimento.data_criacao.isoformat(), conhecimento.id]
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> Tuple[int, datetime, int]:
+    """Decodifica o cursor (lança ValueError se inválido)"""
+    try:
+        pontuacao, data_criacao, id_ = json.loads(
+            base64.urlsafe_b64decode(cursor.encode()))
+        return int(pontuacao), datetime.fromisoformat(data_criacao), int(id_)
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+
+
+async def consultar_conhecimentos(
+    db: AsyncSession,
+    busca: Optional[str] = None,
+    modalidade: Optional[str] = None,
+    fase: Optional[str] = None,
+    status: Optional[str] = None,
+    tags: Optional[Sequence[str]] = None,
+    modo_tags: str = "todas",
+    limite: int = 20,
+    offset: int = 0,
+    cursor: Optional[Tuple[int, datetime, int]] = None
+) -> List[Row]:
+    """Consulta conhecimentos com filtros, ordenados por relevância e votos
+
+    Sem busca textual, aceita um cursor (pontuacao, data_criacao, id) que
+    continua a listagem a partir do último item via índice de ordenação.
+    Retorna linhas com as colunas de COLUNAS_LISTAGEM.
+    """
+    query = _aplicar_filtros(
+        select(*COLUNAS_LISTAGEM), busca, modalidade, fase, status, tags, modo_tags)
+
+    ordenacao = [Conhecimento.pontuacao.desc(),
+                 Conhecimento.data_criacao.desc(), Conhecimento.id.desc()]
+
+    if cursor:
+        # Keyset: a comparação de tuplas segue o índice (pontuacao, data_criacao, id)
+        query = query.where(tuple_(
+            Conhecimento.pontuacao, Conhecimento.data_criacao, Conhecimento.id
+        ) < tuple_(*cursor))
+
+    if busca:
+        # ts_rank_cd normalizado (0..1) com bônus logarítmico pelos votos
+        relevancia = func.ts_rank_cd(Conhecimento.busca_vetor, _consulta_textual(busca), 32) * (
+            1 + func.ln(1 + func.greatest(Conhecimento.pontuacao, 0)))
+        ordenacao.insert(0, relevancia.desc())
+
+    result = await db.execute(
+        query.order_by(*ordenacao).offset(offset).limit(limite))
+    return list(result.all())
+
+
+async def contar_tags(
+    db: AsyncSession,
+    busca: Optional[str] = None,
+    modalidade: Optional[str] = None,
+    fase: Optional[str] = None,
+    status: Optional[str] = None,
+    tags: Optional[Sequence[str]] = None,
+    modo_tags: str = "todas",
+    limite: int = 50
+) -> List[dict]:
+    """Contagem de conhecimentos por tag sob os mesmos filtros da listagem
+
+    Uma única consulta agregada sobre unnest(tags_busca).
+    """
+    tags_filtradas = _aplicar_filtros(
+        select(func.unnest(Conhecimento.tags_busca).label("tag")),
+        busca, modalidade, fase, status, tags, modo_tags
+    ).subquery()
+
+    total = func.count().label("total")
+    result = await db.execute(
+        select(tags_filtradas.c.tag, total)
+        .group_by(tags_filtradas.c.tag)
+        .order_by(total.desc(), tags_filtradas.c.tag)
+        .limit(limite)
+    )
+    return [{"tag": row.tag, "total": row.total} for row in result]
@@ -0,0 +1,184 @@
+# backend/cache.py - Cliente Redis, chaves de cache versionadas e cache em memória
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# Contador de geração: incrementado a cada escrita, faz parte de toda chave de listagem
+CHAVE_GERACAO = "cache:geracao"
+
+# Clientes criados no lifespan; None enquanto o Redis estiver indisponível.
+# O cliente binário guarda respostas já serializadas (bytes, sem decodificação)
+redis_client: Optional[redis.Redis] = None
+redis_binario: Optional[redis.Redis] = None
+
+
+def _criar_cliente(decode_responses: bool) -> redis.Redis:
+    return redis.Redis(connection_pool=redis.ConnectionPool.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+        socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", 2)),
+        decode_responses=decode_responses
+    ))
+
+
+async def conectar_redis():
+    """Cria os pools de conexões do Redis e verifica a disponibilidade"""
+    global redis_client, redis_binario
+    client = _criar_cliente(decode_responses=True)
+    try:
+        await client.ping()
+        redis_client = client
+        redis_binario = _criar_cliente(decode_responses=False)
+        logger.info("Redis conectado com sucesso")
+    except Exception as e:
+        logger.warning("Redis não disponível: %s", e)
+        await client.aclose()
+        redis_client = None
+
+
+async def fechar_redis():
+    """Fecha os pools de conexões do Redis"""
+    global redis_client, redis_binario
+    if redis_client:
+        await redis_client.aclose()
+        redis_client = None
+    if redis_binario:
+        await redis_binario.aclose()
+        redis_binario = None
+
+
+def obter_redis() -> Optional[redis.Redis]:
+    """Retorna o cliente Redis atual (None se indisponível)"""
+    return redis_client
+
+
+async def redis_disponivel() -> bool:
+    """Verifica se o Redis responde"""
+    try:
+        return bool(redis_client and await redis_client.ping())
+    except Exception:
+        return False
+
+
+async def ler_cache(chave: str) -> Optional[str]:
+    """Lê uma chave do cache (None se ausente ou Redis indisponível)"""
+    if not redis_client:
+        return None
+    try:
+        return await redis_client.get(chave)
+    except Exception as e:
+        logger.warning("Erro ao ler cache: %s", e)
+        return None
+
+
+async def gravar_cache(chave: str, ttl: int, valor: str):
+    """Grava uma chave no cache com expiração"""
+    if not redis_client:
+        return
+    try:
+        await redis_client.setex(chave, ttl, valor)
+    except Exception as e:
+        logger.warning("Erro ao gravar cache: %s", e)
+
+
+async def remover_cache(chave: str):
+    """Remove uma chave do cache"""
+    if not redis_client:
+        return
+    try:
+        await redis_client.delete(chave)
+    except Exception as e:
+        logger.warning("Erro ao remover cache: %s", e)
+
+
+async def ler_cache_bytes(chave: str) -> Optional[bytes]:
+    """Lê uma resposta pré-serializada do cache, sem decodificar"""
+    if not redis_binario:
+        return None
+    try:
+        return await redis_binario.get(chave)
+    except Exception as e:
+        logger.warning("Erro ao ler cache: %s", e)
+        return None
+
+
+async def gravar_cache_bytes(chave: str, ttl: int, valor: bytes):
+    """Grava uma resposta pré-serializada no cache com expiração"""
+    if not redis_binario:
+        return
+    try:
+        await redis_binario.setex(chave, ttl, valor)
+    except Exception as e:
+        logger.warning("Erro ao gravar cache: %s", e)
+
+
+async def chave_versionada(prefixo: str, *partes) -> str:
+    """Monta a chave de cache incluindo a geração atual dos dados"""
+    geracao = "0"
+    if redis_client:
+        try:
+            geracao = await redis_client.get(CHAVE_GERACAO) or "0"
+        except Exception as e:
+            logger.warning("Erro ao ler geração do cache: %s", e)
+    return ":".join([prefixo, f"g{geracao}", *map(str, partes)])
+
+
+async def invalidar_cache():
+    """Invalida todas as chaves versionadas em O(1) incrementando a geração
+
+    As entradas antigas deixam de ser referenciadas e expiram pelo próprio TTL.
+    """
+    if redis_client:
+        try:
+            await redis_client.incr(CHAVE_GERACAO)
+        except Exception as e:
+            logger.warning("Erro ao invalidar cache: %s", e)
+
+
+class CacheLRU:
+    """Cache LRU em memória com expiração por TTL (seguro entre threads)"""
+
+    def __init__(self, tamanho_maximo: int = 500, ttl: float = 300):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[Any]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+
+            self._itens.move_to_end(chave)
+            return valor
+
+    def definir(self, chave: str, valor: Any):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave: str):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
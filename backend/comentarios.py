@@ -0,0 +1,158 @@
+# backend/comentarios.py - Comentários em árvore (uma consulta por página de threads)
+import json
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import ler_cache, gravar_cache, remover_cache
+from models import Comentario
+
+TIPOS_COMENTARIO = ("comentario", "duvida", "correcao", "exemplo")
+
+# Página de threads: as raízes mais recentes (keyset por data_criacao, id) e
+# todas as respostas delas, descidas nível a nível pelo índice
+# (conhecimento_id, resposta_para, data_criacao). Raízes em ordem decrescente,
+# respostas em ordem cronológica; pais sempre antes dos filhos.
+SQL_THREADS = """
+    WITH RECURSIVE raizes AS (
+        SELECT id FROM licitacoes.comentarios
+        WHERE conhecimento_id = :conhecimento_id AND resposta_para IS NULL {filtro_cursor}
+        ORDER BY data_criacao DESC, id DESC
+        LIMIT :limite
+    ), arvore AS (
+        SELECT c.id, c.resposta_para, c.autor, c.cargo, c.texto, c.tipo, c.votos,
+               c.data_criacao, 0 AS nivel
+        FROM licitacoes.comentarios c JOIN raizes r ON r.id = c.id
+        UNION ALL
+        SELECT c.id, c.resposta_para, c.autor, c.cargo, c.texto, c.tipo, c.votos,
+               c.data_criacao, a.nivel + 1
+        FROM licitacoes.comentarios c JOIN arvore a ON c.resposta_para = a.id
+        WHERE c.conhecimento_id = :conhecimento_id
+    )
+    SELECT * FROM arvore
+    ORDER BY nivel,
+             CASE WHEN nivel = 0 THEN data_criacao END DESC,
+             CASE WHEN nivel = 0 THEN id END DESC,
+             data_criacao, id
+"""
+SQL_THREADS_INICIO = text(SQL_THREADS.format(filtro_cursor=""))
+SQL_THREADS_CURSOR = text(SQL_THREADS.format(
+    filtro_cursor="AND (data_criacao, id) < (:cursor_data, :cursor_id)"))
+
+# Total de comentários por conhecimento, mantido no Redis
+TTL_TOTAL = 3600
+
+
+def chave_total(conhecimento_id: int) -> str:
+    return f"comentarios:total:{conhecimento_id}"
+
+
+def codificar_cursor(data_criacao: datetime, id_: int) -> str:
+    """Cursor opaco da próxima página de threads"""
+    return base64.urlsafe_b64encode(json.dumps([data_criacao.isoformat(), id_]).encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodifica o cursor (lança ValueError se inválido)"""
+    try:
+        data_criacao, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(data_criacao), int(id_)
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def montar_arvore(linhas) -> List[dict]:
+    """Monta as threads em O(n): cada linha é anexada ao pai já visto"""
+    nos = {}
+    raizes = []
+    for linha in linhas:
+        no = {
+            "id": linha.id,
+            "autor": linha.autor,
+            "cargo": linha.cargo,
+            "texto": linha.texto,
+            "tipo": linha.tipo,
+            "votos": linha.votos or 0,
+            "data_criacao": linha.data_criacao,
+            "respostas": []
+        }
+        nos[linha.id] = no
+        if linha.nivel == 0:
+            raizes.append(no)
+        else:
+            nos[linha.resposta_para]["respostas"].append(no)
+    return raizes
+
+
+async def listar_threads(
+    db: AsyncSession,
+    conhecimento_id: int,
+    limite: int = 20,
+    cursor: Optional[Tuple[datetime, int]] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Retorna uma página de threads completas e o cursor da próxima página"""
+    parametros = {"conhecimento_id": conhecimento_id, "limite": limite}
+    if cursor:
+        parametros.update(cursor_data=cursor[0], cursor_id=cursor[1])
+        result = await db.execute(SQL_THREADS_CURSOR, parametros)
+    else:
+        result = await db.execute(SQL_THREADS_INICIO, parametros)
+
+    threads = montar_arvore(result.all())
+
+    proximo = None
+    if len(threads) == limite:
+        ultima = threads[-1]
+        proximo = codificar_cursor(ultima["data_criacao"], ultima["id"])
+    return threads, proximo
+
+
+async def contar_comentarios(db: AsyncSession, conhecimento_id: int) -> int:
+    """Total de comentários do conhecimento (Redis, com recálculo na falta)"""
+    cached = await ler_cache(chave_total(conhecimento_id))
+    if cached is not None:
+        return int(cached)
+
+    total = await db.scalar(
+        select(func.count()).select_from(Comentario)
+        .where(Comentario.conhecimento_id == conhecimento_id))
+    await gravar_cache(chave_total(conhecimento_id), TTL_TOTAL, str(total))
+    return total
+
+
+async def criar_comentario(
+    db: AsyncSession,
+    conhecimento_id: int,
+    autor: str,
+    texto: str,
+    tipo: str,
+    resposta_para: Optional[int] = None,
+    cargo: Optional[str] = None
+) -> Optional[Comentario]:
+    """Cria o comentário; None se resposta_para não for deste conhecimento
+
+    Lança IntegrityError se o conhecimento não existir.
+    """
+    if resposta_para is not None:
+        pai = await db.scalar(
+            select(Comentario.conhecimento_id).where(Comentario.id == resposta_para))
+        if pai != conhecimento_id:
+            return None
+
+    comentario = Comentario(
+        conhecimento_id=conhecimento_id,
+        autor=autor,
+        cargo=cargo,
+        texto=texto,
+        tipo=tipo,
+        resposta_para=resposta_para
+    )
+    db.add(comentario)
+    await db.commit()
+
+    # O total é recalculado na próxima leitura
+    await remover_cache(chave_total(conhecimento_id))
+    return comentario
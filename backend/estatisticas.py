@@ -0,0 +1,123 @@
+# backend/estatisticas.py - Estatísticas pré-calculadas em views materializadas
+import os
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ESTATISTICAS_INTERVALO = float(os.getenv("ESTATISTICAS_INTERVALO", 300))
+ESTATISTICAS_DIAS_VOTOS = int(os.getenv("ESTATISTICAS_DIAS_VOTOS", 30))
+
+VIEWS_ESTATISTICAS = (
+    "licitacoes.estatisticas_contagens",
+    "licitacoes.estatisticas_votos_dia",
+    "licitacoes.estatisticas_destaques",
+)
+
+# Chave do advisory lock: apenas um worker atualiza as views por vez
+LOCK_ATUALIZACAO = 7_310_001
+
+
+async def obter_painel(db: AsyncSession) -> dict:
+    """Lê o painel de estatísticas das views materializadas (custo constante)"""
+    contagens = await db.execute(text(
+        "SELECT dimensao, valor, total, atualizado_em FROM licitacoes.estatisticas_contagens"))
+
+    painel = {"por_status": {}, "por_modalidade": {}, "por_fase": {}, "por_campus": {}}
+    atualizado_em = None
+    for row in contagens:
+        painel[f"por_{row.dimensao}"][row.valor] = row.total
+        atualizado_em = row.atualizado_em
+
+    votos = await db.execute(text("""
+        SELECT dia, positivos, negativos FROM licitacoes.estatisticas_votos_dia
+        WHERE dia >= current_date - CAST(:dias AS integer)
+        ORDER BY dia
+    """), {"dias": ESTATISTICAS_DIAS_VOTOS})
+    painel["votos_por_dia"] = [
+        {"dia": row.dia, "positivos": row.positivos, "negativos": row.negativos}
+        for row in votos
+    ]
+
+    destaques = await db.execute(text("""
+        SELECT categoria, id, titulo, valor FROM licitacoes.estatisticas_destaques
+        ORDER BY categoria, valor DESC, id
+    """))
+    painel["mais_visualizados"] = []
+    painel["mais_votados"] = []
+    campo_valor = {"mais_visualizados": "visualizacoes", "mais_votados": "pontuacao"}
+    for row in destaques:
+        painel[row.categoria].append(
+            {"id": row.id, "titulo": row.titulo, campo_valor[row.categoria]: row.valor})
+
+    painel["total_conhecimentos"] = sum(painel["por_status"].values())
+    painel["atualizado_em"] = atualizado_em
+    return painel
+
+
+async def atualizar_estatisticas(intervalo_minimo: float = 0) -> bool:
+    """Atualiza as views sem bloquear leituras (REFRESH ... CONCURRENTLY)
+
+    Com intervalo_minimo, não atualiza se outro worker já o fez há menos de
+    intervalo_minimo segundos (conferido com o advisory lock obtido).
+    """
+    try:
+        async with SessionLocal() as db:
+            obtido = await db.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:chave)"), {"chave": LOCK_ATUALIZACAO})
+            if not obtido:
+                return False
+
+            if intervalo_minimo > 0:
+                recente = await db.scalar(text("""
+                    SELECT max(atualizado_em) > now() - make_interval(secs => :intervalo)
+                    FROM licitacoes.estatisticas_contagens
+                """), {"intervalo": intervalo_minimo})
+                if recente:
+                    logger.debug("Estatísticas atualizadas há menos de %ss", intervalo_minimo)
+                    return False
+
+            for view in VIEWS_ESTATISTICAS:
+                await db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+            await db.commit()
+
+        logger.debug("Estatísticas atualizadas")
+        return True
+
+    except Exception as e:
+        logger.error("Erro ao atualizar estatísticas: %s", e)
+        return False
+
+
+class AtualizadorEstatisticas:
+    """Atualiza periodicamente as views materializadas de estatísticas"""
+
+    def __init__(self, intervalo: float = ESTATISTICAS_INTERVALO):
+        self.intervalo = intervalo
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def _executar(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            # Cada worker tem seu laço: só um atualiza as views por intervalo
+            await atualizar_estatisticas(self.intervalo)
+
+    def iniciar(self):
+        """Inicia a atualização periódica"""
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        """Interrompe a atualização periódica"""
+        if self._tarefa:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+
+atualizador_estatisticas = AtualizadorEstatisticas()
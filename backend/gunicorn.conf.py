@@ -0,0 +1,46 @@
+# backend/gunicorn.conf.py - Servidor de produção (gunicorn + workers uvicorn)
+#   gunicorn main:app -c gunicorn.conf.py
+import os
+import shutil
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+
+# Um worker assíncrono por núcleo (o event loop já atende muitas conexões)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Lido pelo database.py de cada worker para dividir as conexões do Postgres
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# UvicornWorker usa uvloop e httptools (instalados com uvicorn[standard])
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Encerramento gracioso: requisições em andamento e filas (auditoria,
+# visualizações, WhatsApp) têm até graceful_timeout para terminar
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# Maior que o keepalive_timeout do upstream no nginx (60s)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 75))
+
+# Recicla workers periodicamente (limita vazamentos de memória)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+# O log de acesso é feito pelo middleware da aplicação (com amostragem)
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def on_starting(server):
+    # Métricas multiprocesso: começa com o diretório vazio a cada inicialização
+    diretorio = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if diretorio:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        os.makedirs(diretorio, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Remove os gauges do worker encerrado da agregação do /metrics
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,115 @@
+# backend/logging_config.py - Configuração de logging (fila + JSON)
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json ou texto
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_MAX_SIZE = os.getenv("LOG_MAX_SIZE", "10MB")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+
+# Atributos padrão de LogRecord (os demais vêm de extra= e vão para o JSON)
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _tamanho_em_bytes(valor: str) -> int:
+    valor = valor.strip().upper()
+    for sufixo, fator in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+        if valor.endswith(sufixo):
+            return int(float(valor[:-len(sufixo)]) * fator)
+    return int(valor)
+
+
+class FormatadorJSON(logging.Formatter):
+    """Formata cada registro como uma linha JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_text:
+            dados["excecao"] = record.exc_text
+        return json.dumps(dados, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enfileira o registro sem formatá-lo: a formatação ocorre no listener"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Só resolve os argumentos e a exceção; o restante fica para a thread do listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configurar_logging():
+    """Configura o logging: nível via LOG_LEVEL e E/S em thread separada
+
+    Os handlers reais (stdout e arquivo rotativo opcional) ficam atrás de um
+    QueueListener; no event loop o log custa apenas um put() em uma fila.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    if LOG_FORMAT == "json":
+        formatador = FormatadorJSON()
+    else:
+        formatador = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            LOG_FILE,
+            maxBytes=_tamanho_em_bytes(LOG_MAX_SIZE),
+            backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatador)
+
+    fila = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    raiz.handlers = [_QueueHandler(fila)]
+    raiz.setLevel(LOG_LEVEL)
+
+    # Logs do uvicorn passam pela mesma fila; o access log dele é substituído
+    # pelo middleware de acesso com amostragem
+    for nome in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger_uvicorn = logging.getLogger(nome)
+        logger_uvicorn.handlers = []
+        logger_uvicorn.propagate = True
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(
+        fila, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(parar_logging)
+
+
+def parar_logging():
+    """Esvazia a fila de logs e encerra a thread do listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
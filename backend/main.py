@@ -1,67 +1,69 @@
 # backend/main.py - Corrigido
-import re
 import os
+import time
+import random
 import logging
-from typing import List, Optional, Dict
-from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, Depends, status, BackgroundTasks
+from typing import List, Optional
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from sqlalchemy.orm import Session
-from sqlalchemy import text, or_, and_
-import redis
-import json
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
 from contextlib import asynccontextmanager
 
+# Configuração de logging (antes dos imports locais, que já registram logs)
+from logging_config import configurar_logging, LOG_LEVEL
+configurar_logging()
+
 # Imports locais
-from database import get_db, engine
-from models import Base, Conhecimento as ConhecimentoDB, Comentario as ComentarioDB, UsuarioVoto, LogAuditoria
-from auth import authenticate_ad, get_current_user
-from metrics import router as metrics_router
-from whatsapp_bot import router as whatsapp_router
-
-# Modelos Pydantic (mantendo os existentes do código original)
-from pydantic import BaseModel
-from enum import Enum
-
-# Configuração de logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('biluapp.log')
-    ]
-)
+from database import get_db, engine, verificar_schema
+from models import Conhecimento as ConhecimentoDB
+from schemas import (ConhecimentoCreate, ConhecimentoResponse, VotoRequest, ComentarioCreate,
+                     TipoModalidade, FaseProcesso, StatusConhecimento)
+from auth import get_current_user, router as auth_router
+from busca import (consultar_conhecimentos, contar_tags, codificar_cursor, decodificar_cursor,
+                   normalizar_tags, COLUNAS_LISTAGEM, MODOS_TAGS)
+from cache import (conectar_redis, fechar_redis, redis_disponivel, ler_cache_bytes,
+                   gravar_cache_bytes, chave_versionada, invalidar_cache)
+from respostas import serializar, resposta_json, CACHE_HTTP_LISTAGEM, CACHE_HTTP_ESTATISTICAS
+from metrics import (router as metrics_router, MetricasHTTP, finalizar_metricas, registrar_cache,
+                     incrementar_busca, incrementar_conhecimento_criado, registrar_tempo_resposta)
+from whatsapp_bot import router as whatsapp_router, fila_whatsapp
+from visualizacoes import contador_visualizacoes
+from votos import registrar_voto, TIPOS_VOTO
+from estatisticas import obter_painel, atualizador_estatisticas
+from auditoria import gravador_auditoria, ip_cliente
+from tags import TagDetector
+from transferencia import exportar, FORMATOS as FORMATOS_EXPORTACAO
+from comentarios import (listar_threads, contar_comentarios, criar_comentario,
+                         decodificar_cursor as decodificar_cursor_comentarios, TIPOS_COMENTARIO)
+from similaridade import indice_similaridade, texto_indexado, SIMILARIDADE_LIMIAR_DUPLICADO
+from sugestoes import indice_sugestoes
+
 logger = logging.getLogger(__name__)
+logger_acesso = logging.getLogger("biluapp.acesso")
+
+# Amostragem do log de acesso: erros e requisições lentas são sempre registrados
+LOG_AMOSTRAGEM_ACESSO = float(os.getenv("LOG_AMOSTRAGEM_ACESSO", 0.01))
+LOG_LIMITE_LENTO_MS = float(os.getenv("LOG_LIMITE_LENTO_MS", 1000))
 
 # Log inicial para confirmar que o sistema iniciou
-logger.info("Iniciando BiluAPP com nível de log DEBUG")
+logger.info("Iniciando BiluAPP com nível de log %s", LOG_LEVEL)
 
 # Verificação de dependências
 try:
     import sqlalchemy
-    logger.info(f"SQLAlchemy versão: {sqlalchemy.__version__}")
+    logger.info("SQLAlchemy versão: %s", sqlalchemy.__version__)
 except ImportError as e:
-    logger.error(f"Erro ao importar SQLAlchemy: {e}")
+    logger.error("Erro ao importar SQLAlchemy: %s", e)
 
 try:
     import fastapi
-    logger.info(f"FastAPI versão: {fastapi.__version__}")
+    logger.info("FastAPI versão: %s", fastapi.__version__)
 except ImportError as e:
-    logger.error(f"Erro ao importar FastAPI: {e}")
-
-# Configuração Redis
-try:
-    redis_client = redis.Redis.from_url(
-        os.getenv("REDIS_URL", "redis://localhost:6379"),
-        decode_responses=True
-    )
-    redis_client.ping()
-    logger.info("Redis conectado com sucesso")
-except Exception as e:
-    logger.warning(f"Redis não disponível: {e}")
-    redis_client = None
+    logger.error("Erro ao importar FastAPI: %s", e)
 
 # Configuração do contexto de inicialização
 
@@ -70,32 +72,48 @@ except Exception as e:
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Iniciando BiluAPP...")
-    logger.info("Verificando conexões...")
+    inicio = time.perf_counter()
 
-    # Verificar conexão com o banco
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Conexão com o banco de dados estabelecida com sucesso")
-    except Exception as e:
-        logger.error(
-            f"Erro ao conectar com o banco de dados: {e}", exc_info=True)
-        raise
+    # Apenas confere a versão do schema: as tabelas são criadas pelas
+    # migrações (alembic upgrade head), não a cada inicialização de worker
+    await verificar_schema()
+
+    # Conectar ao Redis (a aplicação funciona sem cache se indisponível)
+    await conectar_redis()
+
+    # Iniciar workers do bot WhatsApp
+    await fila_whatsapp.iniciar()
+
+    # Iniciar gravação periódica das visualizações
+    contador_visualizacoes.iniciar()
 
-    # Verificar conexão com Redis
-    if redis_client:
-        try:
-            redis_client.ping()
-            logger.info("Conexão com Redis estabelecida com sucesso")
-        except Exception as e:
-            logger.warning(f"Redis não disponível: {e}")
-    else:
-        logger.warning("Redis não configurado")
-
-    logger.info("Inicialização concluída com sucesso")
+    # Iniciar atualização periódica das estatísticas
+    atualizador_estatisticas.iniciar()
+
+    # Iniciar gravação em lote da auditoria
+    gravador_auditoria.iniciar()
+
+    # Carregar e sincronizar o índice de similaridade
+    indice_similaridade.iniciar()
+
+    # Carregar e sincronizar o índice de sugestões da busca
+    indice_sugestoes.iniciar()
+
+    logger.info("Inicialização concluída em %.0f ms",
+                (time.perf_counter() - inicio) * 1000)
     yield
 
     # Shutdown
     logger.info("Finalizando BiluAPP...")
+    await fila_whatsapp.parar()
+    await contador_visualizacoes.parar()
+    await atualizador_estatisticas.parar()
+    await gravador_auditoria.parar()
+    await indice_similaridade.parar()
+    await indice_sugestoes.parar()
+    await fechar_redis()
+    await engine.dispose()
+    finalizar_metricas()
 
 # Inicialização do FastAPI
 app = FastAPI(
@@ -124,57 +142,47 @@ origins = [
 
 @app.middleware("http")
 async def log_requests(request, call_next):
-    logger.info(f"Requisição recebida: {request.method} {request.url}")
+    inicio = time.perf_counter()
     try:
         response = await call_next(request)
-        logger.info(f"Resposta enviada: {response.status_code}")
-        return response
     except Exception as e:
-        logger.error(f"Erro na requisição: {str(e)}", exc_info=True)
+        logger.error("Erro na requisição %s %s: %s", request.method,
+                     request.url.path, e, exc_info=True)
         raise
 
+    # Uma linha por requisição amostrada (sempre para erros e requisições lentas)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if (response.status_code >= 500 or duracao_ms >= LOG_LIMITE_LENTO_MS
+            or random.random() < LOG_AMOSTRAGEM_ACESSO):
+        logger_acesso.info(
+            "%s %s %s %.1fms", request.method, request.url.path,
+            response.status_code, duracao_ms,
+            extra={"metodo": request.method, "caminho": request.url.path,
+                   "status": response.status_code, "duracao_ms": round(duracao_ms, 1)})
+    return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cabeçalhos de resposta legíveis pelo frontend em requisições de outra origem
+    expose_headers=["X-Next-Cursor", "X-Total-Comentarios", "X-Possiveis-Duplicados",
+                    "ETag", "Content-Disposition"],
 )
 
+# Latência e requisições em andamento por rota (exportadas em /api/v1/metrics)
+app.add_middleware(MetricasHTTP)
+
 # Instância do detector de tags
 tag_detector = TagDetector()
 
 # Incluir routers
+app.include_router(auth_router, prefix="/api/v1")
 app.include_router(metrics_router, prefix="/api/v1")
 app.include_router(whatsapp_router, prefix="/api/v1")
 
-# Função para registrar auditoria
-
-
-async def registrar_auditoria(
-    db: Session,
-    usuario: str,
-    acao: str,
-    recurso_tipo: str,
-    recurso_id: int,
-    detalhes: str = None,
-    ip_origem: str = None
-):
-    """Registra ação de auditoria no banco"""
-    try:
-        log = LogAuditoria(
-            usuario=usuario,
-            acao=acao,
-            recurso_tipo=recurso_tipo,
-            recurso_id=recurso_id,
-            detalhes=detalhes,
-            ip_origem=ip_origem
-        )
-        db.add(log)
-        db.commit()
-    except Exception as e:
-        logger.error(f"Erro ao registrar auditoria: {e}")
-
 # Endpoints
 
 
@@ -189,14 +197,14 @@ def read_root():
 
 
 @app.get("/health")
-def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_db)):
     """Endpoint de health check"""
     try:
         # Testar conexão com banco
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
 
         # Testar Redis se disponível
-        redis_status = "connected" if redis_client and redis_client.ping() else "disconnected"
+        redis_status = "connected" if await redis_disponivel() else "disconnected"
 
         return {
             "status": "healthy",
@@ -212,13 +220,23 @@ def health_check(db: Session = Depends(get_db)):
 @app.post("/api/v1/conhecimentos", response_model=ConhecimentoResponse)
 async def criar_conhecimento(
     conhecimento: ConhecimentoCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     user: dict = Depends(get_current_user)
 ):
-    """Criar novo conhecimento"""
+    """Criar novo conhecimento
+
+    Perguntas muito parecidas com as já cadastradas são informadas no
+    cabeçalho X-Possiveis-Duplicados (ids separados por vírgula).
+    """
     try:
-        # Detecta tags automáticas
+        texto_similaridade = texto_indexado(conhecimento.titulo, conhecimento.pergunta)
+        duplicados = [id_ for id_, similaridade in indice_similaridade.similares(texto_similaridade, 3)
+                      if similaridade >= SIMILARIDADE_LIMIAR_DUPLICADO]
+
+        # Detecta tags automáticas (recarrega o vocabulário se alterado)
+        await tag_detector.atualizar(db)
         texto_completo = f"{conhecimento.titulo} {conhecimento.pergunta} {conhecimento.resposta}"
         tags_automaticas = tag_detector.detectar_tags(texto_completo)
 
@@ -236,243 +254,421 @@ async def criar_conhecimento(
         )
 
         db.add(db_conhecimento)
-        db.commit()
-        db.refresh(db_conhecimento)
-
-        # Registrar auditoria em background
-        background_tasks.add_task(
-            registrar_auditoria,
-            db, user["username"], "criar", "conhecimento",
-            db_conhecimento.id, f"Criado: {conhecimento.titulo}"
+        await db.commit()
+        await db.refresh(db_conhecimento)
+
+        # Os demais workers recebem o conhecimento na próxima sincronização
+        indice_similaridade.adicionar([db_conhecimento.id], [texto_similaridade])
+        indice_sugestoes.adicionar(
+            db_conhecimento.id, db_conhecimento.titulo,
+            normalizar_tags((db_conhecimento.tags or []) + (db_conhecimento.tags_automaticas or [])))
+        if duplicados:
+            response.headers["X-Possiveis-Duplicados"] = ",".join(map(str, duplicados))
+            logger.info("Conhecimento %s parecido com %s", db_conhecimento.id, duplicados)
+
+        # Registrar auditoria (gravada em lote pelo worker)
+        await gravador_auditoria.registrar(
+            user["username"], "criar", "conhecimento",
+            db_conhecimento.id, f"Criado: {conhecimento.titulo}",
+            ip_origem=ip_cliente(request)
         )
 
-        # Limpar cache se disponível
-        if redis_client:
-            redis_client.delete("conhecimentos:*")
+        # Invalidar listagens e estatísticas em cache
+        await invalidar_cache()
 
-        logger.info(
-            f"Conhecimento criado: ID {db_conhecimento.id} por {user['username']}")
+        incrementar_conhecimento_criado()
+        logger.info("Conhecimento criado: ID %s por %s",
+                    db_conhecimento.id, user["username"])
 
         return ConhecimentoResponse.from_orm(db_conhecimento)
 
     except Exception as e:
-        db.rollback()
-        logger.error(f"Erro ao criar conhecimento: {e}")
+        await db.rollback()
+        logger.error("Erro ao criar conhecimento: %s", e)
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
 @app.get("/api/v1/conhecimentos", response_model=List[ConhecimentoResponse])
 async def listar_conhecimentos(
+    request: Request,
     modalidade: Optional[TipoModalidade] = None,
     fase: Optional[FaseProcesso] = None,
     status: Optional[StatusConhecimento] = None,
-    tag: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None),
+    modo_tags: str = "todas",
     busca: Optional[str] = None,
     limite: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Listar conhecimentos com filtros"""
+    """Listar conhecimentos com filtros
+
+    Várias tags (?tag=a&tag=b) combinadas por modo_tags: "todas" ou "qualquer".
+    Paginação por offset/limite ou por cursor: o cursor da próxima página é
+    retornado no cabeçalho X-Next-Cursor (exceto em buscas textuais).
+    A página é guardada no cache já serializada e devolvida com ETag.
+    """
+    if modo_tags not in MODOS_TAGS:
+        raise HTTPException(status_code=400, detail="Modo de tags inválido")
+    tags = normalizar_tags(tag or [])
+    if cursor and busca:
+        raise HTTPException(
+            status_code=400, detail="Paginação por cursor não disponível com busca textual")
     try:
-        logger.info(
-            f"Recebida requisição de busca com parâmetros: busca={busca}, modalidade={modalidade}, fase={fase}, status={status}, tag={tag}")
-
-        # Tentar cache primeiro
-        cache_key = f"conhecimentos:{modalidade}:{fase}:{status}:{tag}:{busca}:{limite}:{offset}"
-        logger.debug(f"Cache key: {cache_key}")
-
-        if redis_client:
-            cached = redis_client.get(cache_key)
-            if cached:
-                logger.info("Retornando resultados do cache")
-                return json.loads(cached)
-
-        # Query base
-        query = db.query(ConhecimentoDB)
-        logger.debug("Query base criada")
-
-        # Aplicar filtros
-        if modalidade:
-            query = query.filter(ConhecimentoDB.modalidade == modalidade.value)
-            logger.debug(f"Filtro modalidade aplicado: {modalidade.value}")
-
-        if fase:
-            query = query.filter(ConhecimentoDB.fase == fase.value)
-            logger.debug(f"Filtro fase aplicado: {fase.value}")
-
-        if status:
-            query = query.filter(ConhecimentoDB.status == status.value)
-            logger.debug(f"Filtro status aplicado: {status.value}")
-
-        if tag:
-            query = query.filter(
-                or_(
-                    ConhecimentoDB.tags.contains([tag]),
-                    ConhecimentoDB.tags_automaticas.contains([tag])
-                )
-            )
-            logger.debug(f"Filtro tag aplicado: {tag}")
+        posicao = decodificar_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
 
+    try:
+        # Tentar cache primeiro: "<cursor da próxima página>\n<corpo JSON>"
+        cache_key = await chave_versionada(
+            "conhecimentos", modalidade, fase, status, ",".join(tags), modo_tags,
+            busca, limite, offset, cursor)
+        logger.debug("Cache key: %s", cache_key)
+
+        cached = await ler_cache_bytes(cache_key)
+        registrar_cache("conhecimentos", bool(cached))
+        if cached:
+            next_cursor, _, corpo = cached.partition(b"\n")
+            headers = {"X-Next-Cursor": next_cursor.decode()} if next_cursor else None
+            return resposta_json(request, corpo, headers, max_age=CACHE_HTTP_LISTAGEM)
+
+        inicio = time.perf_counter()
+        conhecimentos = await consultar_conhecimentos(
+            db,
+            busca=busca,
+            modalidade=modalidade.value if modalidade else None,
+            fase=fase.value if fase else None,
+            status=status.value if status else None,
+            tags=tags,
+            modo_tags=modo_tags,
+            limite=limite,
+            offset=offset,
+            cursor=posicao
+        )
         if busca:
-            # Busca por texto
-            busca_filter = or_(
-                ConhecimentoDB.titulo.ilike(f"%{busca}%"),
-                ConhecimentoDB.pergunta.ilike(f"%{busca}%"),
-                ConhecimentoDB.resposta.ilike(f"%{busca}%")
-            )
-            query = query.filter(busca_filter)
-            logger.debug(f"Filtro de busca aplicado: {busca}")
-
-        # Ordenação e paginação
-        logger.debug("Aplicando ordenação e paginação")
-        conhecimentos = query.order_by(
-            (ConhecimentoDB.votos_positivos -
-             ConhecimentoDB.votos_negativos).desc(),
-            ConhecimentoDB.data_criacao.desc()
-        ).offset(offset).limit(limite).all()
-
-        logger.info(f"Encontrados {len(conhecimentos)} conhecimentos")
-
-        # Converter para response model
-        response = [ConhecimentoResponse.from_orm(c) for c in conhecimentos]
-        logger.debug("Resposta convertida para modelo de resposta")
+            incrementar_busca()
+            registrar_tempo_resposta(time.perf_counter() - inicio)
+        logger.debug("Encontrados %d conhecimentos", len(conhecimentos))
+
+        # Uma única serialização: response model -> dicts JSON -> bytes
+        corpo = serializar([
+            ConhecimentoResponse.from_orm(c).model_dump(mode="json") for c in conhecimentos])
+
+        # Página cheia: há (possivelmente) uma próxima página
+        next_cursor = ""
+        if not busca and conhecimentos and len(conhecimentos) == limite:
+            next_cursor = codificar_cursor(conhecimentos[-1])
 
         # Cache por 5 minutos
-        if redis_client:
-            redis_client.setex(
-                cache_key, 300, json.dumps(response, default=str))
-            logger.debug("Resposta armazenada em cache")
+        await gravar_cache_bytes(cache_key, 300, next_cursor.encode() + b"\n" + corpo)
 
-        return response
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return resposta_json(request, corpo, headers, max_age=CACHE_HTTP_LISTAGEM)
 
     except Exception as e:
-        logger.error(f"Erro ao listar conhecimentos: {str(e)}", exc_info=True)
+        logger.error("Erro ao listar conhecimentos: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Erro interno do servidor: {str(e)}"
         )
 
 
+@app.get("/api/v1/sugestoes")
+async def sugerir(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=100),
+    limite: int = Query(8, ge=1, le=20)
+):
+    """Sugestões da caixa de busca: títulos e tags que começam com o texto digitado
+
+    Respondida pelo índice em memória, sem acessar o banco.
+    """
+    corpo = serializar(indice_sugestoes.sugerir(q, limite))
+    return resposta_json(request, corpo, max_age=CACHE_HTTP_LISTAGEM)
+
+
+@app.get("/api/v1/tags")
+async def listar_tags(
+    request: Request,
+    modalidade: Optional[TipoModalidade] = None,
+    fase: Optional[FaseProcesso] = None,
+    status: Optional[StatusConhecimento] = None,
+    tag: Optional[List[str]] = Query(None),
+    modo_tags: str = "todas",
+    busca: Optional[str] = None,
+    limite: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Contagem de conhecimentos por tag para os filtros atuais (barra de tags)"""
+    if modo_tags not in MODOS_TAGS:
+        raise HTTPException(status_code=400, detail="Modo de tags inválido")
+    tags = normalizar_tags(tag or [])
+
+    try:
+        cache_key = await chave_versionada(
+            "tags", modalidade, fase, status, ",".join(tags), modo_tags, busca, limite)
+        cached = await ler_cache_bytes(cache_key)
+        registrar_cache("tags", bool(cached))
+        if cached:
+            return resposta_json(request, cached, max_age=CACHE_HTTP_LISTAGEM)
+
+        contagens = await contar_tags(
+            db,
+            busca=busca,
+            modalidade=modalidade.value if modalidade else None,
+            fase=fase.value if fase else None,
+            status=status.value if status else None,
+            tags=tags,
+            modo_tags=modo_tags,
+            limite=limite
+        )
+
+        corpo = serializar(contagens)
+        await gravar_cache_bytes(cache_key, 300, corpo)
+        return resposta_json(request, corpo, max_age=CACHE_HTTP_LISTAGEM)
+
+    except Exception as e:
+        logger.error("Erro ao contar tags: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
 @app.get("/api/v1/conhecimentos/{conhecimento_id}", response_model=ConhecimentoResponse)
 async def obter_conhecimento(
     conhecimento_id: int,
+    request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Obter conhecimento específico"""
-    conhecimento = db.query(ConhecimentoDB).filter(
-        ConhecimentoDB.id == conhecimento_id).first()
+    """Obter conhecimento específico
 
-    if not conhecimento:
-        raise HTTPException(
-            status_code=404, detail="Conhecimento não encontrado")
+    Sempre revalidada (no-cache): cada acesso chega ao backend e conta como
+    visualização, mas com If-None-Match a resposta é um 304 sem corpo.
+    """
+    cache_key = await chave_versionada("conhecimento", conhecimento_id)
+    corpo = await ler_cache_bytes(cache_key)
+    registrar_cache("conhecimento", bool(corpo))
+
+    if not corpo:
+        conhecimento = (await db.execute(
+            select(*COLUNAS_LISTAGEM).where(ConhecimentoDB.id == conhecimento_id))).first()
 
-    # Incrementar visualizações em background
+        if not conhecimento:
+            raise HTTPException(
+                status_code=404, detail="Conhecimento não encontrado")
+
+        corpo = serializar(ConhecimentoResponse.from_orm(conhecimento).model_dump(mode="json"))
+        await gravar_cache_bytes(cache_key, 60, corpo)
+
+    # Registrar visualização (gravada em lote no banco)
     background_tasks.add_task(
-        lambda: db.query(ConhecimentoDB)
-        .filter(ConhecimentoDB.id == conhecimento_id)
-        .update({"visualizacoes": ConhecimentoDB.visualizacoes + 1})
-    )
+        contador_visualizacoes.registrar, conhecimento_id)
+
+    return resposta_json(request, corpo)
+
+
+@app.get("/api/v1/conhecimentos/{conhecimento_id}/relacionados")
+async def listar_relacionados(
+    conhecimento_id: int,
+    request: Request,
+    limite: int = Query(5, ge=1, le=20),
+    db: AsyncSession = Depends(get_db)
+):
+    """Conhecimentos com título e pergunta mais parecidos (índice em memória)"""
+    relacionados = indice_similaridade.relacionados(conhecimento_id, limite)
+
+    titulos = {}
+    if relacionados:
+        # Busca por chave primária apenas para os títulos
+        result = await db.execute(
+            select(ConhecimentoDB.id, ConhecimentoDB.titulo)
+            .where(ConhecimentoDB.id.in_([id_ for id_, _ in relacionados])))
+        titulos = dict(result.all())
 
-    return ConhecimentoResponse.from_orm(conhecimento)
+    corpo = serializar([
+        {"id": id_, "titulo": titulos[id_], "similaridade": round(similaridade, 4)}
+        for id_, similaridade in relacionados if id_ in titulos
+    ])
+    return resposta_json(request, corpo, max_age=CACHE_HTTP_LISTAGEM)
 
 
 @app.post("/api/v1/conhecimentos/{conhecimento_id}/votar")
 async def votar_conhecimento(
     conhecimento_id: int,
     voto: VotoRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     user: dict = Depends(get_current_user)
 ):
-    """Votar em conhecimento"""
-    # Verificar se conhecimento existe
-    conhecimento = db.query(ConhecimentoDB).filter(
-        ConhecimentoDB.id == conhecimento_id).first()
-    if not conhecimento:
+    """Votar em conhecimento (ou alterar o voto já registrado)"""
+    if voto.tipo_voto not in TIPOS_VOTO:
+        raise HTTPException(status_code=400, detail="Tipo de voto inválido")
+
+    # Upsert do voto e atualização dos contadores em um único comando
+    try:
+        resultado = await registrar_voto(
+            db, conhecimento_id, user["username"], voto.tipo_voto)
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
             status_code=404, detail="Conhecimento não encontrado")
 
-    # Verificar se usuário já votou
-    voto_existente = db.query(UsuarioVoto).filter(
-        and_(
-            UsuarioVoto.conhecimento_id == conhecimento_id,
-            UsuarioVoto.usuario == user["username"]
-        )
-    ).first()
-
-    if voto_existente:
+    if resultado is None:
         raise HTTPException(
             status_code=400, detail="Usuário já votou neste conhecimento")
 
-    if voto.tipo_voto not in ["positivo", "negativo"]:
-        raise HTTPException(status_code=400, detail="Tipo de voto inválido")
-
-    # Registrar voto
-    novo_voto = UsuarioVoto(
-        conhecimento_id=conhecimento_id,
-        usuario=user["username"],
-        tipo_voto=voto.tipo_voto
+    # Registrar auditoria (gravada em lote pelo worker)
+    await gravador_auditoria.registrar(
+        user["username"], "votar", "conhecimento",
+        conhecimento_id, f"Voto: {voto.tipo_voto}",
+        ip_origem=ip_cliente(request)
     )
 
-    db.add(novo_voto)
+    # Invalidar listagens e estatísticas em cache
+    await invalidar_cache()
+
+    return {
+        "message": "Voto registrado com sucesso" if resultado["novo"] else "Voto alterado com sucesso",
+        "votos_positivos": resultado["votos_positivos"],
+        "votos_negativos": resultado["votos_negativos"]
+    }
 
-    # O trigger do banco irá atualizar automaticamente os contadores
-    db.commit()
 
-    # Registrar auditoria
-    background_tasks.add_task(
-        registrar_auditoria,
-        db, user["username"], "votar", "conhecimento",
-        conhecimento_id, f"Voto: {voto.tipo_voto}"
+@app.post("/api/v1/conhecimentos/{conhecimento_id}/comentarios", status_code=201)
+async def comentar_conhecimento(
+    conhecimento_id: int,
+    comentario: ComentarioCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: dict = Depends(get_current_user)
+):
+    """Comentar um conhecimento ou responder a um comentário"""
+    if comentario.tipo not in TIPOS_COMENTARIO:
+        raise HTTPException(status_code=400, detail="Tipo de comentário inválido")
+
+    try:
+        criado = await criar_comentario(
+            db, conhecimento_id, user["nome"], comentario.texto,
+            comentario.tipo, comentario.resposta_para)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=404, detail="Conhecimento não encontrado")
+
+    if criado is None:
+        raise HTTPException(
+            status_code=400, detail="Comentário respondido não pertence a este conhecimento")
+
+    # Registrar auditoria (gravada em lote pelo worker)
+    await gravador_auditoria.registrar(
+        user["username"], "comentar", "comentario", criado.id,
+        f"Conhecimento {conhecimento_id}", ip_origem=ip_cliente(request)
     )
 
-    # Limpar cache
-    if redis_client:
-        redis_client.delete("conhecimentos:*")
+    return {
+        "id": criado.id,
+        "resposta_para": criado.resposta_para,
+        "autor": criado.autor,
+        "texto": criado.texto,
+        "tipo": criado.tipo,
+        "data_criacao": criado.data_criacao
+    }
 
-    return {"message": "Voto registrado com sucesso"}
+
+@app.get("/api/v1/conhecimentos/{conhecimento_id}/comentarios")
+async def listar_comentarios(
+    conhecimento_id: int,
+    request: Request,
+    limite: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Threads de comentários, cada uma com todas as respostas aninhadas
+
+    As threads (comentários de primeiro nível) são paginadas por cursor,
+    retornado no cabeçalho X-Next-Cursor; X-Total-Comentarios traz o total.
+    """
+    try:
+        posicao = decodificar_cursor_comentarios(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    threads, next_cursor = await listar_threads(db, conhecimento_id, limite, posicao)
+    # Sem threads, confirma que o conhecimento existe (com threads, a FK garante)
+    if not threads and await db.scalar(
+            select(ConhecimentoDB.id).where(ConhecimentoDB.id == conhecimento_id)) is None:
+        raise HTTPException(status_code=404, detail="Conhecimento não encontrado")
+    total = await contar_comentarios(db, conhecimento_id)
+
+    headers = {"X-Total-Comentarios": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return resposta_json(request, serializar(threads), headers)
+
+
+@app.get("/api/v1/exportacao")
+async def exportar_conhecimentos(
+    request: Request,
+    formato: str = "ndjson",
+    user: dict = Depends(get_current_user)
+):
+    """Exporta a base inteira em NDJSON ou CSV (streaming, memória constante)"""
+    if formato not in FORMATOS_EXPORTACAO:
+        raise HTTPException(status_code=400, detail="Formato inválido")
+
+    await gravador_auditoria.registrar(
+        user["username"], "exportar", "conhecimento", 0,
+        f"Exportação {formato}", ip_origem=ip_cliente(request)
+    )
+
+    nome = f"conhecimentos_{datetime.utcnow():%Y%m%d_%H%M%S}.{formato}"
+    return StreamingResponse(
+        exportar(formato),
+        media_type="text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'}
+    )
 
 
 @app.get("/api/v1/estatisticas")
-async def obter_estatisticas(db: Session = Depends(get_db)):
-    """Obter estatísticas do sistema"""
+async def obter_estatisticas(request: Request, db: AsyncSession = Depends(get_db)):
+    """Obter painel de estatísticas do sistema (lido de views materializadas)"""
     try:
-        # Cache por 10 minutos
-        cache_key = "estatisticas:geral"
-        if redis_client:
-            cached = redis_client.get(cache_key)
-            if cached:
-                return json.loads(cached)
-
-        # Consultas para estatísticas
-        total_conhecimentos = db.query(ConhecimentoDB).count()
-        total_validados = db.query(ConhecimentoDB).filter(
-            ConhecimentoDB.status == StatusConhecimento.VALIDADO.value
-        ).count()
-
-        # Mais estatísticas...
-        stats = {
-            "total_conhecimentos": total_conhecimentos,
+        # Cache por 10 minutos, já serializado
+        cache_key = await chave_versionada("estatisticas", "geral")
+        cached = await ler_cache_bytes(cache_key)
+        registrar_cache("estatisticas", bool(cached))
+        if cached:
+            return resposta_json(request, cached, max_age=CACHE_HTTP_ESTATISTICAS)
+
+        # Contagens, votos por dia e destaques pré-calculados
+        stats = await obter_painel(db)
+        total_conhecimentos = stats["total_conhecimentos"]
+        total_validados = stats["por_status"].get(
+            StatusConhecimento.VALIDADO.value, 0)
+
+        stats.update({
             "total_validados": total_validados,
             "taxa_validacao": f"{(total_validados/total_conhecimentos*100 if total_conhecimentos > 0 else 0):.1f}%",
-            "timestamp": datetime.utcnow()
-        }
+            # Data dos dados (última atualização das views), não da requisição:
+            # o corpo e a ETag só mudam quando as estatísticas mudam
+            "timestamp": stats["atualizado_em"]
+        })
 
-        if redis_client:
-            redis_client.setex(cache_key, 600, json.dumps(stats, default=str))
+        corpo = serializar(stats)
+        await gravar_cache_bytes(cache_key, 600, corpo)
 
-        return stats
+        return resposta_json(request, corpo, max_age=CACHE_HTTP_ESTATISTICAS)
 
     except Exception as e:
-        logger.error(f"Erro ao obter estatísticas: {e}")
+        logger.error("Erro ao obter estatísticas: %s", e)
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
 @app.get("/api/v1/test")
 async def test_endpoint():
     """Endpoint de teste simplificado"""
-    logger.info("Endpoint de teste acessado")
+    logger.debug("Endpoint de teste acessado")
     return {
         "status": "online",
         "timestamp": datetime.utcnow().isoformat(),
@@ -480,10 +676,20 @@ async def test_endpoint():
     }
 
 if __name__ == "__main__":
+    # Execução direta: vários workers uvicorn (em produção, prefira o gunicorn.conf.py)
     import uvicorn
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # Lido pelo database.py de cada worker para dividir as conexões do Postgres
+    # (e pelo auth.py, que exige SECRET_KEY com mais de um worker)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
     uvicorn.run(
-        app,
+        "main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
+        workers=workers,
+        loop="auto",  # uvloop quando instalado
+        http="auto",  # httptools quando instalado
+        timeout_graceful_shutdown=int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30)),
+        access_log=False,
         log_level=os.getenv("LOG_LEVEL", "info").lower()
     )
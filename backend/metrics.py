@@ -1,10 +1,23 @@
 # metrics.py - CORRIGIDO
-from prometheus_client import Counter, Histogram, generate_latest
+import os
+import time
+
+from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry, REGISTRY,
+                               generate_latest, multiprocess)
 # ✅ A importação do "Response" está correta aqui
 from fastapi import APIRouter, Response
+from starlette.routing import Match
 
 router = APIRouter()
 
+# Com vários workers, cada processo grava as métricas em arquivos neste
+# diretório e o /metrics agrega todos (precisa estar definido antes do import)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Gauges calculados por função: (gauge, função). Em modo multiprocesso o
+# set_function não é exportado, então o valor é copiado a cada requisição
+_gauges_calculados = []
+
 # Métricas
 busca_counter = Counter('busca_total', 'Total de buscas realizadas')
 conhecimento_criado_counter = Counter(
@@ -12,16 +25,148 @@ conhecimento_criado_counter = Counter(
 tempo_resposta_histogram = Histogram(
     'tempo_resposta_segundos', 'Tempo de resposta das buscas')
 
+# Métricas HTTP (por template de rota, para não explodir a cardinalidade)
+http_duracao_histogram = Histogram(
+    'http_requisicao_duracao_segundos', 'Duração das requisições HTTP',
+    ['metodo', 'rota', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+http_em_andamento_gauge = Gauge(
+    'http_requisicoes_em_andamento', 'Requisições HTTP em processamento',
+    ['metodo', 'rota'], multiprocess_mode='livesum')
+
+# Métricas do cache Redis
+cache_consultas_counter = Counter(
+    'cache_consultas', 'Consultas ao cache Redis', ['cache', 'resultado'])
+
+# Métricas das consultas ao banco
+db_consulta_histogram = Histogram(
+    'db_consulta_duracao_segundos', 'Duração das consultas ao banco', ['operacao'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 30))
+
+# Métricas do envio de mensagens WhatsApp
+whatsapp_envio_histogram = Histogram(
+    'whatsapp_envio_duracao_segundos', 'Duração do envio de mensagens, incluindo retentativas',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+whatsapp_envios_counter = Counter(
+    'whatsapp_envios', 'Mensagens WhatsApp enviadas', ['resultado'])
+whatsapp_erros_counter = Counter(
+    'whatsapp_erros', 'Erros em tentativas de envio ao WhatsApp', ['motivo'])
+
+# Métricas do pool de conexões do banco
+db_pool_tamanho_gauge = Gauge(
+    'db_pool_tamanho', 'Tamanho configurado do pool de conexões', multiprocess_mode='livesum')
+db_pool_em_uso_gauge = Gauge(
+    'db_pool_conexoes_em_uso', 'Conexões do pool atualmente em uso', multiprocess_mode='livesum')
+db_pool_overflow_gauge = Gauge(
+    'db_pool_overflow', 'Conexões abertas além do tamanho do pool', multiprocess_mode='livesum')
+db_pool_espera_histogram = Histogram(
+    'db_pool_espera_checkout_segundos', 'Tempo de espera para obter conexão do pool',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+db_pool_timeout_counter = Counter(
+    'db_pool_timeouts', 'Checkouts do pool que excederam o timeout')
+
+# Métricas do cache de autenticação LDAP
+auth_cache_hits_counter = Counter(
+    'auth_cache_hits', 'Autenticações atendidas pelo cache')
+auth_cache_misses_counter = Counter(
+    'auth_cache_misses', 'Autenticações que exigiram consulta ao AD')
+
+# Métricas do contador de visualizações
+visualizacoes_pendentes_gauge = Gauge(
+    'visualizacoes_pendentes', 'Visualizações pendentes de gravação no último ciclo', multiprocess_mode='livesum')
+visualizacoes_gravadas_counter = Counter(
+    'visualizacoes_gravadas', 'Total de visualizações gravadas no banco')
+
+# Métricas da fila de auditoria
+auditoria_fila_gauge = Gauge(
+    'auditoria_fila_tamanho', 'Registros de auditoria aguardando gravação', multiprocess_mode='livesum')
+auditoria_gravados_counter = Counter(
+    'auditoria_gravados', 'Total de registros de auditoria gravados')
+auditoria_lote_histogram = Histogram(
+    'auditoria_lote_tamanho', 'Registros de auditoria por lote gravado',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+auditoria_fila_cheia_counter = Counter(
+    'auditoria_fila_cheia', 'Registros de auditoria que encontraram a fila cheia')
+auditoria_descartados_counter = Counter(
+    'auditoria_descartados', 'Registros de auditoria descartados')
+
 
 @router.get("/metrics")
-async def get_metrics():
-    """Endpoint para métricas do Prometheus"""
+def get_metrics():
+    """Endpoint para métricas do Prometheus (agrega todos os workers)"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
     return Response(
-        content=generate_latest(),
+        content=generate_latest(registry),
         media_type="text/plain; version=0.0.4; charset=utf-8"
     )
 
 
+def _rota(scope) -> str:
+    """Template da rota (/api/v1/conhecimentos/{conhecimento_id}) que atende o scope"""
+    for rota in scope["app"].routes:
+        correspondencia, _ = rota.matches(scope)
+        if correspondencia == Match.FULL:
+            return rota.path
+    return "desconhecida"
+
+
+class MetricasHTTP:
+    """Middleware ASGI: latência e requisições em andamento por rota, método e status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        rota = _rota(scope)
+        status_http = 500
+
+        async def send_com_status(mensagem):
+            nonlocal status_http
+            if mensagem["type"] == "http.response.start":
+                status_http = mensagem["status"]
+            await send(mensagem)
+
+        em_andamento = http_em_andamento_gauge.labels(metodo, rota)
+        em_andamento.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            http_duracao_histogram.labels(metodo, rota, str(status_http)).observe(
+                time.perf_counter() - inicio)
+            em_andamento.dec()
+            if PROMETHEUS_MULTIPROC_DIR:
+                atualizar_gauges_calculados()
+
+
+def _monitorar(gauge, funcao):
+    """Associa um gauge a uma função lida no momento da coleta"""
+    _gauges_calculados.append((gauge, funcao))
+    if not PROMETHEUS_MULTIPROC_DIR:
+        gauge.set_function(funcao)
+
+
+def atualizar_gauges_calculados():
+    """Copia o valor atual dos gauges calculados (modo multiprocesso)"""
+    for gauge, funcao in _gauges_calculados:
+        gauge.set(funcao())
+
+
+def finalizar_metricas():
+    """Remove os gauges do processo encerrado da agregação multiprocesso"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
 # Funções auxiliares para incrementar métricas
 def incrementar_busca():
     """Incrementa contador de buscas"""
@@ -36,3 +181,80 @@ def incrementar_conhecimento_criado():
 def registrar_tempo_resposta(tempo: float):
     """Registra tempo de resposta"""
     tempo_resposta_histogram.observe(tempo)
+
+
+def monitorar_pool(pool):
+    """Expõe o estado do pool de conexões nas métricas (lido a cada coleta)"""
+    _monitorar(db_pool_tamanho_gauge, pool.size)
+    _monitorar(db_pool_em_uso_gauge, pool.checkedout)
+    _monitorar(db_pool_overflow_gauge, lambda: max(pool.overflow(), 0))
+
+
+def registrar_consulta_db(operacao: str, tempo: float):
+    """Registra a duração de uma consulta ao banco"""
+    db_consulta_histogram.labels(operacao).observe(tempo)
+
+
+def registrar_cache(nome: str, acerto: bool):
+    """Incrementa o contador de acertos ou falhas de um cache Redis"""
+    cache_consultas_counter.labels(nome, "acerto" if acerto else "falha").inc()
+
+
+def registrar_envio_whatsapp(sucesso: bool, tempo: float):
+    """Registra o resultado e a duração do envio de uma mensagem"""
+    whatsapp_envios_counter.labels("sucesso" if sucesso else "falha").inc()
+    whatsapp_envio_histogram.observe(tempo)
+
+
+def registrar_erro_whatsapp(motivo: str):
+    """Incrementa o contador de erros em tentativas de envio"""
+    whatsapp_erros_counter.labels(motivo).inc()
+
+
+def registrar_espera_pool(tempo: float):
+    """Registra o tempo de espera no checkout de uma conexão"""
+    db_pool_espera_histogram.observe(tempo)
+
+
+def registrar_timeout_pool():
+    """Incrementa contador de timeouts do pool"""
+    db_pool_timeout_counter.inc()
+
+
+def registrar_cache_autenticacao(acerto: bool):
+    """Incrementa o contador de acertos ou falhas do cache de autenticação"""
+    if acerto:
+        auth_cache_hits_counter.inc()
+    else:
+        auth_cache_misses_counter.inc()
+
+
+def registrar_visualizacoes_pendentes(total: int):
+    """Atualiza o total de visualizações aguardando gravação"""
+    visualizacoes_pendentes_gauge.set(total)
+
+
+def registrar_visualizacoes_gravadas(total: int):
+    """Incrementa o contador de visualizações gravadas"""
+    visualizacoes_gravadas_counter.inc(total)
+
+
+def monitorar_fila_auditoria(tamanho_fila):
+    """Expõe o tamanho da fila de auditoria (lido a cada coleta)"""
+    _monitorar(auditoria_fila_gauge, tamanho_fila)
+
+
+def registrar_lote_auditoria(tamanho: int):
+    """Registra um lote de auditoria gravado"""
+    auditoria_gravados_counter.inc(tamanho)
+    auditoria_lote_histogram.observe(tamanho)
+
+
+def registrar_fila_auditoria_cheia():
+    """Incrementa contador de registros que encontraram a fila cheia"""
+    auditoria_fila_cheia_counter.inc()
+
+
+def registrar_auditoria_descartada(quantidade: int = 1):
+    """Incrementa contador de registros de auditoria descartados"""
+    auditoria_descartados_counter.inc(quantidade)
@@ -0,0 +1,207 @@
+"""schema inicial
+
+Equivalente ao init.sql original somado às tabelas que eram criadas pelo
+create_all (log_auditoria e configuracao_sistema). Todos os comandos são
+idempotentes: em bancos criados pelo init.sql original (e pelo create_all)
+a migração acrescenta as colunas geradas, a restrição única dos votos e os
+índices que faltam, e substitui os antigos índices de busca por expressão.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+PONTUACAO = """
+    pontuacao INTEGER GENERATED ALWAYS AS (
+        coalesce(votos_positivos, 0) - coalesce(votos_negativos, 0)
+    ) STORED
+"""
+BUSCA_VETOR = """
+    busca_vetor TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('licitacoes.portugues', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('licitacoes.portugues', coalesce(pergunta, '')), 'B') ||
+        setweight(to_tsvector('licitacoes.portugues', coalesce(resposta, '')), 'C')
+    ) STORED
+"""
+
+# Índices de busca do init.sql original, substituídos pelo GIN sobre busca_vetor
+INDICES_BUSCA_ANTIGOS = ("idx_busca_titulo", "idx_busca_pergunta", "idx_busca_resposta")
+
+
+def upgrade():
+    op.execute("CREATE SCHEMA IF NOT EXISTS licitacoes")
+
+    # Configuração de busca textual em português, insensível a acentos
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_ts_config c
+                JOIN pg_namespace n ON n.oid = c.cfgnamespace
+                WHERE n.nspname = 'licitacoes' AND c.cfgname = 'portugues'
+            ) THEN
+                CREATE TEXT SEARCH CONFIGURATION licitacoes.portugues (COPY = pg_catalog.portuguese);
+                ALTER TEXT SEARCH CONFIGURATION licitacoes.portugues
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+            END IF;
+        END
+        $$
+    """)
+
+    op.execute(f"""
+        CREATE TABLE IF NOT EXISTS licitacoes.conhecimentos (
+            id SERIAL PRIMARY KEY,
+            titulo VARCHAR(500) NOT NULL,
+            pergunta TEXT NOT NULL,
+            resposta TEXT NOT NULL,
+            modalidade VARCHAR(50),
+            fase VARCHAR(50),
+            tags TEXT[],
+            tags_automaticas TEXT[],
+            autor VARCHAR(100) NOT NULL,
+            campus VARCHAR(50) DEFAULT 'Capivari',
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            votos_positivos INTEGER DEFAULT 0,
+            votos_negativos INTEGER DEFAULT 0,
+            visualizacoes INTEGER DEFAULT 0,
+            {PONTUACAO},
+            status VARCHAR(20) DEFAULT 'novo',
+            validado_por VARCHAR(100),
+            data_validacao TIMESTAMP,
+            {BUSCA_VETOR}
+        )
+    """)
+    # Tabela criada pelo init.sql original, sem as colunas geradas
+    op.execute(f"ALTER TABLE licitacoes.conhecimentos ADD COLUMN IF NOT EXISTS {PONTUACAO}")
+    op.execute(f"ALTER TABLE licitacoes.conhecimentos ADD COLUMN IF NOT EXISTS {BUSCA_VETOR}")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS licitacoes.comentarios (
+            id SERIAL PRIMARY KEY,
+            conhecimento_id INTEGER REFERENCES licitacoes.conhecimentos(id),
+            autor VARCHAR(100) NOT NULL,
+            cargo VARCHAR(100),
+            texto TEXT NOT NULL,
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            tipo VARCHAR(20) DEFAULT 'comentario',
+            votos INTEGER DEFAULT 0,
+            resposta_para INTEGER REFERENCES licitacoes.comentarios(id)
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS licitacoes.usuario_votos (
+            id SERIAL PRIMARY KEY,
+            conhecimento_id INTEGER NOT NULL REFERENCES licitacoes.conhecimentos(id),
+            usuario VARCHAR(100) NOT NULL,
+            tipo_voto VARCHAR(10) NOT NULL,
+            data_voto TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT uq_usuario_votos_conhecimento_usuario UNIQUE (conhecimento_id, usuario)
+        )
+    """)
+    # Tabela criada pelo create_all, sem a restrição única. Votos duplicados
+    # já gravados fazem a migração falhar e precisam ser removidos antes
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conname = 'uq_usuario_votos_conhecimento_usuario'
+                  AND conrelid = 'licitacoes.usuario_votos'::regclass
+            ) THEN
+                ALTER TABLE licitacoes.usuario_votos
+                    ADD CONSTRAINT uq_usuario_votos_conhecimento_usuario UNIQUE (conhecimento_id, usuario);
+            END IF;
+        END
+        $$
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS licitacoes.log_auditoria (
+            id SERIAL PRIMARY KEY,
+            usuario VARCHAR(100) NOT NULL,
+            acao VARCHAR(50) NOT NULL,
+            recurso_tipo VARCHAR(50) NOT NULL,
+            recurso_id INTEGER NOT NULL,
+            detalhes TEXT,
+            data_acao TIMESTAMP,
+            ip_origem VARCHAR(45)
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS licitacoes.configuracao_sistema (
+            id SERIAL PRIMARY KEY,
+            chave VARCHAR(100) NOT NULL UNIQUE,
+            valor TEXT NOT NULL,
+            descricao TEXT,
+            data_atualizacao TIMESTAMP,
+            atualizado_por VARCHAR(100) NOT NULL
+        )
+    """)
+
+    for nome in INDICES_BUSCA_ANTIGOS:
+        op.execute(f"DROP INDEX IF EXISTS licitacoes.{nome}")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conhecimentos_busca_vetor
+        ON licitacoes.conhecimentos USING gin(busca_vetor)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conhecimentos_ordenacao
+        ON licitacoes.conhecimentos (pontuacao DESC, data_criacao DESC, id DESC)
+    """)
+
+    # Estatísticas pré-calculadas (atualizadas com REFRESH ... CONCURRENTLY pelo backend)
+    op.execute("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS licitacoes.estatisticas_contagens AS
+        SELECT d.dimensao, coalesce(d.valor, 'indefinido') AS valor, count(*) AS total, now() AS atualizado_em
+        FROM licitacoes.conhecimentos c
+        CROSS JOIN LATERAL (VALUES
+            ('status', c.status),
+            ('modalidade', c.modalidade),
+            ('fase', c.fase),
+            ('campus', c.campus)
+        ) AS d(dimensao, valor)
+        GROUP BY d.dimensao, coalesce(d.valor, 'indefinido')
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_estatisticas_contagens
+        ON licitacoes.estatisticas_contagens (dimensao, valor)
+    """)
+
+    op.execute("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS licitacoes.estatisticas_votos_dia AS
+        SELECT date(data_voto) AS dia,
+               count(*) FILTER (WHERE tipo_voto = 'positivo') AS positivos,
+               count(*) FILTER (WHERE tipo_voto = 'negativo') AS negativos
+        FROM licitacoes.usuario_votos
+        GROUP BY date(data_voto)
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_estatisticas_votos_dia
+        ON licitacoes.estatisticas_votos_dia (dia)
+    """)
+
+    op.execute("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS licitacoes.estatisticas_destaques AS
+        (SELECT 'mais_visualizados' AS categoria, id, titulo, coalesce(visualizacoes, 0) AS valor
+         FROM licitacoes.conhecimentos ORDER BY visualizacoes DESC NULLS LAST, id LIMIT 10)
+        UNION ALL
+        (SELECT 'mais_votados' AS categoria, id, titulo, pontuacao AS valor
+         FROM licitacoes.conhecimentos ORDER BY pontuacao DESC, id LIMIT 10)
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_estatisticas_destaques
+        ON licitacoes.estatisticas_destaques (categoria, id)
+    """)
+
+
+def downgrade():
+    op.execute("DROP SCHEMA IF EXISTS licitacoes CASCADE")
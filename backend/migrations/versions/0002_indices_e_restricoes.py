@@ -0,0 +1,75 @@
+"""índices e restrições ausentes do init.sql
+
+- chaves estrangeiras com ON DELETE CASCADE (comentários e votos)
+- comentarios.conhecimento_id NOT NULL e CHECK do tipo de voto
+- índices das chaves estrangeiras, da listagem filtrada por status e da auditoria
+- remove os índices redundantes sobre as chaves primárias criados pelo create_all
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (tabela, constraint, coluna, tabela referenciada)
+CHAVES_ESTRANGEIRAS = (
+    ("comentarios", "comentarios_conhecimento_id_fkey", "conhecimento_id", "conhecimentos"),
+    ("comentarios", "comentarios_resposta_para_fkey", "resposta_para", "comentarios"),
+    ("usuario_votos", "usuario_votos_conhecimento_id_fkey", "conhecimento_id", "conhecimentos"),
+)
+
+INDICES = {
+    "idx_conhecimentos_status_ordenacao":
+        "licitacoes.conhecimentos (status, pontuacao DESC, data_criacao DESC, id DESC)",
+    "idx_comentarios_conhecimento": "licitacoes.comentarios (conhecimento_id)",
+    "idx_comentarios_resposta_para": "licitacoes.comentarios (resposta_para)",
+    "idx_log_auditoria_recurso": "licitacoes.log_auditoria (recurso_tipo, recurso_id, data_acao)",
+    "idx_log_auditoria_usuario": "licitacoes.log_auditoria (usuario, data_acao)",
+}
+
+INDICES_REDUNDANTES = (
+    "ix_licitacoes_conhecimentos_id",
+    "ix_licitacoes_comentarios_id",
+    "ix_licitacoes_usuario_votos_id",
+    "ix_licitacoes_log_auditoria_id",
+    "ix_licitacoes_configuracao_sistema_id",
+)
+
+
+def _recriar_chaves_estrangeiras(ao_excluir: str):
+    for tabela, nome, coluna, referencia in CHAVES_ESTRANGEIRAS:
+        op.execute(f"ALTER TABLE licitacoes.{tabela} DROP CONSTRAINT IF EXISTS {nome}")
+        op.execute(
+            f"ALTER TABLE licitacoes.{tabela} ADD CONSTRAINT {nome} "
+            f"FOREIGN KEY ({coluna}) REFERENCES licitacoes.{referencia}(id) {ao_excluir}")
+
+
+def upgrade():
+    _recriar_chaves_estrangeiras("ON DELETE CASCADE")
+
+    op.execute("ALTER TABLE licitacoes.comentarios ALTER COLUMN conhecimento_id SET NOT NULL")
+
+    op.execute("""
+        ALTER TABLE licitacoes.usuario_votos
+        ADD CONSTRAINT ck_usuario_votos_tipo_voto CHECK (tipo_voto IN ('positivo', 'negativo'))
+    """)
+
+    for nome in INDICES_REDUNDANTES:
+        op.execute(f"DROP INDEX IF EXISTS licitacoes.{nome}")
+    for nome, definicao in INDICES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {definicao}")
+
+
+def downgrade():
+    for nome in INDICES:
+        op.execute(f"DROP INDEX IF EXISTS licitacoes.{nome}")
+
+    op.execute(
+        "ALTER TABLE licitacoes.usuario_votos DROP CONSTRAINT IF EXISTS ck_usuario_votos_tipo_voto")
+    op.execute("ALTER TABLE licitacoes.comentarios ALTER COLUMN conhecimento_id DROP NOT NULL")
+    _recriar_chaves_estrangeiras("")
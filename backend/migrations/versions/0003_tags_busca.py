@@ -0,0 +1,49 @@
+"""tags normalizadas com índice GIN
+
+Coluna gerada tags_busca: união de tags e tags_automaticas sem acentos, em
+minúsculas e sem repetições, indexada com GIN para os operadores @> e &&.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # unaccent() é STABLE; com o dicionário explícito o resultado não depende
+    # do search_path, o que permite declarar a função IMMUTABLE (coluna gerada)
+    op.execute(r"""
+        CREATE OR REPLACE FUNCTION licitacoes.normalizar_tags(tags TEXT[], tags_automaticas TEXT[])
+        RETURNS TEXT[]
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$
+            SELECT coalesce(array_agg(DISTINCT tag ORDER BY tag), '{}')
+            FROM (
+                SELECT btrim(regexp_replace(
+                    lower(public.unaccent('public.unaccent'::regdictionary, t)), '\s+', ' ', 'g')) AS tag
+                FROM unnest(coalesce(tags, '{}') || coalesce(tags_automaticas, '{}')) AS t
+            ) normalizadas
+            WHERE tag <> ''
+        $$
+    """)
+    op.execute("""
+        ALTER TABLE licitacoes.conhecimentos
+        ADD COLUMN IF NOT EXISTS tags_busca TEXT[]
+        GENERATED ALWAYS AS (licitacoes.normalizar_tags(tags, tags_automaticas)) STORED
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conhecimentos_tags_busca
+        ON licitacoes.conhecimentos USING gin(tags_busca)
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS licitacoes.idx_conhecimentos_tags_busca")
+    op.execute("ALTER TABLE licitacoes.conhecimentos DROP COLUMN IF EXISTS tags_busca")
+    op.execute("DROP FUNCTION IF EXISTS licitacoes.normalizar_tags(TEXT[], TEXT[])")
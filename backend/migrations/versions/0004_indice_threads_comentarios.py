@@ -0,0 +1,32 @@
+"""índice das threads de comentários
+
+(conhecimento_id, resposta_para, data_criacao) atende tanto as raízes de um
+conhecimento (resposta_para IS NULL, por data) quanto as respostas de cada
+comentário na consulta recursiva; substitui o índice só por conhecimento_id.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_comentarios_threads
+        ON licitacoes.comentarios (conhecimento_id, resposta_para, data_criacao)
+    """)
+    op.execute("DROP INDEX IF EXISTS licitacoes.idx_comentarios_conhecimento")
+
+
+def downgrade():
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_comentarios_conhecimento
+        ON licitacoes.comentarios (conhecimento_id)
+    """)
+    op.execute("DROP INDEX IF EXISTS licitacoes.idx_comentarios_threads")
@@ -0,0 +1,35 @@
+"""data da última alteração de votos e visualizações
+
+Coluna data_atualizacao (UTC), mantida pelos UPDATEs de votos, da gravação
+em lote das visualizações e do recálculo de tags, com índice: a sincronização
+das sugestões relê só pesos e tags dos conhecimentos alterados desde a
+leitura anterior.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # now() é STABLE: o default não reescreve a tabela (PostgreSQL 11+)
+    op.execute("""
+        ALTER TABLE licitacoes.conhecimentos
+        ADD COLUMN IF NOT EXISTS data_atualizacao TIMESTAMP NOT NULL
+        DEFAULT (now() AT TIME ZONE 'utc')
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conhecimentos_data_atualizacao
+        ON licitacoes.conhecimentos (data_atualizacao)
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS licitacoes.idx_conhecimentos_data_atualizacao")
+    op.execute("ALTER TABLE licitacoes.conhecimentos DROP COLUMN IF EXISTS data_atualizacao")
@@ -1,17 +1,21 @@
 # backend/models.py - Corrigido
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ARRAY, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Text, DateTime, ARRAY, ForeignKey, Computed, UniqueConstraint, CheckConstraint, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
-Base = declarative_base()
+# Base única, compartilhada com database.py e com as migrações (backend/migrations)
+from database import Base
+
+# Configuração de busca textual (português sem acentos, criada no init.sql)
+CONFIG_BUSCA = "licitacoes.portugues"
 
 
 class Conhecimento(Base):
     __tablename__ = "conhecimentos"
     __table_args__ = {'schema': 'licitacoes'}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     titulo = Column(String(500), nullable=False)
     pergunta = Column(Text, nullable=False)
     resposta = Column(Text, nullable=False)
@@ -19,15 +23,33 @@ class Conhecimento(Base):
     fase = Column(String(50))
     tags = Column(ARRAY(String), default=[])
     tags_automaticas = Column(ARRAY(String), default=[])
+    # Tags manuais e automáticas normalizadas (sem acentos, minúsculas), para o
+    # filtro por tags e as contagens por tag (função criada na migração 0003)
+    tags_busca = Column(ARRAY(Text), Computed(
+        "licitacoes.normalizar_tags(tags, tags_automaticas)", persisted=True))
     autor = Column(String(100), nullable=False)
     campus = Column(String(50), default='Capivari')
     data_criacao = Column(DateTime, default=datetime.utcnow)
     votos_positivos = Column(Integer, default=0)
     votos_negativos = Column(Integer, default=0)
     visualizacoes = Column(Integer, default=0)
+    # Pontuação por votos, mantida pelo banco (índice de ordenação no init.sql)
+    pontuacao = Column(Integer, Computed(
+        "coalesce(votos_positivos, 0) - coalesce(votos_negativos, 0)", persisted=True))
     status = Column(String(20), default='novo')
     validado_por = Column(String(100), nullable=True)
     data_validacao = Column(DateTime, nullable=True)
+    # Última alteração de votos ou visualizações, em UTC (migração 0005)
+    data_atualizacao = Column(DateTime, server_default=text("(now() AT TIME ZONE 'utc')"),
+                              nullable=False)
+
+    # Vetor de busca ponderado: titulo (A) > pergunta (B) > resposta (C)
+    busca_vetor = Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{CONFIG_BUSCA}', coalesce(titulo, '')), 'A') || "
+        f"setweight(to_tsvector('{CONFIG_BUSCA}', coalesce(pergunta, '')), 'B') || "
+        f"setweight(to_tsvector('{CONFIG_BUSCA}', coalesce(resposta, '')), 'C')",
+        persisted=True
+    ))
 
     # Relacionamento com comentários
     comentarios = relationship(
@@ -38,9 +60,9 @@ class Comentario(Base):
     __tablename__ = "comentarios"
     __table_args__ = {'schema': 'licitacoes'}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     conhecimento_id = Column(Integer, ForeignKey(
-        'licitacoes.conhecimentos.id'), nullable=False)
+        'licitacoes.conhecimentos.id', ondelete='CASCADE'), nullable=False)
     autor = Column(String(100), nullable=False)
     cargo = Column(String(100), nullable=True)
     texto = Column(Text, nullable=False)
@@ -49,7 +71,7 @@ class Comentario(Base):
     tipo = Column(String(20), default='comentario')
     votos = Column(Integer, default=0)
     resposta_para = Column(Integer, ForeignKey(
-        'licitacoes.comentarios.id'), nullable=True)
+        'licitacoes.comentarios.id', ondelete='CASCADE'), nullable=True)
 
     # Relacionamentos
     conhecimento = relationship("Conhecimento", back_populates="comentarios")
@@ -58,17 +80,20 @@ class Comentario(Base):
 
 class UsuarioVoto(Base):
     __tablename__ = "usuario_votos"
-    __table_args__ = {'schema': 'licitacoes'}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     conhecimento_id = Column(Integer, ForeignKey(
-        'licitacoes.conhecimentos.id'), nullable=False)
+        'licitacoes.conhecimentos.id', ondelete='CASCADE'), nullable=False)
     usuario = Column(String(100), nullable=False)
     tipo_voto = Column(String(10), nullable=False)  # 'positivo' ou 'negativo'
     data_voto = Column(DateTime, default=datetime.utcnow)
 
     # Constraint única para evitar múltiplos votos do mesmo usuário
     __table_args__ = (
+        UniqueConstraint('conhecimento_id', 'usuario',
+                         name='uq_usuario_votos_conhecimento_usuario'),
+        CheckConstraint("tipo_voto IN ('positivo', 'negativo')",
+                        name='ck_usuario_votos_tipo_voto'),
         {'schema': 'licitacoes'},
     )
 
@@ -77,7 +102,7 @@ class LogAuditoria(Base):
     __tablename__ = "log_auditoria"
     __table_args__ = {'schema': 'licitacoes'}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     usuario = Column(String(100), nullable=False)
     # 'criar', 'editar', 'votar', 'validar'
     acao = Column(String(50), nullable=False)
@@ -93,9 +118,24 @@ class ConfiguracaoSistema(Base):
     __tablename__ = "configuracao_sistema"
     __table_args__ = {'schema': 'licitacoes'}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     chave = Column(String(100), nullable=False, unique=True)
     valor = Column(Text, nullable=False)
     descricao = Column(Text, nullable=True)
     data_atualizacao = Column(DateTime, default=datetime.utcnow)
     atualizado_por = Column(String(100), nullable=False)
+
+
+# Índices criados pelas migrações, declarados aqui para o autogenerate do Alembic
+Index("idx_conhecimentos_busca_vetor", Conhecimento.busca_vetor, postgresql_using="gin")
+Index("idx_conhecimentos_tags_busca", Conhecimento.tags_busca, postgresql_using="gin")
+Index("idx_conhecimentos_ordenacao", Conhecimento.pontuacao.desc(),
+      Conhecimento.data_criacao.desc(), Conhecimento.id.desc())
+Index("idx_conhecimentos_status_ordenacao", Conhecimento.status, Conhecimento.pontuacao.desc(),
+      Conhecimento.data_criacao.desc(), Conhecimento.id.desc())
+Index("idx_comentarios_threads", Comentario.conhecimento_id,
+      Comentario.resposta_para, Comentario.data_criacao)
+Index("idx_comentarios_resposta_para", Comentario.resposta_para)
+Index("idx_log_auditoria_recurso", LogAuditoria.recurso_tipo,
+      LogAuditoria.recurso_id, LogAuditoria.data_acao)
+Index("idx_log_auditoria_usuario", LogAuditoria.usuario, LogAuditoria.data_acao)
@@ -0,0 +1,62 @@
+# backend/respostas.py - Respostas JSON pré-serializadas com ETag
+import os
+import hashlib
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request, Response
+
+# Tempo (s) que navegadores e o proxy_cache do nginx podem reutilizar as
+# respostas públicas sem consultar o backend (0 = sempre revalidar via ETag)
+CACHE_HTTP_LISTAGEM = int(os.getenv("CACHE_HTTP_LISTAGEM", 30))
+CACHE_HTTP_ESTATISTICAS = int(os.getenv("CACHE_HTTP_ESTATISTICAS", 60))
+CACHE_HTTP_STALE = int(os.getenv("CACHE_HTTP_STALE", 30))
+
+
+def serializar(valor: Any) -> bytes:
+    """Serializa em JSON (bytes) com orjson; datas no formato ISO 8601"""
+    return orjson.dumps(valor, option=orjson.OPT_NON_STR_KEYS)
+
+
+def calcular_etag(corpo: bytes) -> str:
+    """ETag forte derivada do conteúdo da resposta"""
+    return f'"{hashlib.blake2b(corpo, digest_size=16).hexdigest()}"'
+
+
+def etag_corresponde(request: Request, etag: str) -> bool:
+    """Verifica se o If-None-Match do cliente contém a ETag atual"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    return etag in (valor.strip().removeprefix("W/") for valor in if_none_match.split(","))
+
+
+def cabecalhos_cache(max_age: int) -> Dict[str, str]:
+    """Cabeçalhos de cache HTTP para respostas públicas (iguais para todos os usuários)"""
+    if max_age > 0:
+        cache_control = f"public, max-age={max_age}, stale-while-revalidate={CACHE_HTTP_STALE}"
+    else:
+        cache_control = "public, no-cache"
+    return {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+
+def resposta_json(
+    request: Request,
+    corpo: bytes,
+    headers: Optional[Dict[str, str]] = None,
+    max_age: int = 0
+) -> Response:
+    """Devolve os bytes já serializados, ou 304 se o cliente tem a mesma versão
+
+    Evita a revalidação e a nova serialização pelo response_model do FastAPI.
+    Com max_age = 0 a resposta pode ser guardada, mas é sempre revalidada.
+    """
+    headers = {**cabecalhos_cache(max_age), **(headers or {})}
+    headers["ETag"] = calcular_etag(corpo)
+
+    if etag_corresponde(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=corpo, media_type="application/json", headers=headers)
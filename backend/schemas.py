@@ -0,0 +1,71 @@
+# backend/schemas.py - Modelos Pydantic de entrada e saída da API
+from enum import Enum
+from typing import List, Optional
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class TipoModalidade(str, Enum):
+    PREGAO_ELETRONICO = "pregao_eletronico"
+    DISPENSA_ELETRONICA = "dispensa_eletronica"
+    CONCORRENCIA = "concorrencia"
+    INEXIGIBILIDADE = "inexigibilidade"
+    CONCURSO = "concurso"
+    LEILAO = "leilao"
+
+
+class FaseProcesso(str, Enum):
+    PLANEJAMENTO = "planejamento"
+    SELECAO = "selecao"
+    CONTRATACAO = "contratacao"
+    EXECUCAO = "execucao"
+
+
+class StatusConhecimento(str, Enum):
+    NOVO = "novo"
+    EM_DISCUSSAO = "em_discussao"
+    VALIDADO = "validado"
+
+
+class ConhecimentoCreate(BaseModel):
+    titulo: str = Field(..., min_length=1, max_length=500)
+    pergunta: str = Field(..., min_length=1)
+    resposta: str = Field(..., min_length=1)
+    modalidade: Optional[TipoModalidade] = None
+    fase: Optional[FaseProcesso] = None
+    tags: List[str] = []
+
+
+class ConhecimentoResponse(BaseModel):
+    # Construída a partir de objetos ORM ou de linhas de select(*COLUNAS_LISTAGEM)
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    titulo: str
+    pergunta: str
+    resposta: str
+    modalidade: Optional[str] = None
+    fase: Optional[str] = None
+    tags: Optional[List[str]] = None
+    tags_automaticas: Optional[List[str]] = None
+    autor: str
+    campus: Optional[str] = None
+    data_criacao: Optional[datetime] = None
+    votos_positivos: Optional[int] = 0
+    votos_negativos: Optional[int] = 0
+    visualizacoes: Optional[int] = 0
+    pontuacao: Optional[int] = 0
+    status: Optional[str] = None
+    validado_por: Optional[str] = None
+    data_validacao: Optional[datetime] = None
+
+
+class VotoRequest(BaseModel):
+    tipo_voto: str
+
+
+class ComentarioCreate(BaseModel):
+    texto: str = Field(..., min_length=1, max_length=5000)
+    tipo: str = "comentario"
+    resposta_para: Optional[int] = None
@@ -0,0 +1,305 @@
+# backend/similaridade.py - Índice de similaridade (n-gramas com hashing, matriz esparsa)
+import os
+import re
+import math
+import zlib
+import tempfile
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+
+from busca import normalizar_consulta
+from database import SessionLocal
+from models import Conhecimento
+
+logger = logging.getLogger(__name__)
+
+# Fora do código montado no container (docker-compose usa um volume próprio)
+SIMILARIDADE_ARQUIVO = os.getenv(
+    "SIMILARIDADE_ARQUIVO", os.path.join(tempfile.gettempdir(), "biluapp", "similaridade.npz"))
+SIMILARIDADE_INTERVALO = float(os.getenv("SIMILARIDADE_INTERVALO", 30))
+SIMILARIDADE_LIMIAR_DUPLICADO = float(os.getenv("SIMILARIDADE_LIMIAR_DUPLICADO", 0.8))
+# Linhas na matriz auxiliar que disparam a mescla com a principal
+SIMILARIDADE_BUFFER_MAX = int(os.getenv("SIMILARIDADE_BUFFER_MAX", 256))
+
+# 2^18 colunas: colisões raras para o vocabulário de uma base de licitações
+DIMENSOES = 2 ** 18
+LOTE_SINCRONIZACAO = 5000
+
+_PALAVRA = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+    a ao aos as com como da das de do dos e em entre na nas no nos o os ou para
+    pela pelas pelo pelos por qual quais que se sem ser sua suas seu seus um uma
+    ha nao mais ja quando onde deve pode sao esta este essa esse isso
+""".split())
+
+
+def termos(texto: str) -> List[str]:
+    """Palavras (sem acentos e stopwords) e bigramas de palavras"""
+    palavras = [p for p in _PALAVRA.findall(normalizar_consulta(texto))
+                if len(p) > 1 and p not in STOPWORDS]
+    return palavras + [f"{a} {b}" for a, b in zip(palavras, palavras[1:])]
+
+
+def vetorizar(textos: Sequence[str]) -> sparse.csr_matrix:
+    """Vetores TF (1 + log) normalizados (L2), um por linha, com hashing dos termos"""
+    indptr = [0]
+    indices: List[int] = []
+    valores: List[float] = []
+    for texto in textos:
+        contagem = Counter(zlib.crc32(t.encode()) % DIMENSOES for t in termos(texto))
+        pesos = {coluna: 1 + math.log(n) for coluna, n in contagem.items()}
+        norma = math.sqrt(sum(p * p for p in pesos.values())) or 1.0
+        for coluna in sorted(pesos):
+            indices.append(coluna)
+            valores.append(pesos[coluna] / norma)
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.array(valores, dtype=np.float32), np.array(indices, dtype=np.int32),
+         np.array(indptr, dtype=np.int64)),
+        shape=(len(textos), DIMENSOES))
+
+
+def texto_indexado(titulo: str, pergunta: str) -> str:
+    return f"{titulo} {pergunta}"
+
+
+def _empilhar(matriz, ids, blocos, ids_novos):
+    return (sparse.vstack([matriz, *blocos], format="csr"),
+            np.concatenate([ids, np.asarray(ids_novos, dtype=np.int64)]))
+
+
+class IndiceSimilaridade:
+    """Similaridade de cosseno entre conhecimentos (titulo + pergunta)
+
+    Mantido em memória por worker e salvo em disco. Novos conhecimentos
+    entram incrementalmente: pelo próprio worker que os cria e, para os
+    demais workers e importações, pela sincronização periódica (id > último).
+    Uma consulta é um produto matriz-vetor esparso, sem acessar o banco.
+
+    Os criados localmente vão para uma matriz auxiliar pequena, consultada
+    junto com a principal; a mescla das duas (vstack da matriz inteira) roda
+    em uma thread, na sincronização ou quando a auxiliar chega a
+    SIMILARIDADE_BUFFER_MAX linhas.
+    """
+
+    def __init__(self, arquivo: str = SIMILARIDADE_ARQUIVO, intervalo: float = SIMILARIDADE_INTERVALO):
+        self.arquivo = arquivo
+        self.intervalo = intervalo
+        self._matriz = sparse.csr_matrix((0, DIMENSOES), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._linhas: Dict[int, int] = {}
+        # Matriz auxiliar: conhecimentos ainda não mesclados na principal
+        self._buffer = sparse.csr_matrix((0, DIMENSOES), dtype=np.float32)
+        self._ids_buffer: List[int] = []
+        self._linhas_buffer: Dict[int, int] = {}
+        self._trava: Optional[asyncio.Lock] = None
+        self._mesclagem: Optional[asyncio.Task] = None
+        # Último id lido do banco pela sincronização. Não segue os ids
+        # adicionados localmente, que podem ser maiores que os de outros workers
+        self._sincronizado_ate = 0
+        self._alterado = False
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._ids) + len(self._ids_buffer)
+
+    def _indexado(self, conhecimento_id: int) -> bool:
+        return conhecimento_id in self._linhas or conhecimento_id in self._linhas_buffer
+
+    def adicionar(self, ids: Sequence[int], textos: Sequence[str], vetores=None):
+        """Acrescenta conhecimentos à matriz auxiliar (ids já indexados são ignorados)"""
+        novos = [i for i, id_ in enumerate(ids) if not self._indexado(id_)]
+        if not novos:
+            return
+        if vetores is None:
+            vetores = vetorizar([textos[i] for i in novos])
+        elif len(novos) < len(ids):
+            vetores = vetores[novos]
+
+        inicio = len(self._ids_buffer)
+        self._buffer = sparse.vstack([self._buffer, vetores], format="csr")
+        for deslocamento, i in enumerate(novos):
+            self._ids_buffer.append(ids[i])
+            self._linhas_buffer[ids[i]] = inicio + deslocamento
+        self._alterado = True
+
+        if len(self._ids_buffer) >= SIMILARIDADE_BUFFER_MAX and self._mesclagem is None:
+            try:
+                self._mesclagem = asyncio.get_running_loop().create_task(self._mesclar_pendentes())
+            except RuntimeError:
+                pass  # Fora do event loop: a mescla fica para a próxima sincronização
+
+    def _obter_trava(self) -> asyncio.Lock:
+        # Criada no event loop em execução (como os Events dos workers)
+        if self._trava is None:
+            self._trava = asyncio.Lock()
+        return self._trava
+
+    async def mesclar(self, vetores=None, ids: Sequence[int] = ()):
+        """Incorpora à matriz principal a auxiliar e, da sincronização, vetores novos
+
+        O vstack roda em uma thread; a troca das matrizes acontece de uma vez
+        no event loop. Linhas adicionadas durante a mescla ficam na auxiliar.
+        """
+        async with self._obter_trava():
+            n = len(self._ids_buffer)
+            # A auxiliar pode repetir ids que a carga do disco já trouxe
+            pendentes = [i for i in range(n) if self._ids_buffer[i] not in self._linhas]
+            blocos = [self._buffer[pendentes]] if pendentes else []
+            ids_novos = [self._ids_buffer[i] for i in pendentes]
+            if vetores is not None:
+                extras = [i for i, id_ in enumerate(ids) if not self._indexado(id_)]
+                if extras:
+                    blocos.append(vetores[extras])
+                    ids_novos += [ids[i] for i in extras]
+            if not n and not ids_novos:
+                return
+
+            if ids_novos:
+                matriz, ids_matriz = await asyncio.to_thread(
+                    _empilhar, self._matriz, self._ids, blocos, ids_novos)
+                inicio = len(self._ids)
+                self._matriz, self._ids = matriz, ids_matriz
+                for deslocamento, id_ in enumerate(ids_novos):
+                    self._linhas[id_] = inicio + deslocamento
+
+            restantes = [i for i in range(n, len(self._ids_buffer))
+                         if self._ids_buffer[i] not in self._linhas]
+            self._buffer = self._buffer[restantes]
+            self._ids_buffer = [self._ids_buffer[i] for i in restantes]
+            self._linhas_buffer = {id_: i for i, id_ in enumerate(self._ids_buffer)}
+            self._alterado = True
+
+    async def _mesclar_pendentes(self):
+        try:
+            await self.mesclar()
+        except Exception as e:
+            logger.error("Erro ao mesclar índice de similaridade: %s", e)
+        finally:
+            self._mesclagem = None
+
+    def _melhores(self, vetor, k: int, excluir: Optional[int] = None) -> List[Tuple[int, float]]:
+        # Vetor da consulta denso: matriz esparsa x vetor denso é um único
+        # percurso das linhas, sem montar o produto esparso x esparso
+        denso = np.zeros(DIMENSOES, dtype=np.float32)
+        denso[vetor.indices] = vetor.data
+        melhores = []
+        for matriz, ids, linhas in ((self._matriz, self._ids, self._linhas),
+                                    (self._buffer, self._ids_buffer, self._linhas_buffer)):
+            if not len(ids):
+                continue
+            pontuacoes = matriz @ denso
+            if excluir in linhas:
+                pontuacoes[linhas[excluir]] = -1.0
+
+            m = min(k, len(pontuacoes))
+            candidatos = np.argpartition(-pontuacoes, m - 1)[:m]
+            melhores += [(int(ids[i]), float(pontuacoes[i]))
+                         for i in candidatos if pontuacoes[i] > 0]
+        melhores.sort(key=lambda par: -par[1])
+        return melhores[:k]
+
+    def similares(self, texto: str, k: int = 5) -> List[Tuple[int, float]]:
+        """(id, similaridade) dos k conhecimentos mais parecidos com o texto"""
+        return self._melhores(vetorizar([texto]), k)
+
+    def relacionados(self, conhecimento_id: int, k: int = 5) -> List[Tuple[int, float]]:
+        """(id, similaridade) dos k conhecimentos mais parecidos com o informado"""
+        if conhecimento_id in self._linhas:
+            vetor = self._matriz[self._linhas[conhecimento_id]]
+        elif conhecimento_id in self._linhas_buffer:
+            vetor = self._buffer[self._linhas_buffer[conhecimento_id]]
+        else:
+            return []
+        return self._melhores(vetor, k, excluir=conhecimento_id)
+
+    def carregar(self):
+        """Lê o índice salvo em disco, se houver"""
+        if not os.path.exists(self.arquivo):
+            return
+        with np.load(self.arquivo) as dados:
+            self._matriz = sparse.csr_matrix(
+                (dados["valores"], dados["indices"], dados["indptr"]),
+                shape=(len(dados["ids"]), DIMENSOES))
+            self._ids = dados["ids"]
+            self._sincronizado_ate = int(dados["sincronizado_ate"])
+        self._linhas = {int(id_): i for i, id_ in enumerate(self._ids)}
+        logger.info("Índice de similaridade carregado: %d conhecimentos", len(self._ids))
+
+    def salvar(self):
+        """Grava a matriz principal em disco (substituição atômica do arquivo)
+
+        Chamado em uma thread, com a trava e logo após mesclar, por _salvar.
+        """
+        os.makedirs(os.path.dirname(self.arquivo) or ".", exist_ok=True)
+        temporario = f"{self.arquivo}.{os.getpid()}.tmp.npz"
+        np.savez(temporario, valores=self._matriz.data, indices=self._matriz.indices,
+                 indptr=self._matriz.indptr, ids=self._ids,
+                 sincronizado_ate=np.int64(self._sincronizado_ate))
+        os.replace(temporario, self.arquivo)
+        self._alterado = False
+
+    async def sincronizar(self):
+        """Indexa os conhecimentos criados desde o último id indexado (em lotes)"""
+        while True:
+            async with SessionLocal() as db:
+                linhas = (await db.execute(
+                    select(Conhecimento.id, Conhecimento.titulo, Conhecimento.pergunta)
+                    .where(Conhecimento.id > self._sincronizado_ate)
+                    .order_by(Conhecimento.id)
+                    .limit(LOTE_SINCRONIZACAO)
+                )).all()
+            if not linhas:
+                break
+
+            ids = [linha.id for linha in linhas]
+            textos = [texto_indexado(linha.titulo, linha.pergunta) for linha in linhas]
+            # Vetorização e mescla fora do event loop (lotes grandes na primeira carga)
+            vetores = await asyncio.to_thread(vetorizar, textos)
+            await self.mesclar(vetores, ids)
+            self._sincronizado_ate = ids[-1]
+            self._alterado = True
+            logger.debug("Índice de similaridade: %d conhecimentos", len(self))
+
+        await self._salvar()
+
+    async def _salvar(self):
+        # Mescla a auxiliar antes, para que o arquivo tenha todos os conhecimentos
+        await self.mesclar()
+        async with self._obter_trava():
+            if self._alterado:
+                await asyncio.to_thread(self.salvar)
+
+    async def _executar(self):
+        try:
+            await asyncio.to_thread(self.carregar)
+        except Exception as e:
+            logger.error("Erro ao carregar índice de similaridade: %s", e)
+        while True:
+            try:
+                await self.sincronizar()
+            except Exception as e:
+                logger.error("Erro ao sincronizar índice de similaridade: %s", e)
+            await asyncio.sleep(self.intervalo)
+
+    def iniciar(self):
+        """Carrega o índice e inicia a sincronização periódica (em segundo plano)"""
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        """Interrompe a sincronização e salva o índice, se alterado"""
+        for tarefa in (self._tarefa, self._mesclagem):
+            if tarefa:
+                tarefa.cancel()
+                await asyncio.gather(tarefa, return_exceptions=True)
+        self._tarefa = self._mesclagem = None
+        await self._salvar()
+
+
+indice_similaridade = IndiceSimilaridade()
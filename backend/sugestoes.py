@@ -0,0 +1,371 @@
+# backend/sugestoes.py - Sugestões da caixa de busca (prefixos em memória, sem acentos)
+import os
+import re
+import math
+import heapq
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, text
+
+from busca import normalizar_consulta
+from database import SessionLocal
+from models import Conhecimento
+
+logger = logging.getLogger(__name__)
+
+SUGESTOES_INTERVALO = float(os.getenv("SUGESTOES_INTERVALO", 60))
+# Prefixos com mais chaves que isso guardam a lista dos melhores títulos
+SUGESTOES_MAX_CANDIDATOS = int(os.getenv("SUGESTOES_MAX_CANDIDATOS", 256))
+
+# Tamanho das listas dos melhores por prefixo (limite máximo da API)
+TOPO_TAMANHO = 20
+
+# Chaves indexadas por título: o texto a partir de cada uma das primeiras palavras
+PALAVRAS_POR_TITULO = 12
+LOTE_SINCRONIZACAO = 5000
+
+# Os pesos relidos são os alterados desde a leitura anterior, menos a margem:
+# cobre transações que começaram antes dela e só confirmaram depois
+MARGEM_ATUALIZACAO = timedelta(minutes=1)
+SQL_AGORA = text("SELECT now() AT TIME ZONE 'utc'")
+
+# Maior caractere: (prefixo + _FIM) limita as chaves que começam com o prefixo
+_FIM = "\U0010ffff"
+_PALAVRA = re.compile(r"\w+")
+
+
+def normalizar_texto(texto: str) -> str:
+    """Sem acentos, minúsculas e sem pontuação (palavras separadas por um espaço)"""
+    return " ".join(_PALAVRA.findall(normalizar_consulta(texto)))
+
+
+def chaves_titulo(titulo: str) -> List[str]:
+    """Sufixos do título normalizado que começam em cada palavra
+
+    "Dispensa de licitação" gera "dispensa de licitacao", "de licitacao" e
+    "licitacao": a busca por prefixo encontra o título a partir de qualquer palavra.
+    """
+    palavras = normalizar_texto(titulo).split(" ")
+    return [" ".join(palavras[i:]) for i in range(min(len(palavras), PALAVRAS_POR_TITULO))
+            if palavras[i]]
+
+
+def calcular_peso(pontuacao: Optional[int], visualizacoes: Optional[int]) -> float:
+    """Relevância de um título: votos e, com peso logarítmico, visualizações"""
+    return (pontuacao or 0) + math.log1p(visualizacoes or 0)
+
+
+def _inserir(lista: list, item):
+    # insort sem repetir itens
+    posicao = bisect_left(lista, item)
+    if posicao == len(lista) or lista[posicao] != item:
+        lista.insert(posicao, item)
+
+
+def _faixa(lista: list, inicio, fim) -> list:
+    """Itens de uma lista ordenada entre inicio (inclusive) e fim"""
+    return lista[bisect_left(lista, inicio):bisect_left(lista, fim)]
+
+
+def _montar(linhas, minimo: int):
+    """Chaves e tags ordenadas e listas dos melhores por prefixo (executado em uma thread)
+
+    Usado só na primeira carga. As listas dos prefixos frequentes são montadas
+    de baixo para cima: a de um prefixo vem das listas (ou, se pequenas, das
+    faixas) dos prefixos uma letra mais longos.
+    """
+    # Ordena por blocos e intercala em Python: um único sorted() em C seguraria
+    # o GIL (e o event loop) durante toda a ordenação
+    blocos = [sorted((chave, linha.id) for linha in linhas[i:i + LOTE_SINCRONIZACAO]
+                     for chave in chaves_titulo(linha.titulo))
+              for i in range(0, len(linhas), LOTE_SINCRONIZACAO)]
+    chaves = list(heapq.merge(*blocos))
+    pesos = {linha.id: calcular_peso(linha.pontuacao, linha.visualizacoes) for linha in linhas}
+    tags = {linha.id: tuple(linha.tags_busca or []) for linha in linhas}
+    contagem = Counter(tag for tags_linha in tags.values() for tag in tags_linha)
+    topo: Dict[str, List[int]] = {}
+
+    def ordem(id_):
+        return (-pesos[id_], id_)
+
+    def visitar(prefixo: str, inicio: int, fim: int) -> List[int]:
+        if fim - inicio <= minimo:
+            return heapq.nsmallest(TOPO_TAMANHO, {id_ for _, id_ in chaves[inicio:fim]}, key=ordem)
+        candidatos = []
+        for filho, de, ate in _filhos(chaves, prefixo, inicio, fim):
+            candidatos += [chaves[de][1]] if filho is None else visitar(filho, de, ate)
+        topo[prefixo] = heapq.nsmallest(TOPO_TAMANHO, set(candidatos), key=ordem)
+        return topo[prefixo]
+
+    visitar("", 0, len(chaves))
+    topo.pop("", None)
+    titulos = {linha.id: linha.titulo for linha in linhas}
+    return chaves, titulos, pesos, tags, contagem, topo
+
+
+def _filhos(chaves: List[Tuple[str, int]], prefixo: str, inicio: int, fim: int):
+    """Divide a faixa de um prefixo pelo próximo caractere
+
+    Gera (prefixo + caractere, início, fim) e, para cada chave igual ao próprio
+    prefixo, (None, posição, posição + 1).
+    """
+    n = len(prefixo)
+    posicao = inicio
+    while posicao < fim and len(chaves[posicao][0]) == n:
+        yield None, posicao, posicao + 1
+        posicao += 1
+    while posicao < fim:
+        filho = chaves[posicao][0][:n + 1]
+        fim_filho = bisect_left(chaves, (filho + _FIM,), posicao, fim)
+        yield filho, posicao, fim_filho
+        posicao = fim_filho
+
+
+class IndiceSugestoes:
+    """Títulos e tags em listas ordenadas, consultadas por busca binária
+
+    Prefixos com mais de SUGESTOES_MAX_CANDIDATOS chaves guardam a lista dos
+    TOPO_TAMANHO melhores ids (por peso), mantida a cada inserção e releitura
+    de pesos; os demais são ordenados na consulta, sobre no máximo esse número
+    de chaves. Cada sugestão faz trabalho limitado, sem acessar o banco.
+
+    A primeira carga monta tudo em uma thread; depois, conhecimentos novos
+    (do worker que os cria e da sincronização por id) entram com insort e os
+    pesos e tags relidos são só os dos conhecimentos alterados.
+    """
+
+    def __init__(self, intervalo: float = SUGESTOES_INTERVALO):
+        self.intervalo = intervalo
+        self._chaves: List[Tuple[str, int]] = []
+        self._titulos: Dict[int, str] = {}
+        self._pesos: Dict[int, float] = {}
+        self._tags_por_id: Dict[int, Tuple[str, ...]] = {}
+        self._tags: List[str] = []
+        self._contagem_tags: Counter = Counter()
+        # Prefixo frequente -> melhores ids, do mais ao menos relevante
+        self._topo: Dict[str, List[int]] = {}
+        self._sincronizado_ate = 0
+        self._pesos_ate = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._titulos)
+
+    def _ordem(self, conhecimento_id: int):
+        return (-self._pesos.get(conhecimento_id, 0.0), conhecimento_id)
+
+    def _melhores(self, ids) -> List[int]:
+        return heapq.nsmallest(TOPO_TAMANHO, set(ids), key=self._ordem)
+
+    def _faixa_chaves(self, prefixo: str) -> Tuple[int, int]:
+        return (bisect_left(self._chaves, (prefixo,)),
+                bisect_left(self._chaves, (prefixo + _FIM,)))
+
+    def _recalcular(self, prefixo: str):
+        """Refaz a lista de um prefixo a partir das listas e faixas dos filhos"""
+        candidatos = []
+        for filho, inicio, fim in _filhos(self._chaves, prefixo, *self._faixa_chaves(prefixo)):
+            if filho is None:
+                candidatos.append(self._chaves[inicio][1])
+            elif filho in self._topo:
+                candidatos += self._topo[filho]
+            else:
+                candidatos += [id_ for _, id_ in self._chaves[inicio:fim]]
+        self._topo[prefixo] = self._melhores(candidatos)
+
+    def _entra(self, conhecimento_id: int, lista: List[int]) -> bool:
+        return conhecimento_id not in lista and (
+            len(lista) < TOPO_TAMANHO or self._ordem(conhecimento_id) < self._ordem(lista[-1]))
+
+    def _indexar_chave(self, chave: str, conhecimento_id: int):
+        _inserir(self._chaves, (chave, conhecimento_id))
+        # Prefixos que passaram a ser frequentes, refeitos do mais longo ao mais curto
+        novos = []
+        for tamanho in range(1, len(chave) + 1):
+            prefixo = chave[:tamanho]
+            lista = self._topo.get(prefixo)
+            if lista is not None:
+                if self._entra(conhecimento_id, lista):
+                    self._topo[prefixo] = self._melhores(lista + [conhecimento_id])
+                continue
+            inicio, fim = self._faixa_chaves(prefixo)
+            if fim - inicio <= SUGESTOES_MAX_CANDIDATOS:
+                break
+            novos.append(prefixo)
+        for prefixo in reversed(novos):
+            self._recalcular(prefixo)
+
+    def _alterar_tags(self, conhecimento_id: int, tags: Sequence[str]):
+        antigas = self._tags_por_id.get(conhecimento_id, ())
+        for tag in antigas:
+            self._contagem_tags[tag] -= 1
+            if self._contagem_tags[tag] <= 0:
+                del self._contagem_tags[tag]
+                posicao = bisect_left(self._tags, tag)
+                if posicao < len(self._tags) and self._tags[posicao] == tag:
+                    del self._tags[posicao]
+        for tag in tags:
+            if not self._contagem_tags[tag]:
+                _inserir(self._tags, tag)
+            self._contagem_tags[tag] += 1
+        self._tags_por_id[conhecimento_id] = tuple(tags)
+
+    def adicionar(self, conhecimento_id: int, titulo: str, tags: Sequence[str], peso: float = 0.0):
+        """Acrescenta um conhecimento (tags já normalizadas); ids repetidos são ignorados"""
+        if conhecimento_id in self._titulos:
+            return
+        self._titulos[conhecimento_id] = titulo
+        self._pesos.setdefault(conhecimento_id, peso)
+        for chave in chaves_titulo(titulo):
+            self._indexar_chave(chave, conhecimento_id)
+        self._alterar_tags(conhecimento_id, tags)
+
+    async def _carregar(self, linhas):
+        """Primeira carga: montagem completa em uma thread e troca de uma vez"""
+        chaves, titulos, pesos, tags_por_id, contagem, topo = await asyncio.to_thread(
+            _montar, linhas, SUGESTOES_MAX_CANDIDATOS)
+        # Criados localmente antes ou durante a montagem
+        locais = [(id_, titulo, self._tags_por_id.get(id_, ()))
+                  for id_, titulo in self._titulos.items() if id_ not in pesos]
+
+        self._chaves, self._topo, self._contagem_tags = chaves, topo, contagem
+        self._tags = sorted(contagem)
+        self._pesos.update(pesos)
+        self._titulos.update(titulos)
+        self._tags_por_id.update(tags_por_id)
+        for id_, titulo, tags in locais:
+            del self._titulos[id_]
+            self._tags_por_id.pop(id_, None)
+            self.adicionar(id_, titulo, tags)
+
+    async def _acrescentar(self, linhas):
+        """Lote da sincronização: insort por conhecimento, cedendo o event loop entre eles"""
+        for linha in linhas:
+            self.adicionar(linha.id, linha.titulo, linha.tags_busca or [],
+                           calcular_peso(linha.pontuacao, linha.visualizacoes))
+            await asyncio.sleep(0)
+
+    async def _atualizar(self, linhas):
+        """Aplica pesos e tags relidos e ajusta as listas dos prefixos afetados"""
+        # prefixo -> ids que podem entrar; None quando a lista precisa ser refeita
+        afetados: Dict[str, Optional[set]] = {}
+        for numero, linha in enumerate(linhas, start=1):
+            if linha.id not in self._titulos:
+                continue
+            tags = tuple(linha.tags_busca or [])
+            if tags != self._tags_por_id.get(linha.id, ()):
+                self._alterar_tags(linha.id, tags)
+
+            antigo = self._pesos.get(linha.id, 0.0)
+            novo = calcular_peso(linha.pontuacao, linha.visualizacoes)
+            if novo == antigo:
+                continue
+            self._pesos[linha.id] = novo
+            for chave in chaves_titulo(self._titulos[linha.id]):
+                for tamanho in range(1, len(chave) + 1):
+                    prefixo = chave[:tamanho]
+                    lista = self._topo.get(prefixo)
+                    if lista is None:
+                        break
+                    if linha.id in lista and novo < antigo:
+                        afetados[prefixo] = None
+                    elif afetados.get(prefixo, ()) is not None and (
+                            linha.id in lista or self._entra(linha.id, lista)):
+                        afetados.setdefault(prefixo, set()).add(linha.id)
+            if numero % 10 == 0:
+                await asyncio.sleep(0)
+
+        for numero, prefixo in enumerate(sorted(afetados, key=len, reverse=True), start=1):
+            if afetados[prefixo] is None:
+                self._recalcular(prefixo)
+            else:
+                self._topo[prefixo] = self._melhores(self._topo[prefixo] + list(afetados[prefixo]))
+            if numero % 10 == 0:
+                await asyncio.sleep(0)
+
+    def sugerir(self, consulta: str, limite: int = 8) -> dict:
+        """Títulos (por relevância) e tags (por uso) que começam com a consulta"""
+        prefixo = normalizar_texto(consulta)
+        if not prefixo:
+            return {"titulos": [], "tags": []}
+
+        limite = min(limite, TOPO_TAMANHO)
+        if prefixo in self._topo:
+            melhores = self._topo[prefixo][:limite]
+        else:
+            # Prefixo pouco frequente: no máximo SUGESTOES_MAX_CANDIDATOS chaves
+            inicio, fim = self._faixa_chaves(prefixo)
+            melhores = heapq.nsmallest(
+                limite, {id_ for _, id_ in self._chaves[inicio:fim]}, key=self._ordem)
+        tags = heapq.nsmallest(
+            limite, _faixa(self._tags, prefixo, prefixo + _FIM),
+            key=lambda tag: (-self._contagem_tags[tag], tag))
+
+        return {
+            "titulos": [{"id": id_, "titulo": self._titulos[id_]} for id_ in melhores],
+            "tags": [{"tag": tag, "total": self._contagem_tags[tag]} for tag in tags]
+        }
+
+    async def sincronizar(self):
+        """Indexa os conhecimentos novos (por id) e relê pesos e tags dos alterados"""
+        colunas = (Conhecimento.id, Conhecimento.tags_busca,
+                   Conhecimento.pontuacao, Conhecimento.visualizacoes)
+        async with SessionLocal() as db:
+            # Antes dos lotes: os pesos lidos neles valem a partir deste instante
+            agora = await db.scalar(SQL_AGORA)
+            primeira_carga = not self._sincronizado_ate
+            novas = []
+            ultimo_id = self._sincronizado_ate
+            while True:
+                linhas = (await db.execute(
+                    select(*colunas, Conhecimento.titulo)
+                    .where(Conhecimento.id > ultimo_id)
+                    .order_by(Conhecimento.id)
+                    .limit(LOTE_SINCRONIZACAO)
+                )).all()
+                if not linhas:
+                    break
+                ultimo_id = linhas[-1].id
+                if primeira_carga:
+                    novas += linhas
+                else:
+                    await self._acrescentar(linhas)
+                    self._sincronizado_ate = ultimo_id
+            if novas:
+                await self._carregar(novas)
+                self._sincronizado_ate = ultimo_id
+
+            if self._pesos_ate is not None:
+                result = await db.execute(
+                    select(*colunas)
+                    .where(Conhecimento.data_atualizacao >= self._pesos_ate - MARGEM_ATUALIZACAO))
+                await self._atualizar(result.all())
+            self._pesos_ate = agora
+        logger.debug("Índice de sugestões: %d conhecimentos", len(self))
+
+    async def _executar(self):
+        while True:
+            try:
+                await self.sincronizar()
+            except Exception as e:
+                logger.error("Erro ao sincronizar índice de sugestões: %s", e)
+            await asyncio.sleep(self.intervalo)
+
+    def iniciar(self):
+        """Inicia a carga e a sincronização periódica (em segundo plano)"""
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        """Interrompe a sincronização"""
+        if self._tarefa:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+
+indice_sugestoes = IndiceSugestoes()
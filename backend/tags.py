@@ -0,0 +1,205 @@
+# backend/tags.py - Detecção automática de tags por vocabulário (Aho-Corasick)
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from busca import normalizar_consulta
+from models import Conhecimento, ConfiguracaoSistema
+
+logger = logging.getLogger(__name__)
+
+# Chave em configuracao_sistema com o vocabulário em JSON: {"tag": ["termo", ...]}
+CHAVE_VOCABULARIO = "tags_vocabulario"
+TAGS_RECARGA_INTERVALO = float(os.getenv("TAGS_RECARGA_INTERVALO", 60))
+
+# Vocabulário padrão, usado enquanto não houver configuração no banco
+VOCABULARIO_PADRAO: Dict[str, List[str]] = {
+    "dispensa": ["dispensa", "dispensa de licitação", "dispensa eletrônica", "contratação direta"],
+    "inexigibilidade": ["inexigibilidade", "inexigível"],
+    "pregao": ["pregão", "pregão eletrônico"],
+    "concorrencia": ["concorrência"],
+    "etp": ["etp", "estudo técnico preliminar", "estudos técnicos preliminares"],
+    "termo-de-referencia": ["termo de referência"],
+    "dfd": ["dfd", "documento de formalização de demanda", "documento de formalização da demanda"],
+    "pca": ["pca", "plano de contratações anual", "plano anual de contratações"],
+    "habilitacao": ["habilitação", "inabilitação", "documentos de habilitação"],
+    "srp": ["srp", "sistema de registro de preços", "registro de preços", "ata de registro de preços"],
+    "pesquisa-de-precos": ["pesquisa de preços", "pesquisa de mercado", "cotação", "valor estimado"],
+    "impugnacao": ["impugnação", "pedido de esclarecimento"],
+    "aditivo": ["termo aditivo", "aditivo contratual", "aditamento"],
+    "fiscalizacao": ["fiscal do contrato", "gestor do contrato", "fiscalização contratual"],
+    "mapa-de-riscos": ["mapa de riscos", "matriz de riscos"],
+    "me-epp": ["microempresa", "empresa de pequeno porte", "me/epp", "lc 123"],
+    "lei-14133": ["14.133", "14133", "nova lei de licitações"],
+    "catmat": ["catmat", "catser"],
+    "comprasnet": ["comprasnet", "compras.gov.br", "siasg"],
+}
+
+
+class AutomatoAhoCorasick:
+    """Automato de Aho-Corasick: encontra todos os termos em O(tamanho do texto)"""
+
+    def __init__(self, termos: Iterable[Tuple[str, str]]):
+        self._transicoes: List[Dict[str, int]] = [{}]
+        self._falha: List[int] = [0]
+        self._saidas: List[List[Tuple[int, str]]] = [[]]
+
+        for termo, tag in termos:
+            self._inserir(termo, tag)
+        self._construir_falhas()
+
+    def _inserir(self, termo: str, tag: str):
+        estado = 0
+        for c in termo:
+            proximo = self._transicoes[estado].get(c)
+            if proximo is None:
+                proximo = len(self._transicoes)
+                self._transicoes[estado][c] = proximo
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._saidas.append([])
+            estado = proximo
+        self._saidas[estado].append((len(termo), tag))
+
+    def _construir_falhas(self):
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for c, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and c not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                self._falha[proximo] = self._transicoes[falha].get(c, 0)
+                self._saidas[proximo] = self._saidas[proximo] + \
+                    self._saidas[self._falha[proximo]]
+
+    def buscar(self, texto: str) -> Iterator[Tuple[int, int, str]]:
+        """Gera (início, fim, tag) para cada ocorrência de termo no texto"""
+        estado = 0
+        for i, c in enumerate(texto):
+            while estado and c not in self._transicoes[estado]:
+                estado = self._falha[estado]
+            estado = self._transicoes[estado].get(c, 0)
+            for comprimento, tag in self._saidas[estado]:
+                yield i - comprimento + 1, i + 1, tag
+
+
+class TagDetector:
+    """Detecta tags de licitação no texto, sem diferenciar acentos e maiúsculas
+
+    O vocabulário é compilado uma única vez em um automato; a detecção custa
+    O(tamanho do texto) independentemente do número de termos.
+    """
+
+    def __init__(self, vocabulario: Optional[Dict[str, List[str]]] = None):
+        self._versao: Optional[datetime] = None
+        self._verificado_em = 0.0
+        self.compilar(vocabulario or VOCABULARIO_PADRAO)
+
+    def compilar(self, vocabulario: Dict[str, List[str]]):
+        """Compila o vocabulário e substitui o automato atual"""
+        termos = {}
+        for tag, lista in vocabulario.items():
+            for termo in lista:
+                termo_normalizado = normalizar_consulta(termo)
+                if termo_normalizado:
+                    termos[termo_normalizado] = tag
+        self._automato = AutomatoAhoCorasick(termos.items())
+        logger.info(
+            "Vocabulário de tags compilado: %d tags, %d termos", len(vocabulario), len(termos))
+
+    def detectar_tags(self, texto: str) -> List[str]:
+        """Retorna as tags cujos termos aparecem como palavras inteiras no texto"""
+        texto = normalizar_consulta(texto)
+        tags = set()
+        for inicio, fim, tag in self._automato.buscar(texto):
+            # Exige limite de palavra nos dois lados ("etp" não casa com "setpoint")
+            if inicio > 0 and texto[inicio - 1].isalnum():
+                continue
+            if fim < len(texto) and texto[fim].isalnum():
+                continue
+            tags.add(tag)
+        return sorted(tags)
+
+    async def atualizar(self, db: AsyncSession):
+        """Recompila o vocabulário se a configuração mudou (verificado a cada intervalo)"""
+        if time.monotonic() - self._verificado_em < TAGS_RECARGA_INTERVALO:
+            return
+        # Marcado antes do await: requisições concorrentes não repetem a consulta
+        self._verificado_em = time.monotonic()
+
+        try:
+            config = await db.scalar(select(ConfiguracaoSistema).where(
+                ConfiguracaoSistema.chave == CHAVE_VOCABULARIO))
+            if config is None or config.data_atualizacao == self._versao:
+                return
+
+            self.compilar(json.loads(config.valor))
+            self._versao = config.data_atualizacao
+        except Exception as e:
+            logger.error("Erro ao recarregar vocabulário de tags: %s", e)
+
+
+async def retag_todos(db: AsyncSession, detector: TagDetector, lote: int = 1000) -> int:
+    """Recalcula tags_automaticas de toda a tabela em lotes (memória constante)"""
+    await detector.atualizar(db)
+
+    ultimo_id = 0
+    total = 0
+    while True:
+        result = await db.execute(
+            select(Conhecimento.id, Conhecimento.titulo,
+                   Conhecimento.pergunta, Conhecimento.resposta)
+            .where(Conhecimento.id > ultimo_id)
+            .order_by(Conhecimento.id)
+            .limit(lote)
+        )
+        linhas = result.all()
+        if not linhas:
+            break
+
+        # UPDATE por chave primária em lote (executemany); data_atualizacao
+        # faz a sincronização das sugestões reler as tags alteradas
+        agora = datetime.utcnow()
+        await db.execute(update(Conhecimento), [
+            {
+                "id": linha.id,
+                "tags_automaticas": detector.detectar_tags(
+                    f"{linha.titulo} {linha.pergunta} {linha.resposta}"),
+                "data_atualizacao": agora
+            }
+            for linha in linhas
+        ])
+        await db.commit()
+
+        ultimo_id = linhas[-1].id
+        total += len(linhas)
+        logger.info("Tags recalculadas para %d conhecimentos", total)
+
+    return total
+
+
+if __name__ == "__main__":
+    from cache import conectar_redis, invalidar_cache, fechar_redis
+    from database import SessionLocal, engine
+
+    async def _main():
+        async with SessionLocal() as db:
+            total = await retag_todos(db, TagDetector())
+        await conectar_redis()
+        await invalidar_cache()
+        await fechar_redis()
+        await engine.dispose()
+        print(f"{total} conhecimentos reprocessados")
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,23 @@
+# tests/conftest.py - Fixtures compartilhadas
+import pytest
+from sqlalchemy import text
+
+from database import engine, DATABASE_URL
+
+
+@pytest.fixture
+async def banco():
+    """Engine da aplicação, com o schema migrado (testes pulados sem Postgres)
+
+    Usa DATABASE_URL; prepare o banco com "alembic upgrade head".
+    """
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1 FROM licitacoes.conhecimentos LIMIT 1"))
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"Postgres migrado indisponível em {DATABASE_URL}: {e}")
+
+    yield engine
+    # O pool fica preso ao event loop do teste
+    await engine.dispose()
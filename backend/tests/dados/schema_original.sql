@@ -0,0 +1,83 @@
+-- Schema do init.sql original (antes das migrações), usado em tests/test_migracoes.py
+CREATE SCHEMA IF NOT EXISTS licitacoes;
+
+CREATE TABLE licitacoes.conhecimentos (
+    id SERIAL PRIMARY KEY,
+    titulo VARCHAR(500) NOT NULL,
+    pergunta TEXT NOT NULL,
+    resposta TEXT NOT NULL,
+    modalidade VARCHAR(50),
+    fase VARCHAR(50),
+    tags TEXT[],
+    tags_automaticas TEXT[],
+    autor VARCHAR(100) NOT NULL,
+    campus VARCHAR(50) DEFAULT 'Capivari',
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    votos_positivos INTEGER DEFAULT 0,
+    votos_negativos INTEGER DEFAULT 0,
+    visualizacoes INTEGER DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'novo',
+    validado_por VARCHAR(100),
+    data_validacao TIMESTAMP
+);
+
+CREATE TABLE licitacoes.comentarios (
+    id SERIAL PRIMARY KEY,
+    conhecimento_id INTEGER REFERENCES licitacoes.conhecimentos(id),
+    autor VARCHAR(100) NOT NULL,
+    cargo VARCHAR(100),
+    texto TEXT NOT NULL,
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    tipo VARCHAR(20) DEFAULT 'comentario',
+    votos INTEGER DEFAULT 0,
+    resposta_para INTEGER REFERENCES licitacoes.comentarios(id)
+);
+
+-- Corrigido: Uso de índices GIN para busca de texto completo
+CREATE INDEX idx_busca_titulo ON licitacoes.conhecimentos USING gin(to_tsvector('portuguese', titulo));
+CREATE INDEX idx_busca_pergunta ON licitacoes.conhecimentos USING gin(to_tsvector('portuguese', pergunta));
+CREATE INDEX idx_busca_resposta ON licitacoes.conhecimentos USING gin(to_tsvector('portuguese', resposta));
+-- Tabelas que o create_all do backend original criava na inicialização
+CREATE TABLE licitacoes.configuracao_sistema (
+    id SERIAL NOT NULL,
+    chave VARCHAR(100) NOT NULL,
+    valor TEXT NOT NULL,
+    descricao TEXT,
+    data_atualizacao TIMESTAMP WITHOUT TIME ZONE,
+    atualizado_por VARCHAR(100) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (chave)
+);
+CREATE INDEX ix_licitacoes_configuracao_sistema_id ON licitacoes.configuracao_sistema (id);
+
+CREATE TABLE licitacoes.log_auditoria (
+    id SERIAL NOT NULL,
+    usuario VARCHAR(100) NOT NULL,
+    acao VARCHAR(50) NOT NULL,
+    recurso_tipo VARCHAR(50) NOT NULL,
+    recurso_id INTEGER NOT NULL,
+    detalhes TEXT,
+    data_acao TIMESTAMP WITHOUT TIME ZONE,
+    ip_origem VARCHAR(45),
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_licitacoes_log_auditoria_id ON licitacoes.log_auditoria (id);
+
+CREATE TABLE licitacoes.usuario_votos (
+    id SERIAL NOT NULL,
+    conhecimento_id INTEGER NOT NULL,
+    usuario VARCHAR(100) NOT NULL,
+    tipo_voto VARCHAR(10) NOT NULL,
+    data_voto TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id),
+    FOREIGN KEY(conhecimento_id) REFERENCES licitacoes.conhecimentos (id)
+);
+CREATE INDEX ix_licitacoes_usuario_votos_id ON licitacoes.usuario_votos (id);
+
+-- Dados existentes
+INSERT INTO licitacoes.conhecimentos (titulo, pergunta, resposta, autor, votos_positivos, tags)
+VALUES ('Dispensa eletrônica', 'Qual o valor limite?', 'Até R$ 50 mil para compras', 'ana', 2,
+        ARRAY['Dispensa']);
+INSERT INTO licitacoes.usuario_votos (conhecimento_id, usuario, tipo_voto)
+VALUES (1, 'ana', 'positivo'), (1, 'bia', 'positivo');
+INSERT INTO licitacoes.comentarios (conhecimento_id, autor, texto) VALUES (1, 'bia', 'Confirmado');
@@ -0,0 +1,118 @@
+# tests/test_auth.py - Cache de autenticação do DiretorioLDAP contra um AD simulado (MOCK_SYNC do ldap3)
+import pytest
+from ldap3 import Server, Connection, MOCK_SYNC, MODIFY_REPLACE
+from ldap3.core.exceptions import LDAPBindError, LDAPInvalidCredentialsResult
+from prometheus_client import REGISTRY
+
+import cache
+from auth import DiretorioLDAP
+
+BASE_DN = "DC=ifsp,DC=edu,DC=br"
+DN_USUARIO = f"CN=maria,OU=Servidores,{BASE_DN}"
+DN_SERVICO = f"CN=svc-biluapp,OU=Servicos,{BASE_DN}"
+
+
+class Relogio:
+    """Substitui o time.monotonic do CacheLRU para expirar entradas sem esperar"""
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+
+def metricas():
+    return (REGISTRY.get_sample_value("auth_cache_hits_total") or 0,
+            REGISTRY.get_sample_value("auth_cache_misses_total") or 0)
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cache, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def ad():
+    """Servidor simulado com um usuário e a conta de serviço"""
+    servidor = Server("ad-falso")
+    admin = Connection(servidor, client_strategy=MOCK_SYNC)
+    admin.strategy.add_entry(DN_USUARIO, {
+        "objectClass": ["top", "person", "user"], "sAMAccountName": "maria",
+        "userPassword": "senha-certa", "displayName": "Maria Souza",
+        "mail": "maria@ifsp.edu.br", "department": "Licitações"})
+    admin.strategy.add_entry(DN_SERVICO, {
+        "objectClass": ["top", "person", "user"], "sAMAccountName": "svc-biluapp",
+        "userPassword": "senha-servico"})
+    admin.bind()
+    yield servidor, admin
+    admin.unbind()
+
+
+def criar_diretorio(servidor, **kwargs) -> DiretorioLDAP:
+    return DiretorioLDAP(
+        servidor, BASE_DN,
+        formato_usuario="CN={username},OU=Servidores," + BASE_DN,
+        bind_usuario=DN_SERVICO, bind_senha="senha-servico",
+        estrategia_usuario=MOCK_SYNC, estrategia_servico=MOCK_SYNC,
+        cache_ttl=300, **kwargs)
+
+
+def renomear(admin: Connection, nome: str):
+    assert admin.modify(DN_USUARIO, {"displayName": [(MODIFY_REPLACE, [nome])]})
+
+
+def test_falha_consulta_ad_e_acerto_usa_cache(ad, relogio):
+    servidor, admin = ad
+    diretorio = criar_diretorio(servidor)
+    acertos, falhas = metricas()
+
+    usuario = diretorio.autenticar("maria", "senha-certa")
+    assert usuario == {"username": "maria", "nome": "Maria Souza",
+                       "email": "maria@ifsp.edu.br", "setor": "Licitações"}
+    assert metricas() == (acertos, falhas + 1)
+
+    # O acerto não consulta o AD: a alteração só aparece depois do TTL
+    renomear(admin, "Maria S. Souza")
+    assert diretorio.autenticar("MARIA", "senha-certa")["nome"] == "Maria Souza"
+    assert metricas() == (acertos + 1, falhas + 1)
+
+
+def test_ttl_expirado_consulta_ad_de_novo(ad, relogio):
+    servidor, admin = ad
+    diretorio = criar_diretorio(servidor)
+    diretorio.autenticar("maria", "senha-certa")
+    renomear(admin, "Maria S. Souza")
+    acertos, falhas = metricas()
+
+    relogio.agora += 299
+    assert diretorio.autenticar("maria", "senha-certa")["nome"] == "Maria Souza"
+    relogio.agora += 2
+    assert diretorio.autenticar("maria", "senha-certa")["nome"] == "Maria S. Souza"
+    assert metricas() == (acertos + 1, falhas + 1)
+
+
+def test_senha_errada_nao_usa_entrada_em_cache(ad, relogio):
+    servidor, _ = ad
+    diretorio = criar_diretorio(servidor)
+    diretorio.autenticar("maria", "senha-certa")
+    acertos, falhas = metricas()
+
+    with pytest.raises((LDAPBindError, LDAPInvalidCredentialsResult)):
+        diretorio.autenticar("maria", "senha-errada")
+    assert metricas() == (acertos, falhas + 1)
+    # A senha errada não é guardada nem remove a entrada válida
+    assert len(diretorio.cache) == 1
+    assert diretorio.autenticar("maria", "senha-certa")["nome"] == "Maria Souza"
+
+
+def test_invalidar_descarta_autenticacoes(ad, relogio):
+    servidor, admin = ad
+    diretorio = criar_diretorio(servidor)
+    diretorio.autenticar("maria", "senha-certa")
+    renomear(admin, "Maria S. Souza")
+
+    diretorio.invalidar()
+    assert diretorio.autenticar("maria", "senha-certa")["nome"] == "Maria S. Souza"
@@ -0,0 +1,39 @@
+# tests/test_estatisticas.py - Atualização das views de estatísticas: uma por intervalo entre os workers
+from sqlalchemy import text
+
+from estatisticas import atualizar_estatisticas
+
+
+async def atualizado_em(banco):
+    async with banco.connect() as conn:
+        return await conn.scalar(
+            text("SELECT max(atualizado_em) FROM licitacoes.estatisticas_contagens"))
+
+
+async def test_atualizacao_recente_nao_e_repetida(banco):
+    async with banco.begin() as conn:
+        vazia = not await conn.scalar(
+            text("SELECT count(*) FROM licitacoes.estatisticas_contagens"))
+        if vazia:
+            await conn.execute(text("""
+                INSERT INTO licitacoes.conhecimentos (titulo, pergunta, resposta, autor)
+                VALUES ('Teste de estatísticas', 'Pergunta', 'Resposta', 'pytest')
+            """))
+    try:
+        assert await atualizar_estatisticas()
+        anterior = await atualizado_em(banco)
+
+        # Outro worker acordando logo depois não atualiza de novo
+        assert not await atualizar_estatisticas(intervalo_minimo=300)
+        assert await atualizado_em(banco) == anterior
+
+        # Passado o intervalo, atualiza
+        assert await atualizar_estatisticas(intervalo_minimo=0.001)
+        assert await atualizado_em(banco) > anterior
+    finally:
+        if vazia:
+            async with banco.begin() as conn:
+                await conn.execute(text(
+                    "DELETE FROM licitacoes.conhecimentos WHERE autor = 'pytest'"
+                    " AND titulo = 'Teste de estatísticas'"))
+            await atualizar_estatisticas()
@@ -0,0 +1,91 @@
+# tests/test_migracoes.py - Migrações aplicadas a um banco vazio e a um banco criado pelo init.sql original
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+
+from database import DATABASE_URL, DIRETORIO_MIGRACOES, versao_schema_esperada
+
+SCHEMA_ORIGINAL = os.path.join(os.path.dirname(__file__), "dados", "schema_original.sql")
+
+
+@pytest.fixture
+def banco_temporario(monkeypatch):
+    """Cria um banco vazio ao lado do DATABASE_URL (exige permissão CREATEDB)"""
+    url = make_url(DATABASE_URL)
+    nome = f"{url.database}_migracoes"
+    admin = create_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{nome}"'))
+            conn.execute(text(f'CREATE DATABASE "{nome}"'))
+    except Exception as e:
+        admin.dispose()
+        pytest.skip(f"Não foi possível criar o banco de teste: {e}")
+
+    url_teste = url.set(database=nome)
+    monkeypatch.setenv("DATABASE_URL", url_teste.render_as_string(hide_password=False))
+    engine = create_engine(url_teste)
+    yield engine
+
+    engine.dispose()
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{nome}"'))
+    admin.dispose()
+
+
+def migrar():
+    config = Config()
+    config.set_main_option("script_location", DIRETORIO_MIGRACOES)
+    command.upgrade(config, "head")
+
+
+def conferir_schema(engine):
+    inspetor = inspect(engine)
+    colunas = {c["name"] for c in inspetor.get_columns("conhecimentos", schema="licitacoes")}
+    assert {"pontuacao", "busca_vetor", "tags_busca"} <= colunas
+
+    unicas = inspetor.get_unique_constraints("usuario_votos", schema="licitacoes")
+    assert any(u["column_names"] == ["conhecimento_id", "usuario"] for u in unicas)
+
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT version_num FROM alembic_version")) == versao_schema_esperada()
+
+
+def test_banco_vazio(banco_temporario):
+    migrar()
+    conferir_schema(banco_temporario)
+
+
+def test_banco_do_init_sql_original(banco_temporario):
+    with banco_temporario.begin() as conn:
+        conn.exec_driver_sql(open(SCHEMA_ORIGINAL, encoding="utf-8").read())
+
+    migrar()
+    conferir_schema(banco_temporario)
+
+    with banco_temporario.connect() as conn:
+        linha = conn.execute(text(
+            "SELECT pontuacao, busca_vetor IS NOT NULL AS vetor, tags_busca "
+            "FROM licitacoes.conhecimentos WHERE id = 1")).one()
+        indices = set(conn.scalars(text(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = 'licitacoes'")))
+    # Colunas geradas calculadas para as linhas existentes
+    assert linha.pontuacao == 2 and linha.vetor
+    assert linha.tags_busca == ["dispensa"]
+    assert "idx_conhecimentos_busca_vetor" in indices
+    assert not indices & {"idx_busca_titulo", "ix_licitacoes_usuario_votos_id"}
+
+
+def test_votos_duplicados_interrompem_a_migracao(banco_temporario):
+    with banco_temporario.begin() as conn:
+        conn.exec_driver_sql(open(SCHEMA_ORIGINAL, encoding="utf-8").read())
+        conn.execute(text(
+            "INSERT INTO licitacoes.usuario_votos (conhecimento_id, usuario, tipo_voto) "
+            "VALUES (1, 'ana', 'negativo')"))
+
+    with pytest.raises(Exception, match="uq_usuario_votos_conhecimento_usuario"):
+        migrar()
@@ -0,0 +1,103 @@
+# tests/test_sugestoes.py - Sincronização incremental do índice de sugestões
+import random
+import asyncio
+from collections import namedtuple
+
+import pytest
+from sqlalchemy import text
+
+from database import SessionLocal
+import sugestoes
+from sugestoes import IndiceSugestoes
+from votos import registrar_voto
+
+Linha = namedtuple("Linha", "id titulo tags_busca pontuacao visualizacoes")
+TITULOS = ("Garantia contratual zeta primeiro", "Garantia contratual zeta segundo")
+
+
+@pytest.fixture
+async def conhecimentos(banco):
+    async with banco.begin() as conn:
+        ids = [await conn.scalar(text("""
+            INSERT INTO licitacoes.conhecimentos (titulo, pergunta, resposta, autor, tags)
+            VALUES (:titulo, 'Pergunta', 'Resposta', 'pytest', ARRAY['Garantia Zeta'])
+            RETURNING id
+        """), {"titulo": titulo}) for titulo in TITULOS]
+    yield ids
+    async with banco.begin() as conn:
+        await conn.execute(text("DELETE FROM licitacoes.conhecimentos WHERE autor = 'pytest'"))
+
+
+def titulos(indice, consulta):
+    return [sugestao["id"] for sugestao in indice.sugerir(consulta)["titulos"]]
+
+
+async def test_pesos_alterados_sao_relidos(conhecimentos):
+    primeiro, segundo = conhecimentos
+    indice = IndiceSugestoes()
+    await indice.sincronizar()
+    assert titulos(indice, "contratual zeta") == [primeiro, segundo]
+    assert indice.sugerir("garantia z")["tags"] == [{"tag": "garantia zeta", "total": 2}]
+
+    async with SessionLocal() as db:
+        await registrar_voto(db, segundo, "pytest", "positivo")
+    await indice.sincronizar()
+    assert titulos(indice, "contratual zeta") == [segundo, primeiro]
+
+
+async def test_tags_alteradas_sao_relidas(conhecimentos):
+    primeiro, _ = conhecimentos
+    indice = IndiceSugestoes()
+    await indice.sincronizar()
+
+    async with SessionLocal() as db:
+        await db.execute(text("""
+            UPDATE licitacoes.conhecimentos
+            SET tags = ARRAY['Garantia Ômega'], data_atualizacao = now() AT TIME ZONE 'utc'
+            WHERE id = :id
+        """), {"id": primeiro})
+        await db.commit()
+    await indice.sincronizar()
+    assert indice.sugerir("garantia")["tags"] == [
+        {"tag": "garantia omega", "total": 1}, {"tag": "garantia zeta", "total": 1}]
+
+
+async def test_criado_durante_a_carga_permanece(conhecimentos):
+    indice = IndiceSugestoes()
+    carregar = indice._carregar
+
+    async def carregar_com_criacao(linhas):
+        # Um conhecimento criado pelo próprio worker enquanto a carga é montada
+        tarefa = asyncio.create_task(carregar(linhas))
+        await asyncio.sleep(0)
+        indice.adicionar(-1, "Garantia contratual zeta local", ["garantia zeta"])
+        await tarefa
+
+    indice._carregar = carregar_com_criacao
+    await indice.sincronizar()
+    assert sorted(titulos(indice, "zeta")) == sorted([-1, *conhecimentos])
+    assert indice.sugerir("garantia z")["tags"] == [{"tag": "garantia zeta", "total": 3}]
+
+
+async def test_listas_por_prefixo_seguem_os_pesos(monkeypatch):
+    # Limite baixo: quase todo prefixo guarda a lista dos melhores
+    monkeypatch.setattr(sugestoes, "SUGESTOES_MAX_CANDIDATOS", 3)
+    aleatorio = random.Random(7)
+    palavras = ("dispensa", "direta", "diaria", "pregao", "prazo", "preco")
+
+    def linha(id_):
+        return Linha(id_, " ".join(aleatorio.choice(palavras) for _ in range(3)), [],
+                     aleatorio.randrange(-3, 10), aleatorio.randrange(100))
+
+    indice = IndiceSugestoes()
+    await indice._carregar([linha(id_) for id_ in range(1, 61)])
+    await indice._acrescentar([linha(id_) for id_ in range(61, 81)])
+    for id_ in range(81, 91):
+        indice.adicionar(id_, linha(id_).titulo, [])
+    await indice._atualizar([linha(id_) for id_ in aleatorio.sample(range(1, 91), 40)])
+
+    for prefixo in ("d", "di", "dire", "pr", "pre", "prazo d", "preco preco"):
+        esperado = sorted(
+            {id_ for chave, id_ in indice._chaves if chave.startswith(prefixo)},
+            key=lambda id_: (-indice._pesos[id_], id_))[:8]
+        assert titulos(indice, prefixo) == esperado, prefixo
@@ -0,0 +1,69 @@
+# tests/test_votos.py - Votos simultâneos: contadores sempre iguais às linhas de usuario_votos
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import text
+
+from database import SessionLocal
+from votos import registrar_voto
+
+USUARIOS = 100
+VOTOS_POR_USUARIO = 5
+
+
+@pytest.fixture
+async def conhecimento_id(banco):
+    async with banco.begin() as conn:
+        id_ = await conn.scalar(text("""
+            INSERT INTO licitacoes.conhecimentos (titulo, pergunta, resposta, autor)
+            VALUES ('Teste de votos', 'Pergunta', 'Resposta', 'pytest') RETURNING id
+        """))
+    yield id_
+    async with banco.begin() as conn:
+        await conn.execute(
+            text("DELETE FROM licitacoes.conhecimentos WHERE id = :id"), {"id": id_})
+
+
+async def votar(conhecimento_id: int, usuario: str, tipo_voto: str):
+    async with SessionLocal() as db:
+        return await registrar_voto(db, conhecimento_id, usuario, tipo_voto)
+
+
+async def contagens(conhecimento_id: int):
+    async with SessionLocal() as db:
+        contadores = (await db.execute(text("""
+            SELECT votos_positivos, votos_negativos FROM licitacoes.conhecimentos WHERE id = :id
+        """), {"id": conhecimento_id})).one()
+        linhas = (await db.execute(text("""
+            SELECT count(*) FILTER (WHERE tipo_voto = 'positivo') AS positivos,
+                   count(*) FILTER (WHERE tipo_voto = 'negativo') AS negativos,
+                   count(*) AS total
+            FROM licitacoes.usuario_votos WHERE conhecimento_id = :id
+        """), {"id": conhecimento_id})).one()
+    return tuple(contadores), linhas
+
+
+async def test_votos_paralelos_mantem_contadores(conhecimento_id):
+    # Cliques duplos e trocas de voto do mesmo usuário disparados ao mesmo tempo
+    aleatorio = random.Random(42)
+    tarefas = [
+        votar(conhecimento_id, f"usuario{u}", aleatorio.choice(("positivo", "negativo")))
+        for u in range(USUARIOS) for _ in range(VOTOS_POR_USUARIO)
+    ]
+    aleatorio.shuffle(tarefas)
+    await asyncio.gather(*tarefas)
+
+    (positivos, negativos), linhas = await contagens(conhecimento_id)
+    assert linhas.total == USUARIOS
+    assert (positivos, negativos) == (linhas.positivos, linhas.negativos)
+
+
+async def test_voto_repetido_e_alterado(conhecimento_id):
+    primeiro = await votar(conhecimento_id, "ana", "positivo")
+    assert primeiro == {"votos_positivos": 1, "votos_negativos": 0, "novo": True}
+    assert await votar(conhecimento_id, "ana", "positivo") is None
+
+    alterado = await votar(conhecimento_id, "ana", "negativo")
+    assert alterado == {"votos_positivos": 0, "votos_negativos": 1, "novo": False}
+    assert (await contagens(conhecimento_id))[0] == (0, 1)
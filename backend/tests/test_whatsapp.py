@@ -0,0 +1,132 @@
+# tests/test_whatsapp.py - Envio com retentativas contra uma Graph API falsa e deduplicação do webhook
+import asyncio
+
+import httpx
+import pytest
+
+import cache
+import whatsapp_bot
+from whatsapp_bot import enviar_mensagem_whatsapp, fila_whatsapp, whatsapp_webhook
+
+
+class GraphAPIFalsa:
+    """Responde com os status informados, em ordem, e guarda as requisições recebidas"""
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+        self.requisicoes = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requisicoes.append(request)
+        resposta = self.respostas.pop(0) if self.respostas else 200
+        if isinstance(resposta, Exception):
+            raise resposta
+        if isinstance(resposta, tuple):
+            status, headers = resposta
+            return httpx.Response(status, headers=headers, json={})
+        return httpx.Response(resposta, json={"messages": [{"id": "wamid.1"}]})
+
+
+class RedisFalso:
+    """Só o necessário do redis.asyncio para SET NX e DELETE"""
+
+    def __init__(self):
+        self.chaves = {}
+
+    async def set(self, chave, valor, nx=False, ex=None):
+        if nx and chave in self.chaves:
+            return None
+        self.chaves[chave] = valor
+        return True
+
+    async def delete(self, chave):
+        return int(self.chaves.pop(chave, None) is not None)
+
+
+@pytest.fixture
+def graph_api(monkeypatch):
+    monkeypatch.setattr(whatsapp_bot, "WHATSAPP_TOKEN", "token")
+    monkeypatch.setattr(whatsapp_bot, "WHATSAPP_PHONE_ID", "123")
+    monkeypatch.setattr(whatsapp_bot, "WHATSAPP_BACKOFF_BASE", 0)
+
+    def instalar(*respostas):
+        api = GraphAPIFalsa(*respostas)
+        monkeypatch.setattr(fila_whatsapp, "client",
+                            httpx.AsyncClient(transport=httpx.MockTransport(api)))
+        return api
+
+    yield instalar
+
+
+@pytest.fixture
+def fila(monkeypatch):
+    monkeypatch.setattr(fila_whatsapp, "fila", asyncio.Queue(maxsize=10))
+    whatsapp_bot.mensagens_recebidas.limpar()
+    yield fila_whatsapp.fila
+    whatsapp_bot.mensagens_recebidas.limpar()
+
+
+def webhook(*ids):
+    return {"entry": [{"changes": [{"value": {"messages": [
+        {"id": id_, "from": "5511999999999", "text": {"body": "/ajuda"}} for id_ in ids
+    ]}}]}]}
+
+
+async def test_envio_com_sucesso(graph_api):
+    api = graph_api(200)
+    assert await enviar_mensagem_whatsapp("5511999999999", "oi")
+    assert len(api.requisicoes) == 1
+    assert api.requisicoes[0].url.path == "/v17.0/123/messages"
+    assert api.requisicoes[0].headers["Authorization"] == "Bearer token"
+
+
+async def test_retentativa_em_429_e_5xx(graph_api):
+    api = graph_api((429, {"Retry-After": "0"}), 503, 200)
+    assert await enviar_mensagem_whatsapp("5511999999999", "oi")
+    assert len(api.requisicoes) == 3
+
+
+async def test_retentativa_em_falha_de_rede(graph_api):
+    api = graph_api(httpx.ConnectError("recusada"), 200)
+    assert await enviar_mensagem_whatsapp("5511999999999", "oi")
+    assert len(api.requisicoes) == 2
+
+
+async def test_erro_do_cliente_nao_e_repetido(graph_api):
+    api = graph_api(400)
+    assert not await enviar_mensagem_whatsapp("5511999999999", "oi")
+    assert len(api.requisicoes) == 1
+
+
+async def test_desiste_apos_max_tentativas(graph_api):
+    api = graph_api(*[500] * 10)
+    assert not await enviar_mensagem_whatsapp("5511999999999", "oi")
+    assert len(api.requisicoes) == whatsapp_bot.WHATSAPP_MAX_TENTATIVAS
+
+
+async def test_reentrega_ignorada_sem_redis(fila, monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", None)
+    await whatsapp_webhook(webhook("wamid.A"))
+    await whatsapp_webhook(webhook("wamid.A", "wamid.B"))
+    assert fila.qsize() == 2
+
+
+async def test_reentrega_ignorada_entre_workers(fila, monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", RedisFalso())
+    await whatsapp_webhook(webhook("wamid.A"))
+    # Outro worker: cache em memória vazio, mas o Redis é compartilhado
+    whatsapp_bot.mensagens_recebidas.limpar()
+    await whatsapp_webhook(webhook("wamid.A"))
+    assert fila.qsize() == 1
+
+
+async def test_fila_cheia_libera_a_reentrega(fila, monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", RedisFalso())
+    monkeypatch.setattr(fila_whatsapp, "fila", asyncio.Queue(maxsize=1))
+    await whatsapp_webhook(webhook("wamid.A"))
+    resposta = await whatsapp_webhook(webhook("wamid.B"))
+    assert resposta.status_code == 503
+
+    fila_whatsapp.fila.get_nowait()
+    await whatsapp_webhook(webhook("wamid.B"))
+    assert fila_whatsapp.fila.qsize() == 1
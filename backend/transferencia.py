@@ -0,0 +1,241 @@
+# backend/transferencia.py - Exportação (streaming) e importação (COPY) da base de conhecimento
+#   python transferencia.py exportar --formato ndjson --saida base.ndjson
+#   python transferencia.py importar base.ndjson --formato ndjson --lote 5000
+import io
+import csv
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+
+from database import SessionLocal, engine
+from models import Conhecimento
+from tags import TagDetector
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("ndjson", "csv")
+
+# Colunas transferidas entre campi (id e colunas geradas ficam de fora)
+COLUNAS = (
+    "titulo", "pergunta", "resposta", "modalidade", "fase", "tags",
+    "tags_automaticas", "autor", "campus", "data_criacao", "votos_positivos",
+    "votos_negativos", "visualizacoes", "status", "validado_por", "data_validacao",
+)
+OBRIGATORIAS = ("titulo", "pergunta", "resposta", "autor")
+INTEIRAS = ("votos_positivos", "votos_negativos", "visualizacoes")
+DATAS = ("data_criacao", "data_validacao")
+LISTAS = ("tags", "tags_automaticas")
+
+# Tamanho máximo das colunas VARCHAR, lido do modelo
+TAMANHOS = {
+    nome: Conhecimento.__table__.c[nome].type.length
+    for nome in COLUNAS
+    if getattr(Conhecimento.__table__.c[nome].type, "length", None)
+}
+
+EXPORTACAO_LOTE = 1000
+
+
+def _linha_csv(valores: Iterable) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(valores)
+    return buffer.getvalue()
+
+
+def _valor_csv(valor):
+    if isinstance(valor, list):
+        return json.dumps(valor, ensure_ascii=False)
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+async def exportar(formato: str = "ndjson", lote: int = EXPORTACAO_LOTE) -> AsyncIterator[bytes]:
+    """Gera a base inteira em NDJSON ou CSV com memória constante
+
+    As linhas vêm de um cursor do servidor (yield_per) e cada lote é
+    serializado e entregue antes do próximo ser lido.
+    """
+    colunas = [Conhecimento.__table__.c[nome] for nome in COLUNAS]
+    if formato == "csv":
+        yield _linha_csv(COLUNAS).encode()
+
+    async with SessionLocal() as db:
+        result = await db.stream(
+            select(*colunas).order_by(Conhecimento.id).execution_options(yield_per=lote))
+        async for linhas in result.partitions():
+            if formato == "csv":
+                yield "".join(
+                    _linha_csv(_valor_csv(v) for v in linha) for linha in linhas).encode()
+            else:
+                yield b"".join(
+                    orjson.dumps(dict(zip(COLUNAS, linha))) + b"\n" for linha in linhas)
+
+
+def _ler_registros(arquivo, formato: str) -> Iterator:
+    # NDJSON: a linha é decodificada na validação, para rejeitar só a linha inválida
+    if formato == "csv":
+        yield from csv.DictReader(arquivo)
+        return
+    for linha in arquivo:
+        if linha.strip():
+            yield linha
+
+
+def _converter_lista(valor) -> List[str]:
+    if valor in (None, ""):
+        return []
+    if isinstance(valor, str):
+        # CSV: array JSON (formato da exportação) ou valores separados por ";"
+        valor = json.loads(valor) if valor.lstrip().startswith("[") else valor.split(";")
+    if not isinstance(valor, list) or not all(isinstance(t, str) for t in valor):
+        raise ValueError("deve ser uma lista de textos")
+    return [t.strip() for t in valor if t.strip()]
+
+
+def validar_registro(registro: dict) -> dict:
+    """Normaliza um registro importado (lança ValueError com o motivo se inválido)"""
+    valores = {}
+    for nome in COLUNAS:
+        valor = registro.get(nome)
+        if valor == "":
+            valor = None
+
+        try:
+            if nome in LISTAS:
+                valor = _converter_lista(valor)
+            elif nome in INTEIRAS:
+                valor = int(valor or 0)
+            elif nome in DATAS and isinstance(valor, str):
+                valor = datetime.fromisoformat(valor)
+            elif valor is not None:
+                valor = str(valor).strip()
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{nome}: {e}")
+
+        if nome in OBRIGATORIAS and not valor:
+            raise ValueError(f"{nome}: obrigatório")
+        if nome in TAMANHOS and valor and len(valor) > TAMANHOS[nome]:
+            raise ValueError(f"{nome}: mais de {TAMANHOS[nome]} caracteres")
+        valores[nome] = valor
+
+    valores["data_criacao"] = valores["data_criacao"] or datetime.utcnow()
+    valores["campus"] = valores["campus"] or "Capivari"
+    valores["status"] = valores["status"] or "novo"
+    return valores
+
+
+async def _copiar(registros: List[tuple]):
+    """Carrega um lote via COPY, em uma transação própria"""
+    async with engine.connect() as conn:
+        bruta = await conn.get_raw_connection()
+        asyncpg_conn = bruta.driver_connection
+        async with asyncpg_conn.transaction():
+            await asyncpg_conn.copy_records_to_table(
+                "conhecimentos", schema_name="licitacoes",
+                columns=list(COLUNAS), records=registros)
+
+
+async def importar(
+    arquivo,
+    formato: str = "ndjson",
+    lote: int = 5000,
+    detector: Optional[TagDetector] = None,
+    max_erros: int = 100
+) -> Tuple[int, int]:
+    """Importa registros em lotes: validação, tags automáticas e COPY
+
+    Cada lote é uma transação: uma falha no banco interrompe a importação
+    sem desfazer os lotes anteriores. Registros inválidos são ignorados e
+    registrados no log. Retorna (importados, rejeitados).
+    """
+    detector = detector or TagDetector()
+    async with SessionLocal() as db:
+        await detector.atualizar(db)
+
+    importados = rejeitados = 0
+    pendentes: List[tuple] = []
+    inicio = time.perf_counter()
+
+    async def gravar():
+        nonlocal importados
+        await _copiar(pendentes)
+        importados += len(pendentes)
+        pendentes.clear()
+        logger.info("%d conhecimentos importados (%.0f/s)",
+                    importados, importados / (time.perf_counter() - inicio))
+
+    for numero, registro in enumerate(_ler_registros(arquivo, formato), start=1):
+        try:
+            if isinstance(registro, str):
+                registro = orjson.loads(registro)
+            valores = validar_registro(registro)
+        except (ValueError, AttributeError) as e:
+            rejeitados += 1
+            if rejeitados <= max_erros:
+                logger.warning("Registro %d rejeitado: %s", numero, e)
+            continue
+
+        # Tags automáticas recalculadas com o vocabulário deste campus
+        valores["tags_automaticas"] = detector.detectar_tags(
+            f"{valores['titulo']} {valores['pergunta']} {valores['resposta']}")
+        pendentes.append(tuple(valores[nome] for nome in COLUNAS))
+
+        if len(pendentes) >= lote:
+            await gravar()
+
+    if pendentes:
+        await gravar()
+    return importados, rejeitados
+
+
+if __name__ == "__main__":
+    from cache import conectar_redis, invalidar_cache, fechar_redis
+
+    parser = argparse.ArgumentParser(description="Exporta ou importa a base de conhecimento")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    exp = comandos.add_parser("exportar")
+    exp.add_argument("--formato", choices=FORMATOS, default="ndjson")
+    exp.add_argument("--saida", help="arquivo de saída (padrão: stdout)")
+
+    imp = comandos.add_parser("importar")
+    imp.add_argument("arquivo")
+    imp.add_argument("--formato", choices=FORMATOS, default="ndjson")
+    imp.add_argument("--lote", type=int, default=5000)
+
+    args = parser.parse_args()
+
+    async def _exportar():
+        saida = open(args.saida, "wb") if args.saida else sys.stdout.buffer
+        try:
+            async for bloco in exportar(args.formato):
+                saida.write(bloco)
+        finally:
+            if args.saida:
+                saida.close()
+
+    async def _importar():
+        with open(args.arquivo, newline="", encoding="utf-8") as arquivo:
+            importados, rejeitados = await importar(arquivo, args.formato, args.lote)
+        await conectar_redis()
+        await invalidar_cache()
+        await fechar_redis()
+        print(f"{importados} conhecimentos importados, {rejeitados} rejeitados")
+
+    async def _main():
+        try:
+            await (_exportar() if args.comando == "exportar" else _importar())
+        finally:
+            await engine.dispose()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    asyncio.run(_main())
@@ -0,0 +1,126 @@
+# backend/visualizacoes.py - Contador de visualizações com escrita adiada (write-behind)
+import os
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from cache import obter_redis
+from database import SessionLocal
+from metrics import registrar_visualizacoes_pendentes, registrar_visualizacoes_gravadas
+
+logger = logging.getLogger(__name__)
+
+VISUALIZACOES_INTERVALO = float(os.getenv("VISUALIZACOES_INTERVALO", 10))
+
+CHAVE_PENDENTES = "visualizacoes:pendentes"
+
+# Lê e apaga o hash de incrementos em uma única operação atômica: cada
+# incremento é retirado por exatamente um worker e nada fica para trás
+SCRIPT_RETIRAR_PENDENTES = """
+local pendentes = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return pendentes
+"""
+
+# Aplica todos os incrementos pendentes em um único UPDATE
+SQL_APLICAR_INCREMENTOS = text("""
+    UPDATE licitacoes.conhecimentos AS c
+    SET visualizacoes = coalesce(c.visualizacoes, 0) + v.incremento,
+        data_atualizacao = now() AT TIME ZONE 'utc'
+    FROM unnest(CAST(:ids AS integer[]), CAST(:incrementos AS integer[])) AS v(id, incremento)
+    WHERE c.id = v.id
+""")
+
+
+class ContadorVisualizacoes:
+    """Acumula visualizações no Redis (ou em memória) e grava em lote no banco"""
+
+    def __init__(self, intervalo: float = VISUALIZACOES_INTERVALO):
+        self.intervalo = intervalo
+        self._locais: Counter = Counter()
+        self._tarefa: Optional[asyncio.Task] = None
+        self._parar: Optional[asyncio.Event] = None
+
+    async def registrar(self, conhecimento_id: int):
+        """Registra uma visualização (O(1), sem tocar no banco)"""
+        redis_client = obter_redis()
+        if redis_client:
+            try:
+                await redis_client.hincrby(CHAVE_PENDENTES, str(conhecimento_id), 1)
+                return
+            except Exception as e:
+                logger.warning("Erro ao registrar visualização no Redis: %s", e)
+
+        self._locais[conhecimento_id] += 1
+
+    async def _coletar_redis(self) -> Dict[int, int]:
+        """Retira atomicamente os incrementos pendentes do Redis"""
+        redis_client = obter_redis()
+        if not redis_client:
+            return {}
+
+        # Lista plana [id, incremento, id, incremento, ...]
+        pendentes = await redis_client.eval(SCRIPT_RETIRAR_PENDENTES, 1, CHAVE_PENDENTES)
+        return {int(k): int(v) for k, v in zip(pendentes[::2], pendentes[1::2])}
+
+    async def gravar(self) -> int:
+        """Grava no banco todos os incrementos pendentes e retorna o total"""
+        incrementos = Counter(self._locais)
+        self._locais.clear()
+        try:
+            incrementos.update(await self._coletar_redis())
+        except Exception as e:
+            logger.warning("Erro ao coletar visualizações do Redis: %s", e)
+
+        total = sum(incrementos.values())
+        registrar_visualizacoes_pendentes(total)
+        if not incrementos:
+            return 0
+
+        ids = list(incrementos.keys())
+        try:
+            async with SessionLocal() as db:
+                await db.execute(SQL_APLICAR_INCREMENTOS, {
+                    "ids": ids,
+                    "incrementos": [incrementos[i] for i in ids]
+                })
+                await db.commit()
+        except Exception as e:
+            logger.error("Erro ao gravar visualizações: %s", e)
+            # Devolve os incrementos para a próxima rodada
+            self._locais.update(incrementos)
+            return 0
+
+        registrar_visualizacoes_pendentes(0)
+        registrar_visualizacoes_gravadas(total)
+        logger.debug("%d visualizações gravadas em %d conhecimentos", total, len(ids))
+        return total
+
+    async def _executar(self):
+        # Sem cancelamento no meio de uma gravação: o loop termina pelo evento
+        while not self._parar.is_set():
+            try:
+                await asyncio.wait_for(self._parar.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            await self.gravar()
+
+    def iniciar(self):
+        """Inicia a gravação periódica"""
+        self._parar = asyncio.Event()
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        """Interrompe a gravação periódica e grava o que estiver pendente"""
+        if self._tarefa:
+            self._parar.set()
+            await self._tarefa
+            self._tarefa = None
+        else:
+            await self.gravar()
+
+
+contador_visualizacoes = ContadorVisualizacoes()
@@ -0,0 +1,66 @@
+# backend/votos.py - Registro atômico de votos
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+TIPOS_VOTO = ("positivo", "negativo")
+
+# Um único comando: upsert do voto + atualização dos contadores.
+# - voto novo: insere e soma 1 no contador do tipo
+# - voto alterado: o ON CONFLICT só atualiza se o tipo mudou; como há apenas
+#   dois tipos, o anterior é o oposto (soma 1 no novo e subtrai 1 do outro)
+# - voto repetido: nenhuma linha retornada, contadores intactos
+# (xmax = 0) identifica linhas inseridas (e não atualizadas) pelo upsert.
+SQL_VOTAR = text("""
+    WITH voto AS (
+        INSERT INTO licitacoes.usuario_votos (conhecimento_id, usuario, tipo_voto, data_voto)
+        VALUES (:conhecimento_id, :usuario, :tipo_voto, now() AT TIME ZONE 'utc')
+        ON CONFLICT (conhecimento_id, usuario) DO UPDATE
+            SET tipo_voto = EXCLUDED.tipo_voto, data_voto = EXCLUDED.data_voto
+            WHERE usuario_votos.tipo_voto <> EXCLUDED.tipo_voto
+        RETURNING tipo_voto, (xmax = 0) AS novo
+    )
+    UPDATE licitacoes.conhecimentos AS c
+    SET votos_positivos = coalesce(c.votos_positivos, 0) + CASE
+            WHEN voto.tipo_voto = 'positivo' THEN 1
+            WHEN NOT voto.novo THEN -1
+            ELSE 0 END,
+        votos_negativos = coalesce(c.votos_negativos, 0) + CASE
+            WHEN voto.tipo_voto = 'negativo' THEN 1
+            WHEN NOT voto.novo THEN -1
+            ELSE 0 END,
+        data_atualizacao = now() AT TIME ZONE 'utc'
+    FROM voto
+    WHERE c.id = :conhecimento_id
+    RETURNING c.votos_positivos, c.votos_negativos, voto.novo
+""")
+
+
+async def registrar_voto(
+    db: AsyncSession,
+    conhecimento_id: int,
+    usuario: str,
+    tipo_voto: str
+) -> Optional[dict]:
+    """Registra ou altera o voto do usuário em uma ida ao banco
+
+    Retorna os contadores atualizados, ou None se o usuário já havia votado
+    com o mesmo tipo. Lança IntegrityError se o conhecimento não existir.
+    """
+    result = await db.execute(SQL_VOTAR, {
+        "conhecimento_id": conhecimento_id,
+        "usuario": usuario,
+        "tipo_voto": tipo_voto
+    })
+    row = result.first()
+    await db.commit()
+
+    if row is None:
+        return None
+
+    return {
+        "votos_positivos": row.votos_positivos,
+        "votos_negativos": row.votos_negativos,
+        "novo": row.novo
+    }
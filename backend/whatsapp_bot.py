@@ -1,83 +1,244 @@
 # whatsapp_bot.py - CORRIGIDO
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+import asyncio
+import time
+import random
 import httpx
 import os
 import logging
-from typing import List, Dict, Any
-from database import get_db
-from models import Conhecimento
+from typing import List, Dict, Any, Optional
+from database import SessionLocal
+from busca import consultar_conhecimentos, normalizar_consulta
+from cache import CacheLRU, obter_redis
+from metrics import registrar_envio_whatsapp, registrar_erro_whatsapp
 
 router = APIRouter(prefix="/whatsapp")
 logger = logging.getLogger(__name__)
 
-WHATSAPP_API_URL = "https://graph.facebook.com/v17.0"
+# Configurável para permitir apontar para um servidor Graph API falso em testes
+WHATSAPP_API_URL = os.getenv("WHATSAPP_API_URL", "https://graph.facebook.com/v17.0")
 WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN", "seu_token_aqui")
 WHATSAPP_PHONE_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID", "")
 
+# Fila de processamento e envio
+WHATSAPP_WORKERS = int(os.getenv("WHATSAPP_WORKERS", 4))
+WHATSAPP_FILA_MAX = int(os.getenv("WHATSAPP_FILA_MAX", 1000))
+WHATSAPP_LOTE_ENVIO = int(os.getenv("WHATSAPP_LOTE_ENVIO", 10))
+WHATSAPP_MAX_TENTATIVAS = int(os.getenv("WHATSAPP_MAX_TENTATIVAS", 4))
+WHATSAPP_BACKOFF_BASE = float(os.getenv("WHATSAPP_BACKOFF_BASE", 0.5))
+
+MENSAGEM_USO = "📝 *Como usar:*\n/buscar sua pergunta aqui\n\nExemplo:\n/buscar dispensa eletrônica valor limite"
+
+MENSAGEM_AJUDA = (
+    "🤖 *Bot IFSP Licitações*\n\n"
+    "📋 *Comandos disponíveis:*\n"
+    "/buscar [pergunta] - Buscar conhecimento\n"
+    "/ajuda - Ver esta mensagem\n\n"
+    "💡 *Exemplo:*\n"
+    "/buscar pregão eletrônico documentos"
+)
+
+# Cache das respostas formatadas, indexado pela consulta normalizada
+cache_respostas = CacheLRU(
+    tamanho_maximo=int(os.getenv("WHATSAPP_CACHE_MAX", 500)),
+    ttl=float(os.getenv("WHATSAPP_CACHE_TTL", 300))
+)
+
+# IDs de mensagens já recebidas (o WhatsApp reentrega em caso de timeout).
+# Registrados no Redis, compartilhado entre os workers do gunicorn; o cache
+# em memória só é usado enquanto o Redis estiver indisponível
+TTL_MENSAGEM_RECEBIDA = 24 * 3600
+mensagens_recebidas = CacheLRU(tamanho_maximo=10000, ttl=TTL_MENSAGEM_RECEBIDA)
+
+
+def chave_mensagem(message_id: str) -> str:
+    return f"whatsapp:msg:{message_id}"
+
+
+async def registrar_mensagem(message_id: str) -> bool:
+    """Marca a mensagem como recebida; False se já foi recebida antes"""
+    redis_client = obter_redis()
+    if redis_client:
+        try:
+            return bool(await redis_client.set(
+                chave_mensagem(message_id), 1, nx=True, ex=TTL_MENSAGEM_RECEBIDA))
+        except Exception as e:
+            logger.warning("Erro ao registrar mensagem do WhatsApp no Redis: %s", e)
+
+    if mensagens_recebidas.obter(message_id):
+        return False
+    mensagens_recebidas.definir(message_id, True)
+    return True
+
+
+async def liberar_mensagem(message_id: str):
+    """Desfaz o registro, para que a reentrega da mensagem seja processada"""
+    mensagens_recebidas.remover(message_id)
+    redis_client = obter_redis()
+    if redis_client:
+        try:
+            await redis_client.delete(chave_mensagem(message_id))
+        except Exception as e:
+            logger.warning("Erro ao liberar mensagem do WhatsApp no Redis: %s", e)
+
+
+class FilaWhatsApp:
+    """Fila limitada de mensagens recebidas, processada por um pool de workers"""
+
+    def __init__(self, workers: int, tamanho_maximo: int, lote_envio: int):
+        self.num_workers = workers
+        self.tamanho_maximo = tamanho_maximo
+        self.lote_envio = lote_envio
+        # Criada em iniciar(), dentro do event loop do servidor
+        self.fila: Optional[asyncio.Queue] = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def iniciar(self):
+        """Cria o cliente HTTP compartilhado e inicia os workers"""
+        self.fila = asyncio.Queue(maxsize=self.tamanho_maximo)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=self.num_workers * self.lote_envio,
+                max_keepalive_connections=self.num_workers * self.lote_envio
+            )
+        )
+        self._workers = [
+            asyncio.create_task(self._trabalhar(), name=f"whatsapp-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info("Fila do WhatsApp iniciada com %d workers", self.num_workers)
+
+    async def parar(self, timeout: float = 10.0):
+        """Aguarda o esvaziamento da fila e encerra os workers"""
+        if self.fila is None:
+            return
+
+        try:
+            await asyncio.wait_for(self.fila.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Encerrando com %d mensagens do WhatsApp pendentes", self.fila.qsize())
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    def enfileirar(self, mensagem: Dict[str, str]) -> bool:
+        """Enfileira uma mensagem recebida; retorna False se a fila estiver cheia"""
+        if self.fila is None:
+            return False
+        try:
+            self.fila.put_nowait(mensagem)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _trabalhar(self):
+        while True:
+            # Agrupa as mensagens já disponíveis em um lote
+            lote = [await self.fila.get()]
+            while len(lote) < self.lote_envio and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+
+            try:
+                respostas = [(m["de"], await gerar_resposta(m["texto"])) for m in lote]
+                await asyncio.gather(*(
+                    enviar_mensagem_whatsapp(destinatario, resposta)
+                    for destinatario, resposta in respostas
+                    if resposta
+                ))
+            except Exception as e:
+                logger.error("Erro ao processar lote do WhatsApp: %s", e)
+            finally:
+                for _ in lote:
+                    self.fila.task_done()
+
+
+fila_whatsapp = FilaWhatsApp(
+    workers=WHATSAPP_WORKERS,
+    tamanho_maximo=WHATSAPP_FILA_MAX,
+    lote_envio=WHATSAPP_LOTE_ENVIO
+)
+
 
 @router.post("/webhook")
-async def whatsapp_webhook(data: dict, db: Session = Depends(get_db)):
-    """Recebe mensagens do WhatsApp"""
+async def whatsapp_webhook(data: dict):
+    """Recebe mensagens do WhatsApp e as enfileira para processamento"""
     try:
-        # Verificar se é uma mensagem
-        if "messages" not in data.get("entry", [{}])[0].get("changes", [{}])[0].get("value", {}):
-            return {"status": "ok"}
-
-        message_data = data["entry"][0]["changes"][0]["value"]["messages"][0]
-        text = message_data.get("text", {}).get("body", "")
-        sender = message_data.get("from", "")
-
-        if text.startswith("/buscar"):
-            query = text.replace("/buscar", "").strip()
-            if query:
-                # Buscar no sistema
-                resultados = await buscar_conhecimento(query, db)
-
-                # Enviar resposta
-                await enviar_mensagem_whatsapp(
-                    sender,
-                    formatar_resultados(resultados)
-                )
-            else:
-                await enviar_mensagem_whatsapp(
-                    sender,
-                    "📝 *Como usar:*\n/buscar sua pergunta aqui\n\nExemplo:\n/buscar dispensa eletrônica valor limite"
-                )
-
-        elif text.startswith("/ajuda") or text.lower() in ["oi", "ola", "olá", "help"]:
-            await enviar_mensagem_whatsapp(
-                sender,
-                "🤖 *Bot IFSP Licitações*\n\n"
-                "📋 *Comandos disponíveis:*\n"
-                "/buscar [pergunta] - Buscar conhecimento\n"
-                "/ajuda - Ver esta mensagem\n\n"
-                "💡 *Exemplo:*\n"
-                "/buscar pregão eletrônico documentos"
-            )
+        for entry in data.get("entry", []):
+            for change in entry.get("changes", []):
+                for message_data in change.get("value", {}).get("messages", []):
+                    message_id = message_data.get("id", "")
+
+                    # Ignorar reentregas de mensagens já enfileiradas (em qualquer worker)
+                    if message_id and not await registrar_mensagem(message_id):
+                        continue
+
+                    mensagem = {
+                        "id": message_id,
+                        "de": message_data.get("from", ""),
+                        "texto": message_data.get("text", {}).get("body", "")
+                    }
+
+                    if not fila_whatsapp.enfileirar(mensagem):
+                        # Sem 200 o WhatsApp reenvia a mensagem mais tarde
+                        logger.warning("Fila do WhatsApp cheia, mensagem recusada")
+                        if message_id:
+                            await liberar_mensagem(message_id)
+                        return JSONResponse(status_code=503, content={"status": "busy"})
 
         return {"status": "ok"}
 
     except Exception as e:
-        logger.error(f"Erro no webhook WhatsApp: {e}")
+        logger.error("Erro no webhook WhatsApp: %s", e)
         return {"status": "error", "message": str(e)}
 
 
-async def buscar_conhecimento(query: str, db: Session) -> List[Dict[str, Any]]:
+async def gerar_resposta(text: str) -> Optional[str]:
+    """Gera a resposta para uma mensagem recebida (None se não houver)"""
+    if text.startswith("/buscar"):
+        query = text.replace("/buscar", "").strip()
+        if query:
+            return await responder_busca(query)
+        return MENSAGEM_USO
+
+    if text.startswith("/ajuda") or text.lower() in ["oi", "ola", "olá", "help"]:
+        return MENSAGEM_AJUDA
+
+    return None
+
+
+async def responder_busca(query: str) -> str:
+    """Retorna a resposta formatada da busca, usando o cache quando possível"""
+    chave = normalizar_consulta(query)
+
+    mensagem = cache_respostas.obter(chave)
+    if mensagem is not None:
+        return mensagem
+
+    resultados = await buscar_conhecimento(chave)
+    mensagem = formatar_resultados(resultados)
+
+    # Só armazena respostas com resultados (falhas na busca retornam lista vazia)
+    if resultados:
+        cache_respostas.definir(chave, mensagem)
+
+    return mensagem
+
+
+async def buscar_conhecimento(query: str) -> List[Dict[str, Any]]:
     """Busca conhecimentos no banco de dados"""
     try:
-        # Busca por título, pergunta ou resposta
-        resultados = db.query(Conhecimento).filter(
-            or_(
-                Conhecimento.titulo.ilike(f"%{query}%"),
-                Conhecimento.pergunta.ilike(f"%{query}%"),
-                Conhecimento.resposta.ilike(f"%{query}%"),
-                Conhecimento.tags.contains([query.lower()])
-            )
-        ).order_by(
-            (Conhecimento.votos_positivos - Conhecimento.votos_negativos).desc()
-        ).limit(3).all()
+        async with SessionLocal() as db:
+            resultados = await consultar_conhecimentos(db, busca=query, limite=3)
 
         # Converter para dicionário
         return [
@@ -93,7 +254,7 @@ async def buscar_conhecimento(query: str, db: Session) -> List[Dict[str, Any]]:
         ]
 
     except Exception as e:
-        logger.error(f"Erro na busca: {e}")
+        logger.error("Erro na busca: %s", e)
         return []
 
 
@@ -124,40 +285,77 @@ def formatar_resultados(resultados: List[Dict[str, Any]]) -> str:
     return mensagem
 
 
-async def enviar_mensagem_whatsapp(destinatario: str, mensagem: str):
-    """Envia mensagem via WhatsApp Business API"""
+async def enviar_mensagem_whatsapp(destinatario: str, mensagem: str) -> bool:
+    """Envia mensagem via WhatsApp Business API, com retentativas em 429/5xx"""
     if not WHATSAPP_TOKEN or not WHATSAPP_PHONE_ID:
         logger.warning("WhatsApp não configurado - token ou phone_id ausente")
-        return
+        return False
 
-    try:
-        url = f"{WHATSAPP_API_URL}/{WHATSAPP_PHONE_ID}/messages"
+    url = f"{WHATSAPP_API_URL}/{WHATSAPP_PHONE_ID}/messages"
 
-        headers = {
-            "Authorization": f"Bearer {WHATSAPP_TOKEN}",
-            "Content-Type": "application/json"
-        }
+    headers = {
+        "Authorization": f"Bearer {WHATSAPP_TOKEN}",
+        "Content-Type": "application/json"
+    }
 
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": destinatario,
-            "type": "text",
-            "text": {
-                "body": mensagem
-            }
+    payload = {
+        "messaging_product": "whatsapp",
+        "to": destinatario,
+        "type": "text",
+        "text": {
+            "body": mensagem
         }
+    }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=payload)
-
-            if response.status_code == 200:
-                logger.info(f"Mensagem enviada para {destinatario}")
-            else:
-                logger.error(
-                    f"Erro ao enviar mensagem: {response.status_code} - {response.text}")
+    client = fila_whatsapp.client or httpx.AsyncClient()
+    inicio = time.perf_counter()
+    enviado = False
+    try:
+        for tentativa in range(1, WHATSAPP_MAX_TENTATIVAS + 1):
+            espera = WHATSAPP_BACKOFF_BASE * 2 ** (tentativa - 1)
+            try:
+                response = await client.post(url, headers=headers, json=payload)
+
+                if response.status_code == 200:
+                    logger.debug("Mensagem enviada para %s", destinatario)
+                    enviado = True
+                    return True
+
+                registrar_erro_whatsapp(
+                    "http_429" if response.status_code == 429 else f"http_{response.status_code // 100}xx")
+                if response.status_code != 429 and response.status_code < 500:
+                    logger.error(
+                        "Erro ao enviar mensagem: %d - %s", response.status_code, response.text)
+                    return False
+
+                # Respeita o Retry-After informado pela API, quando houver
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    espera = max(espera, float(retry_after))
+                logger.warning(
+                    "WhatsApp respondeu %d (tentativa %d)", response.status_code, tentativa)
+
+            except httpx.TransportError as e:
+                registrar_erro_whatsapp("rede")
+                logger.warning(
+                    "Falha de rede ao enviar mensagem (tentativa %d): %s", tentativa, e)
+
+            if tentativa < WHATSAPP_MAX_TENTATIVAS:
+                await asyncio.sleep(espera + random.uniform(0, espera / 2))
+
+        logger.error(
+            "Desistindo de enviar mensagem para %s após %d tentativas",
+            destinatario, WHATSAPP_MAX_TENTATIVAS)
+        return False
 
     except Exception as e:
-        logger.error(f"Erro ao enviar mensagem WhatsApp: {e}")
+        registrar_erro_whatsapp("interno")
+        logger.error("Erro ao enviar mensagem WhatsApp: %s", e)
+        return False
+    finally:
+        registrar_envio_whatsapp(enviado, time.perf_counter() - inicio)
+        if client is not fila_whatsapp.client:
+            await client.aclose()
 
 
 @router.get("/webhook")